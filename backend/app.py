@@ -7,12 +7,28 @@ from flask_cors import CORS
 import os
 import uuid
 from datetime import datetime
+import io
 import json
+import queue
+import cv2
+import numpy as np
+import threading
+from functools import partial
+from PIL import Image
 
 from utils.image_processor import ImageNormalizer
 from utils.ocr_detector import OCRDetector
+from utils.ocr_pool import OCRWorkerPool
+from utils.ocr_tiling import TiledOCR, shift_region
+from utils.ocr_cache import OCRCache
+from utils.band_cache import BandCache
+from utils.revision_diff import RevisionDiff
 from utils.font_fitter import FontFitter
 from utils.annotator import ResultAnnotator
+from utils.vector_layers import VectorLayerRenderer
+from utils.parallel_fitter import ParallelFitEngine
+from utils.pipeline import PipelineContext
+from utils.job_queue import JobQueue
 
 app = Flask(__name__)
 CORS(app)  # 允许跨域请求
@@ -26,29 +42,495 @@ OUTPUT_FOLDER = 'outputs'
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 os.makedirs(OUTPUT_FOLDER, exist_ok=True)
 
-# 初始化处理器（全局单例，避免重复初始化PaddleOCR）
-ocr_detector = None
-font_fitter = None
+# 是否默认保存原图、预处理图等中间产物（调试用）
+SAVE_INTERMEDIATES = os.environ.get('SAVE_INTERMEDIATES', '0')
+
+# 并行拟合配置：工作者数量（默认CPU核心数，1为串行）和后端（process / thread）
+FIT_WORKERS = int(os.environ.get('FIT_WORKERS', os.cpu_count() or 1))
+FIT_BACKEND = os.environ.get('FIT_BACKEND', 'process')
+
+# OCR推理后端：paddle（PaddleOCR）/ onnx（ONNX Runtime CPU，需指定模型目录）/ stub（确定性桩，基准测试用）
+# onnx 为实验性后端：只有冒烟测试（tests/test_ocr_backends.py，需设置 OCR_ONNX_MODEL_DIR），
+# 识别结果尚未与 paddle 后端逐项对齐，生产环境请使用 paddle
+OCR_BACKEND = os.environ.get('OCR_BACKEND', 'paddle')
+OCR_BACKEND_OPTIONS = {"model_dir": os.environ.get('OCR_ONNX_MODEL_DIR')} if OCR_BACKEND == 'onnx' else {}
+
+# OCR工作池配置：检测器数量、每个检测器的推理线程数（默认平分CPU核心）、是否在启动时预加载模型
+OCR_WORKERS = int(os.environ.get('OCR_WORKERS', 1))
+OCR_THREADS = int(os.environ.get('OCR_THREADS', 0)) or None
+OCR_PRELOAD = os.environ.get('OCR_PRELOAD', '1') == '1'
+
+# 长图分块OCR：条带高度（0为不分块）和相邻条带重叠高度
+OCR_TILE_HEIGHT = int(os.environ.get('OCR_TILE_HEIGHT', 2400))
+OCR_TILE_OVERLAP = int(os.environ.get('OCR_TILE_OVERLAP', 160))
+
+# OCR结果缓存：目录和大小上限（MB，0为不缓存）
+OCR_CACHE_DIR = os.environ.get('OCR_CACHE_DIR', os.path.join(OUTPUT_FOLDER, 'ocr_cache'))
+OCR_CACHE_MAX_MB = int(os.environ.get('OCR_CACHE_MAX_MB', 512))
 
+# 条带级复用：最多记录的条带数（0为不复用）
+BAND_CACHE_ENTRIES = int(os.environ.get('BAND_CACHE_ENTRIES', 2048))
 
-def get_ocr_detector():
-    """懒加载OCR检测器"""
-    global ocr_detector
-    if ocr_detector is None:
-        print("正在初始化 PaddleOCR...")
-        ocr_detector = OCRDetector()
-        print("PaddleOCR 初始化完成")
-    return ocr_detector
+# 分辨率金字塔：各设计稿密度的宽度（375 / 750 / 1125 对应 1x / 2x / 3x），OCR和拟合只在 750 层进行
+NORMALIZE_LEVELS = tuple(int(w) for w in os.environ.get('NORMALIZE_LEVELS', '375,750,1125').split(',') if w.strip())
+
+# 可视化产物（OCR检测图、覆盖层、标注图，栅格 .jpg 或矢量 .svg）的生成时机：
+# lazy 首次通过 /api/image 请求时再渲染并缓存；eager 处理时一并渲染（请求参数 render 可覆盖）
+RENDER_MODE = os.environ.get('RENDER_MODE', 'lazy')
+VISUAL_ARTIFACTS = ('ocr_detection', 'overlay', 'annotated')
+
+# 异步任务：后台线程数（同时处理的任务数）和最多排队的任务数
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 2))
+JOB_QUEUE_SIZE = int(os.environ.get('JOB_QUEUE_SIZE', 16))
+
+# 初始化处理器（全局单例，避免重复初始化PaddleOCR）
+ocr_pool = None
+# 按文件名分段加锁，同一产物的并发请求只渲染一次
+_render_locks = [threading.Lock() for _ in range(16)]
+tiled_ocr = None
+ocr_cache = None
+band_cache = None
+font_fitter = None
+fit_engine = None
+job_queue = None
+# 每个单例一把锁（互相依赖的单例嵌套获取时不会死锁），检查-加锁-再检查，创建后的读取不加锁
+_ocr_pool_lock = threading.Lock()
+_tiled_ocr_lock = threading.Lock()
+_ocr_cache_lock = threading.Lock()
+_band_cache_lock = threading.Lock()
+_font_fitter_lock = threading.Lock()
+_fit_engine_lock = threading.Lock()
+_job_queue_lock = threading.Lock()
+
+
+def get_ocr_pool():
+    """懒加载OCR检测器池（检测器本身在首次使用或启动预加载时创建）"""
+    global ocr_pool
+    if ocr_pool is None:
+        with _ocr_pool_lock:
+            if ocr_pool is None:
+                ocr_pool = OCRWorkerPool(
+                    size=OCR_WORKERS,
+                    cpu_threads=OCR_THREADS,
+                    detector_factory=partial(OCRDetector, backend=OCR_BACKEND, **OCR_BACKEND_OPTIONS)
+                )
+    return ocr_pool
+
+
+def get_tiled_ocr():
+    """懒加载分块OCR（条带在检测器池上并行识别）"""
+    global tiled_ocr
+    if tiled_ocr is None:
+        with _tiled_ocr_lock:
+            if tiled_ocr is None:
+                tiled_ocr = TiledOCR(
+                    get_ocr_pool(),
+                    tile_height=OCR_TILE_HEIGHT,
+                    overlap=OCR_TILE_OVERLAP,
+                    parallelism=OCR_WORKERS
+                )
+    return tiled_ocr
+
+
+def get_ocr_cache():
+    """懒加载OCR结果缓存，未启用时返回 None"""
+    global ocr_cache
+    if ocr_cache is None and OCR_CACHE_MAX_MB > 0:
+        with _ocr_cache_lock:
+            if ocr_cache is None:
+                params = {
+                    **OCRDetector.result_params(OCR_BACKEND, **OCR_BACKEND_OPTIONS),
+                    "tile_height": OCR_TILE_HEIGHT,
+                    "tile_overlap": OCR_TILE_OVERLAP
+                }
+                ocr_cache = OCRCache(OCR_CACHE_DIR, params, max_bytes=OCR_CACHE_MAX_MB * 1024 * 1024)
+    return ocr_cache
+
+
+def get_band_cache():
+    """懒加载条带级结果缓存，未启用时返回 None"""
+    global band_cache
+    if band_cache is None and BAND_CACHE_ENTRIES > 0:
+        with _band_cache_lock:
+            if band_cache is None:
+                params = {
+                    **OCRDetector.result_params(OCR_BACKEND, **OCR_BACKEND_OPTIONS),
+                    "tile_height": OCR_TILE_HEIGHT,
+                    "tile_overlap": OCR_TILE_OVERLAP,
+                    "font_path": get_font_fitter().font_path
+                }
+                band_cache = BandCache(params, max_entries=BAND_CACHE_ENTRIES)
+    return band_cache
+
+
+def get_job_queue():
+    """懒加载后台任务队列"""
+    global job_queue
+    if job_queue is None:
+        with _job_queue_lock:
+            if job_queue is None:
+                job_queue = JobQueue(workers=JOB_WORKERS, max_pending=JOB_QUEUE_SIZE)
+    return job_queue
 
 
 def get_font_fitter():
     """懒加载字号拟合器"""
     global font_fitter
     if font_fitter is None:
-        font_fitter = FontFitter()
+        with _font_fitter_lock:
+            if font_fitter is None:
+                font_fitter = FontFitter()
     return font_fitter
 
 
+def get_fit_engine():
+    """懒加载并行拟合引擎（工作池跨请求复用）"""
+    global fit_engine
+    if fit_engine is None:
+        with _fit_engine_lock:
+            if fit_engine is None:
+                fit_engine = ParallelFitEngine(get_font_fitter(), workers=FIT_WORKERS, backend=FIT_BACKEND)
+    return fit_engine
+
+
+def apply_fit_result(task_id: str, region: dict, fit_result: dict):
+    """把拟合结果写回文本区域；失败时与逐区域拟合的处理一致"""
+    if fit_result.get('error'):
+        print(f"[{task_id}] 拟合失败: {fit_result['error']}")
+        region['fitted_font_size'] = None
+        region['fit_quality'] = 0.0
+        return
+
+    # 更新区域数据
+    region['fitted_font_size'] = fit_result['font_size']
+    region['fitted_baseline'] = fit_result['baseline_offset']
+    region['fitted_x_offset'] = fit_result['x_offset']
+    region['fit_quality'] = fit_result['fit_quality']
+    region['fit_evaluations'] = fit_result['evaluations']
+    region['fit_from_memo'] = fit_result['from_memo']
+    if fit_result.get('spans'):
+        region['fitted_spans'] = fit_result['spans']
+
+    if fit_result.get('spans'):
+        sizes = ", ".join(f"{span['text'] or '?'}={span['font_size']}px" for span in fit_result['spans'])
+        print(f"[{task_id}]   -> 混排字号: {sizes}")
+    elif fit_result['fit_quality'] is not None:
+        source = "备忘录" if fit_result['from_memo'] else f"评估 {fit_result['evaluations']} 次"
+        print(f"[{task_id}]   -> {fit_result['font_size']}px (质量: {fit_result['fit_quality']:.3f}, {source})")
+    else:
+        print(f"[{task_id}]   -> {fit_result['font_size']}px (度量估计)")
+
+
+def run_normalize(ctx: PipelineContext, img: Image.Image):
+    """View 1: 图像标准化（内存中完成，只写出前端展示用的标准化图）"""
+    print(f"[{ctx.task_id}] View 1: 图像标准化...")
+    ctx.report('normalize')
+    if ctx.save_intermediates:
+        # 原图需要完整解码，铺底后的图直接交给标准化，不再重复铺底
+        img = ImageNormalizer.to_rgb(img)
+        img.save(os.path.join(UPLOAD_FOLDER, f"{ctx.task_id}_original.jpg"), 'JPEG', quality=95)
+
+    normalizer = ImageNormalizer()
+    ctx.levels, ctx.normalization = normalizer.normalize_pyramid(img, NORMALIZE_LEVELS)
+    ctx.normalized = ctx.levels[ImageNormalizer.TARGET_WIDTH]
+    ctx.scale_factor = ctx.normalization['scale_factor']
+    ctx.normalization['output_path'] = ctx.save_image('normalized', ctx.normalized)
+    # 各密度的字号由缩放比例换算，其它层的图片只在调试时写出
+    if ctx.save_intermediates:
+        for width, level in ctx.levels.items():
+            if width != ImageNormalizer.TARGET_WIDTH:
+                ctx.save_image(f'normalized_{width}', level)
+    print(f"[{ctx.task_id}] 标准化完成: {ctx.scale_factor:.3f}x"
+          f"（金字塔 {', '.join(str(level['width']) for level in ctx.normalization['levels'])}）")
+
+
+def scale_font_size(font_size, levels: list):
+    """字号换算到金字塔各层：{层宽度: 字号}"""
+    return {
+        str(level['width']): round(font_size * level['relative_scale'], 1)
+        for level in levels
+    } if font_size else None
+
+
+def apply_density_sizes(ctx: PipelineContext):
+    """按金字塔各层的缩放比例换算拟合字号，不重复识别和拟合"""
+    levels = ctx.normalization.get('levels', [])
+    for region in ctx.regions:
+        font_size = region.get('fitted_font_size')
+        region['fitted_font_sizes'] = scale_font_size(font_size, levels)
+        # 混排字号的各片段按同样的比例换算
+        for span in region.get('fitted_spans') or []:
+            span['font_sizes'] = scale_font_size(span['font_size'], levels)
+
+
+def run_ocr(ctx: PipelineContext):
+    """View 2: OCR识别"""
+    print(f"[{ctx.task_id}] View 2: OCR文字识别...")
+    ctx.report('ocr')
+    # 同一张图（像素完全相同）重复上传时直接使用缓存的识别结果
+    cache = get_ocr_cache()
+    cache_key = cache.key(ctx.normalized) if cache else None
+    ocr_result = cache.get(cache_key) if cache else None
+    ctx.timings['ocr_cached'] = ocr_result is not None
+
+    if ocr_result is None:
+        # 超过一个条带高度的长图自动分块识别
+        bands = get_band_cache()
+        if bands:
+            # 与之前截图相同的条带直接复用识别和拟合结果，只识别变化了的条带
+            ocr_result, ctx.bands = bands.detect(ctx.normalized, get_tiled_ocr(), ctx.fit_mode)
+            cached = sum(band['cached'] for band in ctx.bands)
+            ctx.timings['bands_cached'] = cached
+            ctx.timings['bands_total'] = len(ctx.bands)
+            print(f"[{ctx.task_id}] 条带复用: {cached}/{len(ctx.bands)}")
+        else:
+            ocr_result = get_tiled_ocr().detect(ctx.normalized)
+            cached = 0
+
+        # 整页缓存只保存纯识别结果；复用了条带的结果带有拟合字段，不写入
+        if cache and not cached:
+            cache.put(cache_key, ocr_result)
+
+    ctx.regions = ocr_result.regions
+    ctx.timings['ocr_queue_wait'] = round(ocr_result.queue_wait, 3)
+    ctx.timings['ocr_inference'] = round(ocr_result.inference_time, 3)
+    ctx.timings['ocr_tiles'] = ocr_result.tiles
+    print(f"[{ctx.task_id}] 识别到 {len(ctx.regions)} 个文本区域"
+          f"（排队 {ocr_result.queue_wait:.2f}s，推理 {ocr_result.inference_time:.2f}s）")
+
+    # 后续使用预处理后的图片（如果存在）
+    if ocr_result.preprocessed_img is not None:
+        # preprocessed_img是RGB格式，转换为BGR
+        ctx.working = ocr_result.preprocessed_bgr
+        # 与标准化图不同时必须保存，可视化产物按需生成时要画在OCR实际处理的图片上
+        if ctx.save_intermediates or not np.array_equal(ctx.working, ctx.normalized):
+            path = ctx.save_image('preprocessed', ctx.working)
+            print(f"[{ctx.task_id}] 保存预处理后的图片: {path}")
+
+
+def run_fitting(ctx: PipelineContext):
+    """View 3: 字号拟合"""
+    print(f"[{ctx.task_id}] View 3: 字号拟合...")
+
+    # 复用条带中的区域、增量分析沿用的区域已带有拟合结果
+    pending = [
+        region for region in ctx.regions
+        if not region.get('from_band_cache') and region.get('change') != 'carried'
+    ]
+    if len(pending) < len(ctx.regions):
+        print(f"[{ctx.task_id}] {len(ctx.regions) - len(pending)} 个区域沿用已有拟合结果")
+
+    # 工作图整页二值化后分发到各工作者并行拟合
+    ctx.report('fitting', 0, len(pending))
+    fit_results = get_fit_engine().fit_regions(
+        ctx.working_image,  # 使用预处理后的图片（如果存在）
+        pending,
+        min_size=8,
+        max_size=100,
+        mode=ctx.fit_mode,
+        progress=partial(ctx.report, 'fitting')
+    )
+    for idx, (region, fit_result) in enumerate(zip(pending, fit_results)):
+        print(f"[{ctx.task_id}] 拟合 {idx+1}/{len(pending)}: {region['text'][:20]}...")
+        apply_fit_result(ctx.task_id, region, fit_result)
+
+    if ctx.bands:
+        get_band_cache().store(ctx.bands, ctx.regions)
+
+
+def run_incremental_ocr(ctx: PipelineContext, previous: dict, previous_image) -> list:
+    """
+    增量识别：与上一次任务的标准化图片对齐、求差异，只识别变化的行段，其余区域沿用
+
+    Returns:
+        list: 落在变化行段中的旧区域（拟合后与新区域配对，未配对的即为删除的文字）
+    """
+    print(f"[{ctx.task_id}] View 2: 增量OCR（基于 {previous['task_id']}）...")
+    ctx.report('ocr')
+    diff = RevisionDiff()
+    dy = diff.align(previous_image, ctx.normalized)
+    spans = diff.changed_spans(previous_image, ctx.normalized, dy)
+    carried, stale = diff.carry_over(previous['text_regions'], dy, spans, ctx.normalized.shape[0])
+
+    detected = []
+    queue_wait = inference_time = 0.0
+    for y_start, y_end in spans:
+        span_result = get_tiled_ocr().detect(ctx.normalized[y_start:y_end])
+        queue_wait += span_result.queue_wait
+        inference_time += span_result.inference_time
+        detected.extend(shift_region(region, y_start) for region in span_result.regions)
+
+    ctx.regions = sorted(carried + detected, key=lambda r: (r['bbox']['y'], r['bbox']['x']))
+    for idx, region in enumerate(ctx.regions):
+        region['id'] = f"text_{idx}"
+
+    changed_rows = sum(y_end - y_start for y_start, y_end in spans)
+    ctx.timings['ocr_queue_wait'] = round(queue_wait, 3)
+    ctx.timings['ocr_inference'] = round(inference_time, 3)
+    ctx.diff = {
+        "previous_task_id": previous['task_id'],
+        "offset_y": dy,
+        "changed_spans": [{"y": y_start, "height": y_end - y_start} for y_start, y_end in spans],
+        "changed_ratio": round(changed_rows / max(1, ctx.normalized.shape[0]), 4)
+    }
+    print(f"[{ctx.task_id}] 位移 {dy}px，变化行段 {len(spans)} 个（{changed_rows}px），"
+          f"沿用 {len(carried)} 个区域，重新识别 {len(detected)} 个")
+    return stale
+
+
+def run_classify_changes(ctx: PipelineContext, stale: list):
+    """拟合完成后把新识别的区域与旧区域配对，标记新增/修改/删除"""
+    detected = [region for region in ctx.regions if region.get('change') != 'carried']
+    removed = RevisionDiff().classify(stale, detected)
+
+    counts = {"added": 0, "changed": 0, "unchanged": 0}
+    for region in detected:
+        counts[region['change']] += 1
+    ctx.diff.update(counts)
+    ctx.diff['carried'] = len(ctx.regions) - len(detected)
+    ctx.diff['removed'] = len(removed)
+    ctx.diff['removed_regions'] = removed
+    print(f"[{ctx.task_id}] 新增 {counts['added']}，修改 {counts['changed']}，删除 {len(removed)}")
+
+
+def render_artifact(name: str, image, regions: list, output_path: str):
+    """渲染一个可视化产物：ocr_detection（View 2）/ overlay（View 3）/ annotated（View 4）"""
+    if name == 'ocr_detection':
+        # 画在OCR实际处理的图片上
+        OCRDetector.draw_detection(image.copy(), regions, output_path)
+    elif name == 'overlay':
+        # 渲染红色半透明覆盖层
+        get_font_fitter().render_overlay(image, regions, output_path)
+    elif name == 'annotated':
+        ResultAnnotator().annotate_image(image, regions, output_path)
+    else:
+        raise ValueError(f"未知的可视化产物: {name}")
+
+
+def run_render(ctx: PipelineContext):
+    """立即渲染全部可视化产物（render=eager）"""
+    print(f"[{ctx.task_id}] 渲染可视化产物...")
+    ctx.report('render')
+    for name in VISUAL_ARTIFACTS:
+        path = ctx.artifact_path(name)
+        render_artifact(name, ctx.working_image, ctx.regions, path)
+        ctx.artifacts[name] = path
+
+
+def render_lazy_artifact(task_id: str, name: str, ext: str = 'jpg'):
+    """
+    按需生成可视化产物：读取保存的结果JSON和OCR处理的图片渲染，写入后作为缓存
+
+    Args:
+        ext: jpg 栅格图（导出用）/ svg 矢量图层（前端叠加在底图上）
+
+    Returns:
+        Optional[str]: 产物路径，任务不存在时为 None
+    """
+    path = os.path.join(OUTPUT_FOLDER, f"{task_id}_{name}.{ext}")
+    with _render_locks[hash(path) % len(_render_locks)]:
+        if os.path.exists(path):
+            return path
+
+        result_path = os.path.join(OUTPUT_FOLDER, f"{task_id}_result.json")
+        if not os.path.exists(result_path):
+            return None
+        with open(result_path, 'r', encoding='utf-8') as f:
+            result = json.load(f)
+
+        image_path = next((
+            os.path.join(OUTPUT_FOLDER, f"{task_id}_{source}.jpg")
+            for source in ('preprocessed', 'normalized')
+            if os.path.exists(os.path.join(OUTPUT_FOLDER, f"{task_id}_{source}.jpg"))
+        ), None)
+        if image_path is None:
+            return None
+
+        print(f"[{task_id}] 按需生成 {name}.{ext}...", flush=True)
+        # 先写临时文件再替换，并发读取时不会拿到写了一半的图片
+        tmp_path = os.path.join(OUTPUT_FOLDER, f"{task_id}_{name}.tmp.{ext}")
+        if ext == 'svg':
+            # 矢量图层只需要底图尺寸（只读文件头）
+            with Image.open(image_path) as base:
+                size = base.size
+            VectorLayerRenderer(get_font_fitter()).save(name, result['text_regions'], size, tmp_path)
+        else:
+            image = cv2.imread(image_path)
+            if image is None:
+                return None
+            render_artifact(name, image, result['text_regions'], tmp_path)
+        os.replace(tmp_path, path)
+        return path
+
+
+def save_result(ctx: PipelineContext) -> dict:
+    """生成分析报告并保存JSON结果，返回接口响应数据"""
+    ctx.report('saving')
+    apply_density_sizes(ctx)
+    report = ResultAnnotator().generate_report(ctx.regions)
+    result = {
+        "task_id": ctx.task_id,
+        "timestamp": ctx.timestamp,
+        "fit_mode": ctx.fit_mode,
+        "normalization": ctx.normalization,
+        "timings": ctx.timings,
+        "bands": [
+            {"index": band['index'], "y": band['y'], "height": band['height'], "cached": band['cached']}
+            for band in ctx.bands
+        ],
+        "text_regions": ctx.regions,
+        "report": report
+    }
+    if ctx.diff:
+        result["diff"] = ctx.diff
+
+    # 图片地址一并写入JSON，异步任务通过 /api/result 获取的结果与同步接口一致
+    # 矢量图层叠加在 base（OCR实际处理的图片）上显示，栅格视图保留用于导出
+    base = 'preprocessed' if 'preprocessed' in ctx.artifacts else 'normalized'
+    result["images"] = {
+        "normalized": f"/api/image/{ctx.task_id}_normalized.jpg",
+        "base": f"/api/image/{ctx.task_id}_{base}.jpg",
+        "ocr_detection": f"/api/image/{ctx.task_id}_ocr_detection.jpg",
+        "overlay": f"/api/image/{ctx.task_id}_overlay.jpg",
+        "annotated": f"/api/image/{ctx.task_id}_annotated.jpg",
+        "levels": {
+            name.rsplit('_', 1)[1]: f"/api/image/{ctx.task_id}_{name}.jpg"
+            for name in ctx.artifacts if name.startswith('normalized_')
+        }
+    }
+    result["vectors"] = {name: f"/api/image/{ctx.task_id}_{name}.svg" for name in VISUAL_ARTIFACTS}
+
+    with open(ctx.artifact_path('result', 'json'), 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    return result
+
+
+def error_response(e: Exception):
+    """打印详细错误并返回500响应"""
+    import traceback
+    import sys
+    error_msg = str(e)
+    stack_trace = traceback.format_exc()
+
+    # 详细打印错误
+    print("\n" + "=" * 60, flush=True)
+    print("❌ 处理错误:", flush=True)
+    print("=" * 60, flush=True)
+    print(f"错误类型: {type(e).__name__}", flush=True)
+    print(f"错误信息: {error_msg}", flush=True)
+    print("\n完整堆栈:", flush=True)
+    print(stack_trace, flush=True)
+    print("=" * 60 + "\n", flush=True)
+    sys.stdout.flush()
+    sys.stderr.flush()
+
+    return jsonify({
+        "success": False,
+        "error": error_msg,
+        "error_type": type(e).__name__
+    }), 500
+
+
 @app.route('/')
 def index():
     """服务前端主页面"""
@@ -73,10 +555,76 @@ def health_check():
     return jsonify({
         "status": "ok",
         "service": "PixelPerfect Type API",
-        "version": "1.0.0"
+        "version": "1.0.0",
+        # 进程后端下拟合在工作进程中进行，这里汇总各工作进程上报的统计（scope 标明统计来源）
+        "glyph_cache": get_fit_engine().get_cache_stats(),
+        "ocr_pool": get_ocr_pool().stats(),
+        "ocr_cache": get_ocr_cache().stats() if get_ocr_cache() else None,
+        "band_cache": get_band_cache().stats() if get_band_cache() else None,
+        "job_queue": get_job_queue().stats()
     })
 
 
+def parse_process_options():
+    """
+    解析 /api/process 与 /api/jobs 共用的请求参数
+
+    Returns:
+        Tuple[Optional[dict], Optional[Response]]: (参数, 参数错误时的400响应)
+    """
+    if 'image' not in request.files:
+        return None, (jsonify({"error": "未上传图片"}), 400)
+
+    file = request.files['image']
+    if file.filename == '':
+        return None, (jsonify({"error": "文件名为空"}), 400)
+
+    # 拟合模式：accurate 像素IoU拟合；fast 只用字体度量估计（批量粗查）
+    fit_mode = request.values.get('fit_mode', 'accurate')
+    if fit_mode not in ('accurate', 'fast'):
+        return None, (jsonify({"error": f"不支持的拟合模式: {fit_mode}"}), 400)
+
+    # 调试用：额外保存原图、预处理图等中间产物
+    save_intermediates = request.values.get('save_intermediates', SAVE_INTERMEDIATES) in ('1', 'true', True)
+
+    # 可视化产物：lazy 首次请求图片时再生成，eager 处理时一并生成
+    render = request.values.get('render', RENDER_MODE)
+    if render not in ('lazy', 'eager'):
+        return None, (jsonify({"error": f"不支持的渲染方式: {render}"}), 400)
+
+    return {
+        "file": file,
+        "fit_mode": fit_mode,
+        "save_intermediates": save_intermediates,
+        "render": render
+    }, None
+
+
+def new_context(options: dict, progress=None) -> PipelineContext:
+    """为一次处理任务生成唯一ID和上下文"""
+    return PipelineContext(
+        task_id=str(uuid.uuid4()),
+        output_dir=OUTPUT_FOLDER,
+        timestamp=datetime.now().strftime('%Y%m%d_%H%M%S'),
+        fit_mode=options['fit_mode'],
+        save_intermediates=options['save_intermediates'],
+        progress=progress
+    )
+
+
+def run_process(ctx: PipelineContext, img: Image.Image, render: str) -> dict:
+    """完整处理流程 View 1-4，返回接口响应数据"""
+    run_normalize(ctx, img)
+    run_ocr(ctx)
+    run_fitting(ctx)
+    if render == 'eager':
+        run_render(ctx)
+    result = save_result(ctx)
+
+    print(f"[{ctx.task_id}] 处理完成！")
+    return result
+
+
 @app.route('/api/process', methods=['POST'])
 def process_image():
     """
@@ -85,6 +633,85 @@ def process_image():
     Returns:
         JSON: 包含所有处理结果的数据
     """
+    options, error = parse_process_options()
+    if error:
+        return error
+
+    try:
+        ctx = new_context(options)
+
+        # 直接从上传流解码，不落临时文件
+        result = run_process(ctx, Image.open(options['file'].stream), options['render'])
+
+        # 返回结果
+        return jsonify({"success": True, **result})
+
+    except Exception as e:
+        return error_response(e)
+
+
+@app.route('/api/jobs', methods=['POST'])
+def submit_job():
+    """
+    异步处理：参数与 /api/process 相同，上传完成后立即返回 task_id，
+    处理流程在后台任务线程中执行
+
+    Returns:
+        JSON: task_id 及状态、结果的查询地址（202）；队列已满时 503
+    """
+    options, error = parse_process_options()
+    if error:
+        return error
+
+    try:
+        # 上传内容先完整读入内存，后台任务不依赖请求的输入流
+        img = Image.open(io.BytesIO(options['file'].read()))
+    except Exception as e:
+        return jsonify({"error": f"无法识别的图片: {e}"}), 400
+
+    jobs = get_job_queue()
+    ctx = new_context(options)
+
+    def job(progress):
+        ctx.progress = progress
+        run_process(ctx, img, options['render'])
+
+    try:
+        status = jobs.submit(ctx.task_id, job)
+    except queue.Full as e:
+        return jsonify({"success": False, "error": str(e)}), 503
+
+    print(f"[{ctx.task_id}] 任务已提交", flush=True)
+    return jsonify({
+        "success": True,
+        **status,
+        "status_url": f"/api/jobs/{ctx.task_id}",
+        "result_url": f"/api/result/{ctx.task_id}"
+    }), 202
+
+
+@app.route('/api/jobs/<task_id>', methods=['GET'])
+def get_job(task_id):
+    """查询异步任务状态：queued / running（stage 为当前阶段，fitting 阶段 progress 为区域拟合进度）/ done / failed"""
+    status = get_job_queue().status(task_id)
+    if status is None:
+        # 服务重启后内存中的状态已丢失，结果文件存在即视为完成
+        if os.path.exists(os.path.join(OUTPUT_FOLDER, f"{task_id}_result.json")):
+            status = {"task_id": task_id, "status": "done", "stage": "done"}
+        else:
+            return jsonify({"error": "任务不存在"}), 404
+    return jsonify({**status, "result_url": f"/api/result/{task_id}"})
+
+
+@app.route('/api/reanalyze', methods=['POST'])
+def reanalyze_image():
+    """
+    增量分析：上传新版截图和上一次的 previous_task_id，
+    只重新识别、拟合发生变化的部分，其余文本区域沿用上一次的结果
+
+    Returns:
+        JSON: 与 /api/process 相同，另含 diff（变化行段、新增/修改/删除统计及删除的区域）
+    """
     if 'image' not in request.files:
         return jsonify({"error": "未上传图片"}), 400
 
@@ -92,173 +719,85 @@ def process_image():
     if file.filename == '':
         return jsonify({"error": "文件名为空"}), 400
 
-    try:
-        # 生成唯一ID
-        task_id = str(uuid.uuid4())
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-
-        # 保存上传的文件（先保存为临时文件）
-        temp_path = os.path.join(UPLOAD_FOLDER, f"{task_id}_temp{os.path.splitext(file.filename)[1]}")
-        file.save(temp_path)
-
-        # 转换为RGB并保存为JPG（处理RGBA等模式）
-        from PIL import Image
-        img = Image.open(temp_path)
-        if img.mode in ('RGBA', 'LA', 'P'):
-            # 创建白色背景
-            background = Image.new('RGB', img.size, (255, 255, 255))
-            if img.mode == 'P':
-                img = img.convert('RGBA')
-            background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
-            img = background
-        elif img.mode != 'RGB':
-            img = img.convert('RGB')
-
-        original_path = os.path.join(UPLOAD_FOLDER, f"{task_id}_original.jpg")
-        img.save(original_path, 'JPEG', quality=95)
-
-        # 删除临时文件
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
-
-        # ============ View 1: 图像标准化 ============
-        print(f"[{task_id}] View 1: 图像标准化...")
-        normalizer = ImageNormalizer()
-        normalized_path = os.path.join(OUTPUT_FOLDER, f"{task_id}_normalized.jpg")
-        normalization_result = normalizer.normalize(original_path, normalized_path)
-        print(f"[{task_id}] 标准化完成: {normalization_result['scale_factor']:.3f}x")
-
-        # ============ View 2: OCR识别 ============
-        print(f"[{task_id}] View 2: OCR文字识别...")
-        detector = get_ocr_detector()
-        text_regions = detector.detect_texts(normalized_path)
-        print(f"[{task_id}] 识别到 {len(text_regions)} 个文本区域")
-
-        # 保存预处理后的图片（如果存在）
-        if hasattr(detector, 'preprocessed_img') and detector.preprocessed_img is not None:
-            preprocessed_path = os.path.join(OUTPUT_FOLDER, f"{task_id}_preprocessed.jpg")
-            import cv2
-            # preprocessed_img是RGB格式，转换为BGR保存
-            preprocessed_bgr = cv2.cvtColor(detector.preprocessed_img, cv2.COLOR_RGB2BGR)
-            cv2.imwrite(preprocessed_path, preprocessed_bgr)
-            print(f"[{task_id}] 保存预处理后的图片: {preprocessed_path}")
-            # 后续使用预处理后的图片
-            working_image_path = preprocessed_path
-        else:
-            working_image_path = normalized_path
-
-        # 保存OCR可视化结果
-        ocr_vis_path = os.path.join(OUTPUT_FOLDER, f"{task_id}_ocr_detection.jpg")
-        detector.visualize_detection(normalized_path, text_regions, ocr_vis_path)
-
-        # ============ View 3: 字号拟合 ============
-        print(f"[{task_id}] View 3: 字号拟合...")
-        fitter = get_font_fitter()
-
-        for idx, region in enumerate(text_regions):
-            print(f"[{task_id}] 拟合 {idx+1}/{len(text_regions)}: {region['text'][:20]}...")
-
-            try:
-                fit_result = fitter.fit_font_size(
-                    working_image_path,  # 使用预处理后的图片（如果存在）
-                    region['text'],
-                    region['bbox'],
-                    min_size=8,
-                    max_size=100
-                )
+    render = request.values.get('render', RENDER_MODE)
+    if render not in ('lazy', 'eager'):
+        return jsonify({"error": f"不支持的渲染方式: {render}"}), 400
 
-                # 更新区域数据
-                region['fitted_font_size'] = fit_result['font_size']
-                region['fitted_baseline'] = fit_result['baseline_offset']
-                region['fit_quality'] = fit_result['fit_quality']
+    previous_task_id = request.values.get('previous_task_id', '')
+    try:
+        uuid.UUID(previous_task_id)
+    except ValueError:
+        return jsonify({"error": f"无效的 previous_task_id: {previous_task_id}"}), 400
 
-                print(f"[{task_id}]   -> {fit_result['font_size']}px (质量: {fit_result['fit_quality']:.3f})")
+    previous_path = os.path.join(OUTPUT_FOLDER, f"{previous_task_id}_result.json")
+    previous_image = cv2.imread(os.path.join(OUTPUT_FOLDER, f"{previous_task_id}_normalized.jpg"))
+    if not os.path.exists(previous_path) or previous_image is None:
+        return jsonify({"error": "上一次的结果不存在"}), 404
 
-            except Exception as e:
-                print(f"[{task_id}] 拟合失败: {str(e)}")
-                region['fitted_font_size'] = None
-                region['fit_quality'] = 0.0
+    with open(previous_path, 'r', encoding='utf-8') as f:
+        previous = json.load(f)
 
-        # 渲染红色半透明覆盖层
-        overlay_path = os.path.join(OUTPUT_FOLDER, f"{task_id}_overlay.jpg")
-        fitter.render_overlay(working_image_path, text_regions, overlay_path)
-
-        # ============ View 4: 结果标注 ============
-        print(f"[{task_id}] View 4: 结果标注...")
-        annotator = ResultAnnotator()
-        annotated_path = os.path.join(OUTPUT_FOLDER, f"{task_id}_annotated.jpg")
-        annotator.annotate_image(working_image_path, text_regions, annotated_path)
-
-        # 生成分析报告
-        report = annotator.generate_report(text_regions)
-
-        # 保存JSON结果
-        result_json_path = os.path.join(OUTPUT_FOLDER, f"{task_id}_result.json")
-        with open(result_json_path, 'w', encoding='utf-8') as f:
-            json.dump({
-                "task_id": task_id,
-                "timestamp": timestamp,
-                "normalization": normalization_result,
-                "text_regions": text_regions,
-                "report": report
-            }, f, ensure_ascii=False, indent=2)
-
-        print(f"[{task_id}] 处理完成！")
-
-        # 返回结果
-        return jsonify({
-            "success": True,
-            "task_id": task_id,
-            "normalization": normalization_result,
-            "text_regions": text_regions,
-            "report": report,
-            "images": {
-                "normalized": f"/api/image/{task_id}_normalized.jpg",
-                "ocr_detection": f"/api/image/{task_id}_ocr_detection.jpg",
-                "overlay": f"/api/image/{task_id}_overlay.jpg",
-                "annotated": f"/api/image/{task_id}_annotated.jpg"
-            }
-        })
+    try:
+        # 沿用的区域带有上一次的拟合结果，拟合模式必须一致
+        ctx = PipelineContext(
+            task_id=str(uuid.uuid4()),
+            output_dir=OUTPUT_FOLDER,
+            timestamp=datetime.now().strftime('%Y%m%d_%H%M%S'),
+            fit_mode=previous.get('fit_mode', 'accurate')
+        )
+
+        run_normalize(ctx, Image.open(file.stream))
+        stale = run_incremental_ocr(ctx, previous, previous_image)
+        run_fitting(ctx)
+        run_classify_changes(ctx, stale)
+        if render == 'eager':
+            run_render(ctx)
+        result = save_result(ctx)
+
+        print(f"[{ctx.task_id}] 增量分析完成！")
+
+        return jsonify({"success": True, **result})
 
     except Exception as e:
-        import traceback
-        import sys
-        error_msg = str(e)
-        stack_trace = traceback.format_exc()
-
-        # 详细打印错误
-        print("\n" + "=" * 60, flush=True)
-        print("❌ 处理错误:", flush=True)
-        print("=" * 60, flush=True)
-        print(f"错误类型: {type(e).__name__}", flush=True)
-        print(f"错误信息: {error_msg}", flush=True)
-        print("\n完整堆栈:", flush=True)
-        print(stack_trace, flush=True)
-        print("=" * 60 + "\n", flush=True)
-        sys.stdout.flush()
-        sys.stderr.flush()
-
-        return jsonify({
-            "success": False,
-            "error": error_msg,
-            "error_type": type(e).__name__
-        }), 500
+        return error_response(e)
 
 
 @app.route('/api/image/<filename>', methods=['GET'])
 def get_image(filename):
-    """获取处理后的图片"""
+    """获取处理后的图片（可视化产物不存在时按需生成）"""
+    stem, ext = os.path.splitext(filename)
+    mimetype = 'image/svg+xml' if ext == '.svg' else 'image/jpeg'
     file_path = os.path.join(OUTPUT_FOLDER, filename)
     if os.path.exists(file_path):
-        return send_file(file_path, mimetype='image/jpeg')
-    else:
+        return send_file(file_path, mimetype=mimetype)
+
+    # {task_id}_{产物名}.jpg / .svg
+    task_id, _, name = stem.partition('_')
+    try:
+        uuid.UUID(task_id)
+    except ValueError:
         return jsonify({"error": "文件不存在"}), 404
+    if ext not in ('.jpg', '.svg') or name not in VISUAL_ARTIFACTS:
+        return jsonify({"error": "文件不存在"}), 404
+
+    try:
+        file_path = render_lazy_artifact(task_id, name, ext[1:])
+    except Exception as e:
+        return error_response(e)
+    if file_path is None:
+        return jsonify({"error": "文件不存在"}), 404
+    return send_file(file_path, mimetype=mimetype)
 
 
 @app.route('/api/result/<task_id>', methods=['GET'])
 def get_result(task_id):
-    """获取处理结果的JSON数据"""
+    """获取处理结果的JSON数据（异步任务未完成时返回任务状态）"""
     result_path = os.path.join(OUTPUT_FOLDER, f"{task_id}_result.json")
+    status = get_job_queue().status(task_id) if job_queue is not None else None
+    if status is not None and status['status'] in ('queued', 'running'):
+        return jsonify(status), 202
+    if status is not None and status['status'] == 'failed':
+        return jsonify({"success": False, **status}), 500
     if os.path.exists(result_path):
         with open(result_path, 'r', encoding='utf-8') as f:
             data = json.load(f)
@@ -285,6 +824,10 @@ if __name__ == '__main__':
     print("=" * 60)
     print("")
 
+    # debug 模式下 reloader 的监控进程不处理请求，只在实际服务的子进程中预加载
+    if OCR_PRELOAD and os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        get_ocr_pool().start()
+
     app.run(
         host='0.0.0.0',
         port=9090,
@@ -0,0 +1,7 @@
+"""
+测试配置：把 backend 目录加入导入路径，测试中直接 from utils import ...
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
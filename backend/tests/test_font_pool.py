@@ -0,0 +1,58 @@
+"""
+字体池与掩码缓存：小数字号必须真的渲染出不同的掩码
+"""
+import os
+
+import numpy as np
+import pytest
+
+from utils.font_pool import FontPool
+from utils.glyph_cache import GlyphMaskCache
+
+# 带 hinting 的 TrueType 字体（直接按小数字号加载时 13.5 / 13.7 / 14 渲染结果相同），找不到的跳过
+HINTED_FONTS = [
+    path for path in (
+        "/System/Library/Fonts/Supplemental/Arial.ttf",
+        "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    )
+    if os.path.exists(path)
+]
+
+
+def _render(pool, cache, size, text="Hello World", font_path=None):
+    font, key = pool.get_font(font_path, size, 0, FontPool.SUPERSAMPLE)
+    mask, origin = cache.get_mask(font, key, text)
+    return (mask > 127), origin
+
+
+@pytest.mark.parametrize("font_path", [None] + HINTED_FONTS)
+def test_adjacent_fractional_sizes_render_differently(font_path):
+    """相邻的量化字号（相差 1/SUPERSAMPLE 像素）掩码各不相同"""
+    pool, cache = FontPool(), GlyphMaskCache()
+    step = 1 / FontPool.SUPERSAMPLE
+    sizes = np.arange(13, 15 + step / 2, step)
+    masks = [_render(pool, cache, size, font_path=font_path) for size in sizes]
+
+    for (a, a_origin), (b, b_origin), size in zip(masks, masks[1:], sizes[1:]):
+        same = a.shape == b.shape and a_origin == b_origin and np.array_equal(a, b)
+        assert not same, f"{size - step} 与 {size} 渲染结果相同"
+
+
+def test_sizes_snap_to_supersample_step():
+    """同一量化字号共用字体和掩码"""
+    pool = FontPool()
+    _, key_a = pool.get_font(None, 13.2, 0, FontPool.SUPERSAMPLE)
+    _, key_b = pool.get_font(None, 13.3, 0, FontPool.SUPERSAMPLE)
+    assert key_a == key_b
+    assert key_a[2] == 13.25
+
+
+def test_supersampled_mask_matches_plain_render_size():
+    """超采样掩码缩回原字号后，尺寸与直接渲染相当"""
+    pool, cache = FontPool(), GlyphMaskCache()
+    plain_font, plain_key = pool.get_font(None, 24)
+    plain, _ = cache.get_mask(plain_font, plain_key, "Settings")
+    sampled, _ = _render(pool, cache, 24, "Settings")
+
+    assert abs(plain.shape[0] - sampled.shape[0]) <= 2
+    assert abs(plain.shape[1] - sampled.shape[1]) <= 2
@@ -0,0 +1,123 @@
+"""
+混排字号：标点不能把一行拆成多个字号，真正的大小字混排仍按片段拟合
+"""
+import cv2
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw, ImageFont
+
+from utils.fit_memo import FitMemo
+from utils.font_fitter import FontFitter
+
+
+def _load(font_path, size):
+    if font_path:
+        return ImageFont.truetype(font_path, size)
+    return ImageFont.load_default(size)
+
+
+def _render_line(font_path, parts, scale=4):
+    """把 [(文字, 字号), ...] 按同一基线排成一行（scale 倍渲染后缩小），返回图片和OCR式文字框"""
+    canvas = Image.new('L', (600 * scale, 120 * scale), 255)
+    draw = ImageDraw.Draw(canvas)
+    x, boxes = 20 * scale, []
+    for text, size in parts:
+        font = _load(font_path, size * scale)
+        draw.text((x, 80 * scale), text, fill=0, font=font, anchor='ls')
+        boxes.append(draw.textbbox((x, 80 * scale), text, font=font, anchor='ls'))
+        x += font.getlength(text) + 2 * scale
+
+    image = cv2.resize(np.array(canvas), (600, 120), interpolation=cv2.INTER_AREA)
+    left, top = min(b[0] for b in boxes) / scale, min(b[1] for b in boxes) / scale
+    right, bottom = max(b[2] for b in boxes) / scale, max(b[3] for b in boxes) / scale
+    bbox = {"x": int(left) - 3, "y": int(top) - 4, "width": int(right - left) + 6, "height": int(bottom - top) + 8}
+    return cv2.cvtColor(image, cv2.COLOR_GRAY2BGR), bbox
+
+
+@pytest.fixture
+def fitter():
+    return FontFitter(memo=FitMemo())
+
+
+@pytest.mark.parametrize("text", ["Don't stop", "It's 5 o'clock"])
+def test_punctuation_does_not_split_line(fitter, text):
+    """撇号等标点不参与分组：整行仍是单一字号"""
+    image, bbox = _render_line(fitter.font_path, [(text, 16)])
+    result = fitter.fit_regions(image, [{"text": text, "bbox": bbox}])[0]
+
+    assert 'spans' not in result
+    assert result['search_strategy'] != 'spans'
+    assert abs(result['font_size'] - 16) <= 1
+
+
+@pytest.mark.parametrize("parts", [
+    [("128", 40), ("USD", 14)],
+    [("99", 40), ("%", 14)],
+    [("128", 40), ("kg", 14)],
+    [("3", 40), ("min", 14)],
+    [("¥", 14), ("128", 40)],
+])
+def test_mixed_size_line_is_split(fitter, parts):
+    """大号数字 + 小号单位（单位只有一个字形也可以）：按片段返回各自的字号"""
+    text = ''.join(part for part, _ in parts)
+    image, bbox = _render_line(fitter.font_path, parts)
+    result = fitter.fit_regions(image, [{"text": text, "bbox": bbox}])[0]
+
+    assert result['search_strategy'] == 'spans'
+    assert [span['text'] for span in result['spans']] == [part for part, _ in parts]
+    for span, (_, size) in zip(result['spans'], parts):
+        assert abs(span['font_size'] - size) <= 1.5
+
+
+def test_single_glyph_unit_forms_own_span(fitter):
+    """高度可靠的单个字形（价格后的"元"）自成一个片段"""
+    image, bbox = _render_line(fitter.font_path, [("128", 40), ("元", 14)])
+    binary = FontFitter.binarize(image)
+    x, y, w, h = bbox['x'], bbox['y'], bbox['width'], bbox['height']
+    glyphs = fitter.glyph_estimator.estimate(binary[y:y + h, x:x + w], "128元")
+
+    assert glyphs['mixed']
+    assert [span['text'] for span in glyphs['spans']] == ["128", "元"]
+
+    result = fitter.fit_regions(image, [{"text": "128元", "bbox": bbox}])[0]
+    assert result['search_strategy'] == 'spans'
+    assert abs(result['spans'][0]['font_size'] - 40) <= 1
+
+
+def test_mixed_size_line_costs_no_more_than_its_spans(fitter):
+    """混排行只做逐片段拟合（以连通域估计为初值），不再额外搜索整行单一字号"""
+    parts = [("128", 40), ("USD", 14)]
+    image, bbox = _render_line(fitter.font_path, parts)
+    result = fitter.fit_regions(image, [{"text": "128USD", "bbox": bbox}])[0]
+
+    separate = 0
+    for text, size in parts:
+        span_image, span_bbox = _render_line(fitter.font_path, [(text, size)])
+        own = FontFitter(font_path=fitter.font_path, memo=FitMemo())
+        separate += own.fit_regions(span_image, [{"text": text, "bbox": span_bbox}])[0]['evaluations']
+
+    assert result['search_strategy'] == 'spans'
+    assert result['evaluations'] <= separate
+
+
+def test_overlay_draws_spans_at_their_own_sizes(fitter, tmp_path):
+    """叠加图按各片段自己的字号和偏移绘制，与原图文字重合"""
+    image, bbox = _render_line(fitter.font_path, [("128", 40), ("USD", 14)])
+    result = fitter.fit_regions(image, [{"text": "128USD", "bbox": bbox}])[0]
+    region = {
+        "text": "128USD", "bbox": bbox,
+        "fitted_font_size": result['font_size'],
+        "fitted_baseline": result['baseline_offset'],
+        "fitted_x_offset": result['x_offset'],
+        "fitted_spans": result['spans']
+    }
+
+    output_path = str(tmp_path / "overlay.png")
+    fitter.render_overlay(np.full_like(image, 255), [region], output_path)
+    overlay = cv2.imread(output_path)
+    drawn = overlay[:, :, 0].astype(int) < 200  # 白底上的半透明红色：蓝色通道变暗
+    ink = FontFitter.binarize(image) > 127
+
+    iou = (drawn & ink).sum() / (drawn | ink).sum()
+    assert iou > 0.75
+    assert len(fitter.overlay_paths([region])) == 1
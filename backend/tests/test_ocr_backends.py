@@ -0,0 +1,94 @@
+"""
+OCR 推理后端：stub 后端跑通完整处理流程；onnx 后端在提供了 PP-OCR 导出模型时做冒烟测试
+
+ONNX 模型目录通过 OCR_ONNX_MODEL_DIR 指定（det.onnx、rec.onnx、dict.txt），未提供时跳过
+"""
+import importlib
+import io
+import os
+
+import cv2
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw, ImageFont
+
+from utils.ocr_backends import OnnxBackend, StubBackend
+from utils.ocr_detector import OCRDetector
+
+
+def _screenshot(lines, width=1290, line_height=120, font_size=48):
+    """白底黑字的若干行文字，模拟一张UI截图"""
+    image = Image.new('RGB', (width, line_height * (len(lines) + 1)), 'white')
+    draw = ImageDraw.Draw(image)
+    font = ImageFont.load_default(font_size)
+    for index, text in enumerate(lines):
+        draw.text((60, line_height // 2 + index * line_height), text, fill='black', font=font)
+    return image
+
+
+@pytest.fixture(scope='module')
+def stub_app(tmp_path_factory):
+    """以 stub 后端导入 app：串行拟合、不缓存OCR结果、可视化产物随处理一并渲染"""
+    workdir = tmp_path_factory.mktemp('stub_app')
+    with pytest.MonkeyPatch.context() as patch:
+        patch.chdir(workdir)
+        for key, value in {
+            "OCR_BACKEND": "stub", "OCR_PRELOAD": "0", "OCR_CACHE_MAX_MB": "0",
+            "FIT_WORKERS": "1", "FIT_BACKEND": "thread", "RENDER_MODE": "eager"
+        }.items():
+            patch.setenv(key, value)
+        app_module = importlib.import_module('app')
+        # send_file 的相对路径按 app 根目录解析，产物写在工作目录下
+        patch.setattr(app_module.app, 'root_path', str(workdir))
+        yield app_module
+
+
+def test_stub_backend_is_deterministic():
+    image = cv2.cvtColor(np.array(_screenshot(["Hello128", "Total199"])), cv2.COLOR_RGB2BGR)
+    backend = StubBackend(OCRDetector.OCR_PARAMS)
+
+    first, second = backend.predict(image), backend.predict(image)
+    assert len(first['dt_polys']) == 2
+    assert first['rec_texts'] == second['rec_texts']
+    assert all(np.array_equal(a, b) for a, b in zip(first['dt_polys'], second['dt_polys']))
+
+
+def test_pipeline_runs_on_stub_backend(stub_app):
+    buffer = io.BytesIO()
+    _screenshot(["Hello128", "Total199", "Settings"]).save(buffer, 'PNG')
+    client = stub_app.app.test_client()
+
+    response = client.post('/api/process', data={"image": (io.BytesIO(buffer.getvalue()), 'screen.png')})
+    result = response.get_json()
+
+    assert response.status_code == 200 and result['success']
+    regions = result['text_regions']
+    assert len(regions) == 3
+    for region in regions:
+        assert region['fitted_font_size']
+        assert set(region['fitted_font_sizes']) == {str(width) for width in stub_app.NORMALIZE_LEVELS}
+    for url in result['images'].values():
+        if url:
+            assert client.get(url).status_code == 200
+
+
+ONNX_MODEL_DIR = os.environ.get('OCR_ONNX_MODEL_DIR')
+
+
+@pytest.mark.skipif(
+    not ONNX_MODEL_DIR or not all(
+        os.path.exists(os.path.join(ONNX_MODEL_DIR, name)) for name in ('det.onnx', 'rec.onnx', 'dict.txt')
+    ),
+    reason="未提供 PP-OCR 导出的 ONNX 模型（OCR_ONNX_MODEL_DIR）"
+)
+def test_onnx_backend_smoke():
+    pytest.importorskip('onnxruntime')
+    image = cv2.cvtColor(np.array(_screenshot(["Hello128", "Total199"])), cv2.COLOR_RGB2BGR)
+    backend = OnnxBackend(OCRDetector.OCR_PARAMS, model_dir=ONNX_MODEL_DIR)
+
+    result = backend.predict(image)
+
+    assert result is not None
+    assert len(result['dt_polys']) == 2
+    assert result['rec_texts'] == ["Hello128", "Total199"]
+    assert all(score > 0.5 for score in result['rec_scores'])
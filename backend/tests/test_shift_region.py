@@ -0,0 +1,29 @@
+"""
+区域平移：条带/修订之间搬运区域时，所有整页坐标都要跟着移动
+"""
+from utils.ocr_tiling import shift_region
+
+
+def test_shift_region_moves_fitted_spans():
+    region = {
+        "bbox": {"x": 10, "y": 100, "width": 80, "height": 30},
+        "center": {"x": 50, "y": 115},
+        "polygon": [[10, 100], [90, 100], [90, 130], [10, 130]],
+        "fitted_spans": [
+            {"text": "128", "font_size": 40.0, "bbox": {"x": 12.0, "y": 102.0, "width": 50.0, "height": 28.0}},
+            {"text": "USD", "font_size": 14.0, "bbox": {"x": 64.0, "y": 120.0, "width": 24.0, "height": 10.0}}
+        ]
+    }
+
+    shift_region(region, -100)
+
+    assert region['bbox']['y'] == 0
+    assert region['center']['y'] == 15
+    assert region['polygon'][0] == [10, 0]
+    assert [span['bbox']['y'] for span in region['fitted_spans']] == [2.0, 20.0]
+    assert [span['bbox']['x'] for span in region['fitted_spans']] == [12.0, 64.0]
+
+
+def test_shift_region_without_spans():
+    region = {"bbox": {"x": 0, "y": 5, "width": 1, "height": 1}, "center": {"x": 0, "y": 5}, "polygon": []}
+    assert shift_region(region, 3)['bbox']['y'] == 8
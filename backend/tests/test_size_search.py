@@ -0,0 +1,94 @@
+"""
+字号搜索策略：黄金分割在渲染样本上不能比网格搜索差
+"""
+import cv2
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw, ImageFont
+
+from utils.bitmask import PackedMask
+from utils.font_fitter import FontFitter
+from utils.size_search import GoldenSectionSearch, GridSearch
+
+SAMPLES = [
+    ("Hello World", 14),
+    ("Hello World", 28),
+    ("Settings", 16),
+    ("12:45", 24),
+    ("Total 199", 40),
+    ("OK", 11),
+]
+
+
+def _load(font_path, size):
+    if font_path:
+        return ImageFont.truetype(font_path, size)
+    return ImageFont.load_default(size)
+
+
+def _sample_evaluate(fitter, text, size, scale=4):
+    """按 scale 倍渲染后缩小（模拟高分屏截图），返回该样本上的字号评估函数"""
+    font = _load(fitter.font_path, size * scale)
+    canvas = Image.new('L', (400 * scale, 120 * scale), 255)
+    ImageDraw.Draw(canvas).text((20 * scale, 40 * scale), text, fill=0, font=font)
+    image = cv2.resize(np.array(canvas), (400, 120), interpolation=cv2.INTER_AREA)
+
+    left, top, right, bottom = [v / scale for v in font.getbbox(text)]
+    x, y = int(20 + left) - 2, int(40 + top) - 3
+    w, h = int(right - left) + 4, int(bottom - top) + 6
+
+    binary = FontFitter.binarize(image)
+    y_start, y_end, x_start, x_end = fitter._region_bounds({"x": x, "y": y, "width": w, "height": h}, binary.shape)
+    text_binary = binary[y_start:y_end, x_start:x_end]
+    target_mask = (text_binary > 127).astype(np.float32)
+    target_count = PackedMask.from_array(text_binary).count
+
+    return lambda font_size: fitter._evaluate_font_size(
+        text, font_size, target_mask, target_count, (x_start, y_start), (x, y, w, h)
+    )
+
+
+@pytest.fixture(scope='module')
+def fitter():
+    return FontFitter()
+
+
+@pytest.mark.parametrize("text,size", SAMPLES)
+def test_golden_matches_grid_iou(fitter, text, size):
+    """全范围搜索时黄金分割的最优IoU不低于网格搜索（最优IoU几轮不变时不能提前退出）"""
+    evaluate = _sample_evaluate(fitter, text, size)
+    grid = GridSearch().search(evaluate, 8, 100, quantize=fitter._quantize_size)
+    golden = GoldenSectionSearch().search(evaluate, 8, 100, quantize=fitter._quantize_size)
+
+    assert golden['iou'] >= grid['iou']
+    assert golden['evaluations'] < grid['evaluations']
+    assert abs(golden['font_size'] - size) <= 1
+
+
+@pytest.mark.parametrize("text,size", SAMPLES)
+def test_evaluations_count_distinct_rendered_sizes(fitter, text, size):
+    """渲染结果相同的字号（量化后相同）只评估、只计数一次"""
+    evaluate = _sample_evaluate(fitter, text, size)
+    rendered = []
+
+    def counting(font_size):
+        rendered.append(fitter._quantize_size(font_size))
+        return evaluate(font_size)
+
+    golden = GoldenSectionSearch().search(counting, 8, 100, quantize=fitter._quantize_size)
+    assert golden['evaluations'] == len(rendered) == len(set(rendered))
+
+
+def test_golden_stops_on_plateau():
+    """区间内的探测点都与最优IoU持平时提前结束"""
+    sizes = []
+
+    def flat_top(font_size):
+        sizes.append(font_size)
+        iou = 0.8 if 20 <= font_size <= 40 else 0.8 - 0.02 * min(abs(font_size - 20), abs(font_size - 40))
+        return {"iou": iou, "baseline_offset": 0, "x_offset": 0}
+
+    result = GoldenSectionSearch(polish_radius=0).search(flat_top, 8, 100, quantize=lambda size: round(size * 4) / 4)
+    assert result['iou'] == 0.8
+    # 单靠区间收敛到 0.5px 需要十余轮黄金分割
+    assert result['evaluations'] <= 16
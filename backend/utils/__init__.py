@@ -4,15 +4,57 @@ PixelPerfect Type - Utils Package
 """
 
 from .image_processor import ImageNormalizer
-from .ocr_detector import OCRDetector
+from .ocr_detector import OCRDetector, OCRResult
+from .text_regions import TextRegions
+from .ocr_backends import OCRBackend, PaddleBackend, OnnxBackend, StubBackend
+from .ocr_pool import OCRWorkerPool
+from .ocr_tiling import TiledOCR
+from .ocr_cache import OCRCache
+from .band_cache import BandCache
+from .revision_diff import RevisionDiff
 from .font_fitter import FontFitter
 from .annotator import ResultAnnotator
+from .vector_layers import VectorLayerRenderer
+from .glyph_cache import GlyphMaskCache
+from .bitmask import PackedMask
+from .font_pool import FontPool
+from .fit_memo import FitMemo
+from .size_estimator import MetricSizeEstimator
+from .parallel_fitter import ParallelFitEngine
+from .glyph_estimator import GlyphHeightEstimator
+from .pipeline import PipelineContext
+from .job_queue import JobQueue
+from .size_search import SizeSearchStrategy, GridSearch, GoldenSectionSearch
 
 __all__ = [
     'ImageNormalizer',
     'OCRDetector',
+    'OCRResult',
+    'TextRegions',
+    'OCRBackend',
+    'PaddleBackend',
+    'OnnxBackend',
+    'StubBackend',
+    'OCRWorkerPool',
+    'TiledOCR',
+    'OCRCache',
+    'BandCache',
+    'RevisionDiff',
     'FontFitter',
-    'ResultAnnotator'
+    'ResultAnnotator',
+    'VectorLayerRenderer',
+    'GlyphMaskCache',
+    'PackedMask',
+    'FontPool',
+    'SizeSearchStrategy',
+    'GridSearch',
+    'GoldenSectionSearch',
+    'MetricSizeEstimator',
+    'ParallelFitEngine',
+    'FitMemo',
+    'GlyphHeightEstimator',
+    'PipelineContext',
+    'JobQueue'
 ]
 
 __version__ = '1.0.0'
@@ -5,12 +5,18 @@ View 4: Result Annotation
 from PIL import Image, ImageDraw, ImageFont
 import cv2
 import numpy as np
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple, Union
 
 
 class ResultAnnotator:
     """结果标注器 - 在图片上标注字号信息"""
 
+    # 标签背景内边距
+    LABEL_PADDING = 4
+
+    # 标签布局按行分桶的高度（像素）
+    LAYOUT_BUCKET = 64
+
     def __init__(self):
         self.annotation_color = (0, 120, 255)  # 蓝色
         self.annotation_bg_color = (255, 255, 255)  # 白色背景
@@ -18,7 +24,7 @@ class ResultAnnotator:
 
     def annotate_image(
         self,
-        image_path: str,
+        image: Union[str, np.ndarray],
         text_regions: List[Dict],
         output_path: str,
         show_confidence: bool = True
@@ -27,69 +33,32 @@ class ResultAnnotator:
         在图片上标注字号信息
 
         Args:
-            image_path: 输入图片路径（750px宽度）
+            image: 输入图片路径，或已解码的图片（BGR，750px宽度）
             text_regions: 包含拟合结果的文本区域列表
             output_path: 输出图片路径
             show_confidence: 是否显示拟合质量
         """
         # 使用OpenCV加载图片以便绘制
-        img = cv2.imread(image_path)
-        if img is None:
-            raise ValueError(f"无法加载图片: {image_path}")
-
-        for region in text_regions:
-            if not region.get('fitted_font_size'):
-                continue
-
-            font_size = region['fitted_font_size']
-            fit_quality = region.get('fit_quality', 0)
-            bbox = region['bbox']
-            text_content = region['text']
-
-            # 标注文本
-            if show_confidence:
-                label = f"{font_size}px (Q:{fit_quality:.2f})"
-            else:
-                label = f"{font_size}px"
-
-            # 计算标注位置（文字框上方）
-            x = int(bbox['x'])
-            y = int(bbox['y'])
-
-            # 绘制标签背景
-            label_size = cv2.getTextSize(
-                label,
-                cv2.FONT_HERSHEY_SIMPLEX,
-                0.5,
-                1
-            )[0]
+        if isinstance(image, str):
+            img = cv2.imread(image)
+            if img is None:
+                raise ValueError(f"无法加载图片: {image}")
+        else:
+            img = image.copy()
 
-            # 背景矩形
-            padding = 4
-            bg_x1 = x
-            bg_y1 = y - label_size[1] - padding * 2 - 5
-            bg_x2 = x + label_size[0] + padding * 2
-            bg_y2 = y - 5
+        for item in self.layout_labels(text_regions, show_confidence):
+            bbox = item['region']['bbox']
+            bg_x1, bg_y1, bg_x2, bg_y2 = item['rect']
+            line = item['line']
 
-            # 确保不越界
-            bg_y1 = max(0, bg_y1)
-
-            # 绘制半透明背景
-            overlay = img.copy()
-            cv2.rectangle(
-                overlay,
-                (bg_x1, bg_y1),
-                (bg_x2, bg_y2),
-                self.annotation_bg_color,
-                -1
-            )
-            img = cv2.addWeighted(overlay, 0.7, img, 0.3, 0)
+            # 绘制半透明背景（只混合标签所在区域）
+            self._blend_rect(img, (bg_x1, bg_y1), (bg_x2, bg_y2), self.annotation_bg_color, 0.7)
 
             # 绘制文本
             cv2.putText(
                 img,
-                label,
-                (x + padding, y - padding - 5),
+                item['label'],
+                item['origin'],
                 cv2.FONT_HERSHEY_SIMPLEX,
                 0.5,
                 self.annotation_color,
@@ -100,8 +69,8 @@ class ResultAnnotator:
             # 绘制指示线
             cv2.line(
                 img,
-                (x, bg_y2),
-                (x, y),
+                line[0],
+                line[1],
                 self.annotation_color,
                 1,
                 cv2.LINE_AA
@@ -122,6 +91,131 @@ class ResultAnnotator:
         # 保存结果
         cv2.imwrite(output_path, img, [cv2.IMWRITE_JPEG_QUALITY, 95])
 
+    def layout_labels(self, text_regions: List[Dict], show_confidence: bool = True) -> List[Dict]:
+        """
+        计算所有字号标签的文字和位置（栅格标注和矢量图层共用）
+
+        Returns:
+            List[Dict]: [{"region", "label", "rect": (x1, y1, x2, y2), "line": 指示线两端点,
+            "origin": 文字基线起点}, ...]，只包含已拟合的区域
+        """
+        placed: Dict[int, List[Tuple[int, int, int, int]]] = {}
+        items = []
+        for region in text_regions:
+            if not region.get('fitted_font_size'):
+                continue
+
+            font_size = region['fitted_font_size']
+            fit_quality = region.get('fit_quality', 0)
+
+            # 标注文本
+            if show_confidence and fit_quality is not None:
+                label = f"{font_size}px (Q:{fit_quality:.2f})"
+            else:
+                label = f"{font_size}px"
+
+            label_size = cv2.getTextSize(
+                label,
+                cv2.FONT_HERSHEY_SIMPLEX,
+                0.5,
+                1
+            )[0]
+
+            # 背景矩形与指示线（默认在文字框上方，与已放置的标签重叠时另找位置）
+            rect, line = self._place_label(region['bbox'], label_size, placed)
+            items.append({
+                "region": region,
+                "label": label,
+                "rect": rect,
+                "line": line,
+                "origin": (rect[0] + self.LABEL_PADDING, rect[3] - self.LABEL_PADDING)
+            })
+        return items
+
+    def _place_label(
+        self,
+        bbox: Dict,
+        label_size: Tuple[int, int],
+        placed: Dict[int, List[Tuple[int, int, int, int]]]
+    ) -> Tuple[Tuple[int, int, int, int], Tuple[Tuple[int, int], Tuple[int, int]]]:
+        """
+        为标签选择不与已放置标签重叠的位置，并记录下来
+
+        依次尝试：文字框上方（原有位置）、文字框下方、沿重叠标签继续向上；
+        都放不下时退回文字框上方。已放置的标签按行分桶，只检查相邻的桶。
+
+        Returns:
+            (背景矩形 (x1, y1, x2, y2), 指示线两端点)
+        """
+        padding = self.LABEL_PADDING
+        x, y = int(bbox['x']), int(bbox['y'])
+        bottom = int(bbox['y']) + int(bbox['height'])
+        label_w = label_size[0] + padding * 2
+        label_h = label_size[1] + padding * 2
+
+        above = (x, max(0, y - label_h - 5), x + label_w, y - 5)
+        candidates = [(above, ((x, y - 5), (x, y)))]
+        below = (x, bottom + 5, x + label_w, bottom + 5 + label_h)
+        candidates.append((below, ((x, bottom), (x, bottom + 5))))
+
+        chosen = None
+        for rect, line in candidates:
+            if self._find_overlap(rect, placed) is None:
+                chosen = (rect, line)
+                break
+
+        if chosen is None:
+            # 沿重叠的标签逐个向上让位
+            rect = above
+            while rect[1] > 0:
+                blocker = self._find_overlap(rect, placed)
+                if blocker is None:
+                    chosen = (rect, ((x, rect[3]), (x, y)))
+                    break
+                rect_bottom = blocker[1] - 1
+                rect = (x, rect_bottom - label_h, x + label_w, rect_bottom)
+                if rect[1] < 0:
+                    break
+
+        if chosen is None:
+            chosen = candidates[0]
+
+        rect = chosen[0]
+        for bucket in range(rect[1] // self.LAYOUT_BUCKET, rect[3] // self.LAYOUT_BUCKET + 1):
+            placed.setdefault(bucket, []).append(rect)
+        return chosen
+
+    def _find_overlap(
+        self,
+        rect: Tuple[int, int, int, int],
+        placed: Dict[int, List[Tuple[int, int, int, int]]]
+    ) -> Optional[Tuple[int, int, int, int]]:
+        """返回与 rect 重叠的已放置标签（没有则为 None）"""
+        x1, y1, x2, y2 = rect
+        for bucket in range(y1 // self.LAYOUT_BUCKET, y2 // self.LAYOUT_BUCKET + 1):
+            for other in placed.get(bucket, ()):
+                if x1 <= other[2] and other[0] <= x2 and y1 <= other[3] and other[1] <= y2:
+                    return other
+        return None
+
+    @staticmethod
+    def _blend_rect(img: np.ndarray, pt1: Tuple[int, int], pt2: Tuple[int, int], color, alpha: float):
+        """
+        在矩形区域内混合纯色：与整图 cv2.rectangle + cv2.addWeighted 的结果一致，
+        但只处理矩形覆盖的像素（端点含在内，越界部分裁掉）
+        """
+        height, width = img.shape[:2]
+        x1, x2 = sorted((pt1[0], pt2[0]))
+        y1, y2 = sorted((pt1[1], pt2[1]))
+        x1, y1 = max(0, x1), max(0, y1)
+        x2, y2 = min(width - 1, x2), min(height - 1, y2)
+        if x1 > x2 or y1 > y2:
+            return
+        roi = img[y1:y2 + 1, x1:x2 + 1]
+        fill = np.empty_like(roi)
+        fill[:] = color
+        cv2.addWeighted(fill, alpha, roi, 1 - alpha, 0, dst=roi)
+
     def generate_report(self, text_regions: List[Dict]) -> Dict:
         """
         生成字号分析报告
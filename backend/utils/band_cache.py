@@ -0,0 +1,223 @@
+"""
+条带级结果复用
+同一套截图中的状态栏、导航栏、标签栏、页头等区域完全相同。
+把标准化后的图片在空白行处切成水平条带，按条带像素哈希记录OCR区域和拟合结果，
+新上传的截图只有变化了的条带需要重新识别和拟合
+"""
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+import copy
+import hashlib
+import json
+import threading
+import numpy as np
+
+from .ocr_detector import OCRResult
+from .ocr_tiling import shift_region
+
+
+def quiet_rows(image: np.ndarray, tolerance: int = 3) -> np.ndarray:
+    """每一行是否为纯色行（整行像素差不超过 tolerance），返回布尔数组"""
+    rows = image.reshape(image.shape[0], -1)
+    return (rows.max(axis=1).astype(np.int16) - rows.min(axis=1)) <= tolerance
+
+
+def split_content_bands(image: np.ndarray, min_height: int = 32, tolerance: int = 3) -> List[Tuple[int, int]]:
+    """
+    在纯色行（整行像素差不超过 tolerance）处切分图片
+
+    切口取每段连续纯色行的中点，保证不会切到文字；
+    低于 min_height 的条带并入上一个条带，状态栏这类窄条也能独立成带。
+
+    Returns:
+        List[Tuple[int, int]]: [(y_start, y_end), ...]，覆盖整页且互不重叠
+    """
+    height = image.shape[0]
+    quiet = quiet_rows(image, tolerance)
+
+    cuts = []
+    y = 0
+    while y < height:
+        if not quiet[y]:
+            y += 1
+            continue
+        start = y
+        while y < height and quiet[y]:
+            y += 1
+        if start > 0 and y < height:
+            cuts.append((start + y) // 2)
+
+    bands = []
+    y_start = 0
+    for cut in cuts + [height]:
+        if cut - y_start < min_height and bands:
+            # 太窄：并入上一个条带
+            bands[-1] = (bands[-1][0], cut)
+        elif cut > y_start:
+            bands.append((y_start, cut))
+        y_start = cut
+    return bands
+
+
+class BandCache:
+    """条带哈希 -> 条带内的文本区域（含拟合结果，条带坐标系）；LRU，线程安全，跨请求保留"""
+
+    def __init__(self, params: Dict, max_entries: int = 2048, min_height: int = 32):
+        """
+        Args:
+            params: 影响识别和拟合结果的参数（OCR参数、模型版本、字体等），参与缓存键计算
+            max_entries: 最多记录的条带数，超出后淘汰最久未使用的
+            min_height: 条带最小高度
+        """
+        self.max_entries = max_entries
+        self.min_height = min_height
+        self._params_digest = hashlib.sha256(
+            json.dumps(params, sort_keys=True, default=str).encode('utf-8')
+        ).hexdigest()
+        self._entries: "OrderedDict[str, List[Dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, band: np.ndarray, fit_mode: str) -> str:
+        """条带的缓存键：像素内容（精确哈希）+ 参数 + 拟合模式"""
+        digest = hashlib.sha256()
+        digest.update(f"{self._params_digest}|{fit_mode}|{band.shape}".encode('ascii'))
+        digest.update(np.ascontiguousarray(band).data)
+        return digest.hexdigest()
+
+    def detect(self, image: np.ndarray, engine, fit_mode: str) -> Tuple[OCRResult, List[Dict]]:
+        """
+        识别整页：命中的条带直接取缓存，连续未命中的条带合并成一段交给 engine 识别
+
+        Args:
+            image: 标准化后的图片（BGR）
+            engine: 提供 detect(image) -> OCRResult 的对象
+            fit_mode: 拟合模式
+
+        Returns:
+            Tuple[OCRResult, List[Dict]]: (整页识别结果, 条带列表)
+            命中条带中的区域带有拟合结果和 from_band_cache=True；
+            条带为 {"index", "y", "height", "cached", "key"}
+        """
+        bands = []
+        cached_regions = []
+        for index, (y_start, y_end) in enumerate(split_content_bands(image, self.min_height)):
+            key = self.key(image[y_start:y_end], fit_mode)
+            regions = self._get(key)
+            bands.append({
+                "index": index, "y": y_start, "height": y_end - y_start,
+                "cached": regions is not None, "key": key
+            })
+            for region in regions or []:
+                region['from_band_cache'] = True
+                cached_regions.append(shift_region(region, y_start))
+
+        # 连续未命中的条带合并成一段识别，减少调用次数，也给OCR留出上下文
+        spans = []
+        for band in bands:
+            if band['cached']:
+                continue
+            if spans and spans[-1][1] == band['y']:
+                spans[-1] = (spans[-1][0], band['y'] + band['height'])
+            else:
+                spans.append((band['y'], band['y'] + band['height']))
+
+        detected_regions = []
+        span_results = []
+        for y_start, y_end in spans:
+            span_result = engine.detect(image[y_start:y_end])
+            span_results.append(((y_start, y_end), span_result))
+            detected_regions.extend(shift_region(region, y_start) for region in span_result.regions)
+
+        regions = sorted(cached_regions + detected_regions, key=lambda r: (r['bbox']['y'], r['bbox']['x']))
+        for idx, region in enumerate(regions):
+            region['id'] = f"text_{idx}"
+
+        result = OCRResult(
+            regions=regions,
+            preprocessed_img=self._patch_preprocessed(image, span_results),
+            queue_wait=sum(r.queue_wait for _, r in span_results),
+            inference_time=sum(r.inference_time for _, r in span_results),
+            tiles=sum(r.tiles for _, r in span_results)
+        )
+        return result, bands
+
+    def store(self, bands: List[Dict], regions: List[Dict]):
+        """
+        拟合完成后记录未命中的条带；区域按中心点归属条带，
+        条带内有拟合失败的区域时不记录，下次重新拟合
+        """
+        grouped: Dict[int, List[Dict]] = {band['index']: [] for band in bands if not band['cached']}
+        failed = set()
+        for region in regions:
+            band = self._band_of(bands, region['center']['y'])
+            if band is None or band['index'] not in grouped:
+                continue
+            if region.get('fitted_font_size') is None:
+                failed.add(band['index'])
+            local = copy.deepcopy(region)
+            local.pop('from_band_cache', None)
+            grouped[band['index']].append(shift_region(local, -band['y']))
+
+        for band in bands:
+            if band['index'] in grouped and band['index'] not in failed:
+                self._put(band['key'], grouped[band['index']])
+
+    @staticmethod
+    def _band_of(bands: List[Dict], y: float) -> Optional[Dict]:
+        for band in bands:
+            if band['y'] <= y < band['y'] + band['height']:
+                return band
+        return None
+
+    @staticmethod
+    def _patch_preprocessed(image: np.ndarray, span_results: List) -> Optional[np.ndarray]:
+        """
+        用各段的预处理图片（尺寸不变时）覆盖标准化图片的对应行，得到整页工作图（RGB）；
+        所有段都没有预处理图片时返回 None
+        """
+        if all(r.preprocessed_img is None for _, r in span_results):
+            return None
+
+        patched = np.ascontiguousarray(image[:, :, ::-1])
+        for (y_start, y_end), span_result in span_results:
+            span_img = span_result.preprocessed_img
+            if span_img is not None and span_img.shape == (y_end - y_start,) + image.shape[1:]:
+                patched[y_start:y_end] = span_img
+        return patched
+
+    def _get(self, key: str) -> Optional[List[Dict]]:
+        with self._lock:
+            regions = self._entries.get(key)
+            if regions is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            # 调用方会修改区域（平移、编号），返回副本
+            return copy.deepcopy(regions)
+
+    def _put(self, key: str, regions: List[Dict]):
+        with self._lock:
+            self._entries[key] = regions
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict:
+        """返回命中统计"""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses
+            }
+
+    def clear(self):
+        """清空记录和计数"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
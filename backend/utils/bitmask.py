@@ -0,0 +1,59 @@
+"""
+位压缩二值掩码
+每像素1 bit，交集/并集通过按字节 popcount 计算
+"""
+import numpy as np
+from typing import Optional, Tuple
+
+
+if hasattr(np, 'bitwise_count'):
+    # NumPy >= 2.0 自带 popcount
+    def popcount(packed: np.ndarray) -> int:
+        """统计位压缩数组中1的个数"""
+        return int(np.bitwise_count(packed).sum(dtype=np.int64))
+else:
+    _POPCOUNT_TABLE = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+    def popcount(packed: np.ndarray) -> int:
+        """统计位压缩数组中1的个数"""
+        return int(_POPCOUNT_TABLE[packed].sum(dtype=np.int64))
+
+
+class PackedMask:
+    """按行位压缩的二值掩码（np.packbits，axis=1）"""
+
+    __slots__ = ('bits', 'shape', 'count')
+
+    def __init__(self, bits: np.ndarray, shape: Tuple[int, int], count: Optional[int] = None):
+        self.bits = bits
+        self.shape = tuple(shape)
+        self.count = popcount(bits) if count is None else count
+
+    @classmethod
+    def from_array(cls, image: np.ndarray, threshold: int = 127) -> 'PackedMask':
+        """由 uint8 图像（>threshold 为前景）构建"""
+        return cls(np.packbits(image > threshold, axis=1), image.shape[:2])
+
+    def iou(self, other: 'PackedMask') -> float:
+        """与同尺寸掩码的 IoU"""
+        if self.shape != other.shape:
+            return 0.0
+
+        intersection = popcount(self.bits & other.bits)
+        union = self.count + other.count - intersection
+        if union == 0:
+            return 0.0
+        return intersection / union
+
+    def crop(self, y_start: int, y_end: int, x_start: int, x_end: int) -> np.ndarray:
+        """解压出一个矩形区域（uint8，前景为255），只解压需要的行"""
+        rows = np.unpackbits(self.bits[y_start:y_end], axis=1, count=self.shape[1])
+        return rows[:, x_start:x_end] * np.uint8(255)
+
+    def to_array(self) -> np.ndarray:
+        """完整解压（仅用于可视化）"""
+        return self.crop(0, self.shape[0], 0, self.shape[1])
+
+    @property
+    def nbytes(self) -> int:
+        return self.bits.nbytes
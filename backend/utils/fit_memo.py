@@ -0,0 +1,81 @@
+"""
+拟合结果备忘录
+界面中大量重复的文字（列表项、"¥"、标签栏、时间戳）不必每次从头搜索
+"""
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Tuple
+import threading
+
+
+class FitMemo:
+    """按 (文字, 量化后的框高, 字体) 记录拟合出的字号（LRU，线程安全，跨请求保留）"""
+
+    def __init__(self, max_entries: int = 4096, height_quantum: float = 2.0, min_quality: float = 0.5):
+        """
+        Args:
+            max_entries: 最多记录的条目数，超出后淘汰最久未使用的
+            height_quantum: 框高量化步长（像素），OCR框高度的小幅抖动视为同一条目
+            min_quality: 拟合质量低于该值的结果不记录
+        """
+        self.max_entries = max_entries
+        self.height_quantum = height_quantum
+        self.min_quality = min_quality
+        self._entries: "OrderedDict[Hashable, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.rejected = 0  # 命中但复核未通过
+
+    def key(self, text: str, bbox: Dict, font_key: Tuple) -> Tuple:
+        """生成备忘录键"""
+        return (text, round(bbox['height'] / self.height_quantum), *font_key)
+
+    def get(self, key: Tuple) -> Optional[Dict]:
+        """查询记录，返回 {"font_size", "fit_quality"} 或 None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: Tuple, font_size: float, fit_quality: float):
+        """记录一次完整搜索的结果"""
+        if font_size is None or fit_quality is None or fit_quality < self.min_quality:
+            return
+
+        with self._lock:
+            self._entries[key] = {"font_size": font_size, "fit_quality": fit_quality}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def reject(self):
+        """命中的记录在新位置上复核未通过"""
+        with self._lock:
+            self.rejected += 1
+
+    def stats(self) -> Dict:
+        """返回命中统计"""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "rejected": self.rejected
+            }
+
+    def clear(self):
+        """清空记录和计数"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.rejected = 0
+
+
+# 进程级共享备忘录：跨请求保留
+fit_memo = FitMemo()
@@ -2,25 +2,56 @@
 View 3: Visual Regression & Fitting
 核心字号拟合算法 - 通过像素重合度自动确定最佳字号
 """
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image
 import numpy as np
 import cv2
-from typing import Dict, Tuple, Optional
+from typing import Callable, Dict, List, Tuple, Optional, Union
 import os
 
+from .bitmask import PackedMask
+from .glyph_cache import GlyphMaskCache, glyph_cache, place_mask
+from .font_pool import FontPool, font_pool
+from .fit_memo import FitMemo, fit_memo
+from .size_search import SizeSearchStrategy, get_search_strategy
+from .size_estimator import MetricSizeEstimator
+from .glyph_estimator import GlyphHeightEstimator
+
 
 class FontFitter:
     """字号拟合器 - 自动确定UI中文字的实际字号"""
 
-    def __init__(self, font_path: Optional[str] = None):
+    def __init__(
+        self,
+        font_path: Optional[str] = None,
+        mask_cache: Optional[GlyphMaskCache] = None,
+        fonts: Optional[FontPool] = None,
+        search_strategy: Union[str, SizeSearchStrategy, None] = None,
+        memo: Optional[FitMemo] = None
+    ):
         """
         初始化字号拟合器
 
         Args:
             font_path: PingFang SC 字体文件路径，如果为None则使用系统默认字体
+            mask_cache: 文字掩码缓存，默认使用进程级共享缓存
+            fonts: 字体池，默认使用进程级共享字体池
+            search_strategy: 字号搜索策略，'golden'（默认）或 'grid'，也可传入策略实例
+            memo: 拟合结果备忘录，默认使用进程级共享备忘录
         """
         self.font_path = font_path or self._get_default_font()
+        self.font_index = 0  # TTC字体使用的face索引
+        self.mask_cache = mask_cache or glyph_cache
+        self.fonts = fonts or font_pool
+        self.search_strategy = get_search_strategy(search_strategy)
+        self.estimator = MetricSizeEstimator(self.font_path, self.font_index, self.fonts)
+        self.glyph_estimator = GlyphHeightEstimator(self.font_path, self.font_index, self.fonts)
+        self.seed_window = 0.25  # 以度量预测值为中心的搜索窗口（±25%）
+        self.span_ratio = 1.2  # 逐片段拟合出的相邻字号之比达到该值才按混排拆分
+        self.memo = memo or fit_memo
+        self.memo_threshold = 0.85  # 备忘录字号在新位置上的IoU达到该值即采用
+        self.memo_margin = 0.03  # 原拟合质量较低时，允许比原质量低这么多
         self.line_height = 1.0  # 固定行高
+        self.max_x_shift_ratio = 0.25  # 水平对齐搜索范围（相对文字框高度）
         self.render_color = (255, 0, 0, 128)  # 红色半透明
 
     def _get_default_font(self) -> str:
@@ -38,6 +69,26 @@ class FontFitter:
         # 如果找不到，返回None，PIL会使用默认字体
         return None
 
+    def _load_font(self, font_size: float):
+        """
+        从字体池获取指定字号的字体（按 FontPool.SUPERSAMPLE 倍超采样，小数字号渲染结果各不相同）
+
+        Returns:
+            Tuple: (字体对象, 掩码缓存使用的字体标识)
+        """
+        return self.fonts.get_font(self.font_path, font_size, self.font_index, self.fonts.SUPERSAMPLE)
+
+    def _quantize_size(self, font_size: float) -> float:
+        """字号量化到实际渲染的步长：量化后相同的字号渲染结果相同，搜索时只评估一次"""
+        return self.fonts.quantize(font_size, self.fonts.SUPERSAMPLE)
+
+    def get_cache_stats(self) -> Dict:
+        """返回文字掩码缓存、字体池和拟合备忘录的统计"""
+        stats = self.mask_cache.stats()
+        stats["font_pool"] = self.fonts.stats()
+        stats["fit_memo"] = self.memo.stats()
+        return stats
+
     def fit_font_size(
         self,
         original_image_path: str,
@@ -45,16 +96,17 @@ class FontFitter:
         bbox: Dict,
         min_size: int = 8,
         max_size: int = 120,
-        tolerance: float = 0.5
+        tolerance: float = 0.5,
+        mode: str = 'accurate'
     ) -> Dict:
         """
         拟合字号的主函数
 
         算法原理：
-        1. 使用二分搜索在合理的字号范围内搜索
-        2. 对每个候选字号，在目标位置渲染文字
+        1. 用字体度量预测字号，按搜索策略（默认黄金分割）在预测值附近的窄窗口内搜索
+        2. 对每个候选字号，在目标位置附近对齐渲染文字
         3. 计算渲染文字与原图文字的重合度（IoU）
-        4. 找到IoU最大的字号
+        4. 找到IoU最大的字号，区间收敛到 tolerance 以内或提前终止
 
         Args:
             original_image_path: 原始图片路径（750px宽度标准化后的）
@@ -62,17 +114,138 @@ class FontFitter:
             bbox: OCR检测到的文字边界框 {"x": ..., "y": ..., "width": ..., "height": ...}
             min_size: 最小字号（像素）
             max_size: 最大字号（像素）
-            tolerance: 收敛容差（像素）
+            tolerance: 收敛容差（像素），搜索区间小于该值时停止
+            mode: 'accurate' 像素IoU拟合；'fast' 只用字体度量估计，不读取图片
 
         Returns:
-            Dict: 拟合结果，包含最佳字号、基线位置、拟合质量等
+            Dict: 拟合结果，包含最佳字号、基线位置、拟合质量、评估次数等
         """
+        if mode == 'fast':
+            return self.estimate_font_size(text, bbox)
+
         # 加载原图
         original_img = cv2.imread(original_image_path)
         if original_img is None:
             raise ValueError(f"无法加载图片: {original_image_path}")
 
-        # 提取文字区域
+        # 只对文字区域做二值化
+        y_start, y_end, x_start, x_end = self._region_bounds(bbox, original_img.shape)
+        text_binary = self.binarize(original_img[y_start:y_end, x_start:x_end])
+
+        return self._fit_target(text_binary, (x_start, y_start), text, bbox, min_size, max_size, tolerance)
+
+    def fit_regions(
+        self,
+        image_array: np.ndarray,
+        regions: List[Dict],
+        min_size: int = 8,
+        max_size: int = 120,
+        tolerance: float = 0.5,
+        mode: str = 'accurate',
+        progress: Optional[Callable[[int, int], None]] = None
+    ) -> List[Dict]:
+        """
+        批量拟合同一张图上的所有文本区域
+
+        整页只二值化一次，各区域直接从共享的二值图中切片，不再逐区域解码图片。
+
+        Args:
+            image_array: 已解码的图片（BGR，750px宽度标准化后的）
+            regions: OCR文本区域列表，每项至少包含 text 和 bbox
+            min_size: 最小字号（像素）
+            max_size: 最大字号（像素）
+            tolerance: 收敛容差（像素）
+            mode: 'accurate' 像素IoU拟合；'fast' 只用字体度量估计
+            progress: 进度回调 (已完成区域数, 区域总数)
+
+        Returns:
+            List[Dict]: 与 regions 一一对应的拟合结果；失败的区域 font_size 为 None，并带有 error 字段
+        """
+        page_binary = self.binarize(image_array) if mode != 'fast' else None
+
+        results = []
+        for region in regions:
+            try:
+                results.append(self.fit_region(
+                    page_binary, region['text'], region['bbox'],
+                    min_size, max_size, tolerance, mode
+                ))
+            except Exception as e:
+                results.append(self.failed_result(region, e))
+            if progress is not None:
+                progress(len(results), len(regions))
+
+        return results
+
+    def fit_region(
+        self,
+        page_binary: Union[np.ndarray, PackedMask, None],
+        text: str,
+        bbox: Dict,
+        min_size: int = 8,
+        max_size: int = 120,
+        tolerance: float = 0.5,
+        mode: str = 'accurate'
+    ) -> Dict:
+        """
+        从整页二值图中切出一个区域并拟合
+
+        Args:
+            page_binary: binarize() 得到的整页二值图，或其位压缩形式（fast 模式可为None）
+            text: 要拟合的文字内容
+            bbox: OCR检测到的文字边界框
+
+        Returns:
+            Dict: 拟合结果，结构同 fit_font_size
+        """
+        if mode == 'fast':
+            return self.estimate_font_size(text, bbox)
+
+        y_start, y_end, x_start, x_end = self._region_bounds(bbox, page_binary.shape)
+        if isinstance(page_binary, PackedMask):
+            text_binary = page_binary.crop(y_start, y_end, x_start, x_end)
+        else:
+            text_binary = page_binary[y_start:y_end, x_start:x_end]
+
+        return self._fit_target(text_binary, (x_start, y_start), text, bbox, min_size, max_size, tolerance)
+
+    def failed_result(self, region: Dict, error: Exception) -> Dict:
+        """拟合失败时的结果"""
+        return {
+            "font_size": None,
+            "baseline_offset": None,
+            "x_offset": None,
+            "fit_quality": 0.0,
+            "evaluations": 0,
+            "search_strategy": None,
+            "from_memo": False,
+            "font_family": "PingFang SC",
+            "line_height": self.line_height,
+            "bbox": region.get('bbox'),
+            "text": region.get('text'),
+            "error": str(error)
+        }
+
+    @staticmethod
+    def binarize(image: np.ndarray) -> np.ndarray:
+        """
+        灰度化并二值化（文字为255）
+
+        Args:
+            image: BGR 或灰度图片
+        """
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+        # 使用自适应阈值以应对不同背景
+        return cv2.adaptiveThreshold(
+            gray, 255,
+            cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+            cv2.THRESH_BINARY_INV,
+            11, 2
+        )
+
+    @staticmethod
+    def _region_bounds(bbox: Dict, shape: Tuple) -> Tuple[int, int, int, int]:
+        """文字框扩展后的裁剪范围 (y_start, y_end, x_start, x_end)"""
         x, y, w, h = int(bbox['x']), int(bbox['y']), int(bbox['width']), int(bbox['height'])
 
         # 扩展区域以包含可能的基线变化（上下各扩展20%）
@@ -81,165 +254,438 @@ class FontFitter:
         x_expand = int(w * expand_ratio)
 
         y_start = max(0, y - y_expand)
-        y_end = min(original_img.shape[0], y + h + y_expand)
+        y_end = min(shape[0], y + h + y_expand)
         x_start = max(0, x - x_expand)
-        x_end = min(original_img.shape[1], x + w + x_expand)
+        x_end = min(shape[1], x + w + x_expand)
 
-        text_region = original_img[y_start:y_end, x_start:x_end]
+        return y_start, y_end, x_start, x_end
 
-        # 转换为灰度图并二值化
-        text_gray = cv2.cvtColor(text_region, cv2.COLOR_BGR2GRAY)
-        # 使用自适应阈值以应对不同背景
-        text_binary = cv2.adaptiveThreshold(
-            text_gray, 255,
-            cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
-            cv2.THRESH_BINARY_INV,
-            11, 2
-        )
+    def _fit_target(
+        self,
+        text_binary: np.ndarray,
+        region_offset: Tuple[int, int],
+        text: str,
+        bbox: Dict,
+        min_size: int,
+        max_size: int,
+        tolerance: float,
+        split_spans: bool = True,
+        seed: Optional[float] = None
+    ) -> Dict:
+        """
+        在已二值化的文字区域上搜索最佳字号
+
+        连通域估计认为一行混排了不同字号时，先以各组字形的估计字号为初值逐片段做像素拟合；
+        拟合出的相邻片段字号确实不同（之比达到 span_ratio）才拆分，否则按单一字号搜索整行。
+        split_spans 为 False 时（拟合片段本身）不再检查混排；seed 为调用方给出的初始字号，
+        给出时跳过连通域估计。
+        """
+        x, y, w, h = int(bbox['x']), int(bbox['y']), int(bbox['width']), int(bbox['height'])
+        if text_binary.size == 0:
+            raise ValueError(f"文字区域超出图片范围: {bbox}")
 
-        # 二分搜索最佳字号
-        best_font_size = None
-        best_iou = 0.0
-        best_baseline_offset = 0
+        # 目标掩码每个区域只准备一次：位压缩形式用于精确计分，浮点形式供互相关使用
+        target = PackedMask.from_array(text_binary)
+        target_mask = (text_binary > 127).astype(np.float32)
 
-        # 先粗略搜索，步长为4px
-        for font_size in range(min_size, max_size, 4):
-            result = self._evaluate_font_size(
-                text, font_size, text_binary, (x_start, y_start), (x, y, w, h)
+        # 按搜索策略在IoU曲线上寻找最佳字号
+        def evaluate(font_size: float) -> Dict:
+            return self._evaluate_font_size(
+                text, font_size, target_mask, target.count, region_offset, (x, y, w, h)
             )
 
-            if result['iou'] > best_iou:
-                best_iou = result['iou']
-                best_font_size = font_size
-                best_baseline_offset = result['baseline_offset']
+        # 同样的文字在相近框高下拟合过：只在新位置复核一次
+        memo_key = self.memo.key(text, bbox, (self.font_path, self.font_index))
+        search = self._verify_memo(memo_key, evaluate)
+        from_memo = search is not None
+
+        if not from_memo:
+            prediction = seed
+            span_evaluations = 0
+            if prediction is None:
+                # 连通域估计：不渲染候选字号，先量出字形高度
+                glyphs = self.glyph_estimator.estimate(
+                    text_binary[max(0, y - region_offset[1]):y - region_offset[1] + h,
+                                max(0, x - region_offset[0]):x - region_offset[0] + w],
+                    text
+                )
+                if glyphs['mixed'] and split_spans:
+                    mixed = self._fit_spans(
+                        glyphs['spans'], text_binary, target, region_offset, bbox, min_size, max_size, tolerance
+                    )
+                    if mixed is not None and self._spans_distinct(mixed['spans']):
+                        return self._mixed_size_result(mixed, text, bbox)
+                    # 片段字号其实相同：以最宽片段的拟合字号为初值按单一字号搜索
+                    if mixed is not None:
+                        span_evaluations = mixed['evaluations']
+                        if mixed['spans']:
+                            prediction = max(mixed['spans'], key=lambda span: span['bbox']['width'])['font_size']
+                elif glyphs['spans'] and not glyphs['mixed']:
+                    prediction = glyphs['spans'][0]['font_size']
+
+            prediction = prediction or self.estimator.estimate(text, bbox)['font_size']
+            search = self._search_sizes(evaluate, prediction, min_size, max_size, tolerance)
+            search['evaluations'] += span_evaluations
+        best_font_size = search['font_size']
+        if best_font_size:
+            # 报告实际渲染的字号（字体池按 1/SUPERSAMPLE 像素量化）
+            best_font_size = self._quantize_size(best_font_size)
 
-        # 精细搜索（在最佳字号附近±4px范围内，步长为0.5px）
+        # 在最终位置上用位压缩掩码精确复核IoU
         if best_font_size:
-            fine_min = max(min_size, best_font_size - 4)
-            fine_max = min(max_size, best_font_size + 4)
+            search['iou'] = self._placement_iou(
+                text, best_font_size, search['x_offset'], search['baseline_offset'],
+                target, region_offset, (x, y)
+            )
 
-            for font_size_decimal in np.arange(fine_min, fine_max, 0.5):
-                result = self._evaluate_font_size(
-                    text, font_size_decimal, text_binary,
-                    (x_start, y_start), (x, y, w, h)
-                )
+        if best_font_size and not from_memo:
+            self.memo.put(memo_key, best_font_size, search['iou'])
+
+        return {
+            "font_size": round(float(best_font_size), 1) if best_font_size else None,
+            "baseline_offset": search['baseline_offset'],
+            "x_offset": search['x_offset'],
+            "fit_quality": round(search['iou'], 4),
+            "evaluations": search['evaluations'],
+            "search_strategy": search['search_strategy'],
+            "from_memo": from_memo,
+            "font_family": "PingFang SC",
+            "line_height": self.line_height,
+            "bbox": bbox,
+            "text": text
+        }
 
-                if result['iou'] > best_iou:
-                    best_iou = result['iou']
-                    best_font_size = font_size_decimal
-                    best_baseline_offset = result['baseline_offset']
+    def _fit_spans(
+        self,
+        spans: List[Dict],
+        text_binary: np.ndarray,
+        target: PackedMask,
+        region_offset: Tuple[int, int],
+        bbox: Dict,
+        min_size: int,
+        max_size: int,
+        tolerance: float
+    ) -> Optional[Dict]:
+        """
+        逐片段做像素拟合，并把各片段合成后与整行目标计算IoU
+
+        拟合某个片段时，其他片段所在列的墨迹从目标中去掉，并以连通域估计的字号为搜索初值。
+        片段坐标从文字框坐标换算为整图坐标。
+
+        Returns:
+            Dict: {"spans", "iou", "evaluations"}；某个片段拟合失败时 spans 为空；
+            片段文字无法与字形对应时返回None
+        """
+        if not all(span['text'] for span in spans):
+            return None
+
+        x, y = max(0, int(bbox['x'])), max(0, int(bbox['y']))
+        x_start, y_start = region_offset
+        rendered = np.zeros(text_binary.shape, dtype=np.uint8)
+        page_spans = []
+        evaluations = 0
+
+        for span in spans:
+            span_bbox = {
+                "x": span['bbox']['x'] + x,
+                "y": span['bbox']['y'] + y,
+                "width": span['bbox']['width'],
+                "height": span['bbox']['height']
+            }
+            span_binary = text_binary.copy()
+            for other in spans:
+                if other is not span:
+                    left = max(0, int(other['bbox']['x']) + x - x_start)
+                    span_binary[:, left:left + int(np.ceil(other['bbox']['width'])) + 1] = 0
+
+            fit = self._fit_target(
+                span_binary, region_offset, span['text'], span_bbox,
+                min_size, max_size, tolerance, split_spans=False, seed=span['font_size']
+            )
+            evaluations += fit['evaluations']
+            if not fit['font_size']:
+                return {"spans": [], "iou": 0.0, "evaluations": evaluations}
+
+            np.maximum(rendered, self._place_text(
+                span['text'], fit['font_size'], fit['x_offset'], fit['baseline_offset'],
+                text_binary.shape, region_offset, (int(span_bbox['x']), int(span_bbox['y']))
+            ), out=rendered)
+            page_spans.append({
+                **span,
+                "bbox": span_bbox,
+                "font_size": fit['font_size'],
+                "baseline_offset": fit['baseline_offset'],
+                "x_offset": fit['x_offset'],
+                "fit_quality": fit['fit_quality']
+            })
 
         return {
-            "font_size": round(best_font_size, 1) if best_font_size else None,
-            "baseline_offset": best_baseline_offset,
-            "fit_quality": round(best_iou, 4),
+            "spans": page_spans,
+            "iou": target.iou(PackedMask.from_array(rendered)),
+            "evaluations": evaluations
+        }
+
+    def _spans_distinct(self, spans: List[Dict]) -> bool:
+        """逐片段拟合出的相邻片段字号之比都达到 span_ratio 时，才认为确实混排了不同字号"""
+        if len(spans) < 2:
+            return False
+        sizes = [span['font_size'] for span in spans]
+        return all(max(a, b) >= min(a, b) * self.span_ratio for a, b in zip(sizes, sizes[1:]))
+
+    def _mixed_size_result(self, mixed: Dict, text: str, bbox: Dict) -> Dict:
+        """
+        混排字号行的结果：主字号取最宽的片段，各片段的拟合结果放在 spans 中
+
+        Args:
+            mixed: _fit_spans 的结果
+        """
+        main_span = max(mixed['spans'], key=lambda span: span['bbox']['width'])
+
+        return {
+            "font_size": main_span['font_size'],
+            "baseline_offset": 0,
+            "x_offset": 0,
+            "fit_quality": round(mixed['iou'], 4),
+            "evaluations": mixed['evaluations'],
+            "search_strategy": "spans",
+            "from_memo": False,
+            "spans": mixed['spans'],
             "font_family": "PingFang SC",
             "line_height": self.line_height,
             "bbox": bbox,
             "text": text
         }
 
+    def _verify_memo(self, memo_key: Tuple, evaluate) -> Optional[Dict]:
+        """
+        用备忘录中的字号在新位置上评估一次，IoU达标则直接采用
+
+        Returns:
+            Dict: 与搜索策略相同结构的结果；没有记录或复核未通过时返回None
+        """
+        cached = self.memo.get(memo_key)
+        if cached is None:
+            return None
+
+        result = evaluate(cached['font_size'])
+        threshold = min(self.memo_threshold, cached['fit_quality'] - self.memo_margin)
+        if result['iou'] < threshold:
+            self.memo.reject()
+            return None
+
+        return {
+            "font_size": cached['font_size'],
+            "iou": result['iou'],
+            "baseline_offset": result['baseline_offset'],
+            "x_offset": result['x_offset'],
+            "evaluations": 1,
+            "search_strategy": "memo"
+        }
+
+    def estimate_font_size(self, text: str, bbox: Dict) -> Dict:
+        """
+        快速模式：只用字体度量估计字号，不做像素IoU拟合，适合批量粗查
+
+        Returns:
+            Dict: 与 fit_font_size 相同结构的结果，fit_quality 为 None
+        """
+        estimate = self.estimator.estimate(text, bbox)
+        return {
+            "font_size": estimate['font_size'],
+            "baseline_offset": 0,
+            "x_offset": 0,
+            "fit_quality": None,
+            "evaluations": 0,
+            "search_strategy": "metric",
+            "from_memo": False,
+            "font_family": "PingFang SC",
+            "line_height": self.line_height,
+            "bbox": bbox,
+            "text": text
+        }
+
+    def _search_sizes(self, evaluate, prediction: Optional[float], min_size, max_size, tolerance) -> Dict:
+        """
+        在度量预测值附近的窄窗口内搜索；最优值落在窗口边缘时说明预测偏了，再搜全范围
+        """
+        if not prediction or not (min_size <= prediction <= max_size):
+            return self.search_strategy.search(evaluate, min_size, max_size, tolerance, self._quantize_size)
+
+        low = max(min_size, prediction * (1 - self.seed_window))
+        high = min(max_size, prediction * (1 + self.seed_window))
+        search = self.search_strategy.search(evaluate, low, high, tolerance, self._quantize_size)
+
+        best = search['font_size']
+        at_edge = best is None or (
+            (best - low <= tolerance and low > min_size) or
+            (high - best <= tolerance and high < max_size)
+        )
+        if at_edge:
+            full = self.search_strategy.search(evaluate, min_size, max_size, tolerance, self._quantize_size)
+            full['evaluations'] += search['evaluations']
+            if full['iou'] > search['iou']:
+                return full
+            search['evaluations'] = full['evaluations']
+
+        return search
+
     def _evaluate_font_size(
         self,
         text: str,
         font_size: float,
-        target_binary: np.ndarray,
+        target_mask: np.ndarray,
+        target_count: int,
         region_offset: Tuple[int, int],
         original_bbox: Tuple[int, int, int, int]
     ) -> Dict:
         """
         评估特定字号的拟合质量
 
+        对渲染掩码与目标二值图做一次滑窗互相关（cv2.matchTemplate 内部使用DFT），
+        同时得到所有 (dx, dy) 偏移下的交集像素数，再由重叠计数推出每个偏移的IoU。
+
         Args:
             text: 文字内容
             font_size: 要评估的字号
-            target_binary: 目标区域的二值化图像
+            target_mask: 目标区域的二值掩码（float32，文字像素为1）
+            target_count: 目标区域的文字像素数（每个区域预先计算一次）
             region_offset: 区域在原图中的偏移 (x_start, y_start)
             original_bbox: 原始边界框 (x, y, w, h)
 
         Returns:
-            Dict: 包含IoU和基线偏移的评估结果
+            Dict: 包含IoU、基线偏移和水平偏移的评估结果
         """
         x, y, w, h = original_bbox
         x_start, y_start = region_offset
 
-        # 创建渲染画布（与target_binary同样大小）
-        canvas_height, canvas_width = target_binary.shape
-        canvas = Image.new('L', (canvas_width, canvas_height), 0)
-        draw = ImageDraw.Draw(canvas)
-
-        # 加载字体
-        try:
-            if self.font_path and self.font_path.endswith('.ttc'):
-                # TTC字体需要指定索引
-                font = ImageFont.truetype(self.font_path, int(font_size), index=0)
-            elif self.font_path:
-                font = ImageFont.truetype(self.font_path, int(font_size))
-            else:
-                font = ImageFont.load_default()
-        except Exception as e:
-            # 降级到默认字体
-            font = ImageFont.load_default()
-
-        # 尝试不同的基线偏移（从-h/2 到 h/2）
-        best_iou = 0.0
-        best_offset = 0
-
-        for baseline_offset in range(-h // 2, h // 2, 2):
-            # 计算渲染位置（相对于canvas）
-            render_x = x - x_start
-            render_y = y - y_start + baseline_offset
-
-            # 创建临时画布
-            temp_canvas = canvas.copy()
-            temp_draw = ImageDraw.Draw(temp_canvas)
-
-            # 渲染文字
-            temp_draw.text((render_x, render_y), text, fill=255, font=font)
-
-            # 转换为numpy数组
-            rendered = np.array(temp_canvas)
-
-            # 计算IoU
-            iou = self._calculate_iou(rendered, target_binary)
-
-            if iou > best_iou:
-                best_iou = iou
-                best_offset = baseline_offset
+        # 每个字号只光栅化一次
+        font, font_key = self._load_font(font_size)
+        mask, mask_origin = self.mask_cache.get_mask(font, font_key, text)
+        rendered = (mask > 127).astype(np.float32)
+        rendered_count = float(rendered.sum())
+        if rendered_count == 0:
+            return {"iou": 0.0, "baseline_offset": 0, "x_offset": 0}
+
+        # 偏移搜索范围：垂直 -h/2 ~ h/2，水平容忍OCR框的少量偏差
+        max_dy = max(1, h // 2)
+        max_dx = max(2, int(h * self.max_x_shift_ratio))
+
+        # 零偏移时掩码左上角在区域坐标系中的位置
+        mask_h, mask_w = rendered.shape
+        left = x - x_start + mask_origin[0]
+        top = y - y_start + mask_origin[1]
+
+        # 取出覆盖所有候选位置的窗口，区域外补0
+        win_x0, win_y0 = left - max_dx, top - max_dy
+        win_w, win_h = mask_w + 2 * max_dx, mask_h + 2 * max_dy
+        window = np.zeros((win_h, win_w), dtype=np.float32)
+
+        region_h, region_w = target_mask.shape
+        sx0, sy0 = max(0, win_x0), max(0, win_y0)
+        sx1, sy1 = min(region_w, win_x0 + win_w), min(region_h, win_y0 + win_h)
+        if sx0 < sx1 and sy0 < sy1:
+            window[sy0 - win_y0:sy1 - win_y0, sx0 - win_x0:sx1 - win_x0] = target_mask[sy0:sy1, sx0:sx1]
+
+        # 交集 = 互相关
+        intersection = np.rint(cv2.matchTemplate(window, rendered, cv2.TM_CCORR))
+
+        # 落在区域内的渲染像素数：区域在窗口中是一个矩形，每个偏移下对应掩码上的一个矩形，用积分图求和
+        rows = np.arange(2 * max_dy + 1)
+        cols = np.arange(2 * max_dx + 1)
+        i0 = np.clip(sy0 - win_y0 - rows, 0, mask_h)
+        i1 = np.clip(max(sy0, sy1) - win_y0 - rows, 0, mask_h)
+        j0 = np.clip(sx0 - win_x0 - cols, 0, mask_w)
+        j1 = np.clip(max(sx0, sx1) - win_x0 - cols, 0, mask_w)
+        table = cv2.integral(rendered, sdepth=cv2.CV_64F)
+        rendered_inside = (
+            table[i1[:, None], j1] - table[i0[:, None], j1]
+            - table[i1[:, None], j0] + table[i0[:, None], j0]
+        )
+        union = rendered_inside + target_count - intersection
+
+        iou_map = np.divide(
+            intersection, union,
+            out=np.zeros_like(intersection), where=union > 0
+        )
+
+        # IoU相同时优先选择离OCR框原位置最近的偏移
+        dys, dxs = np.mgrid[-max_dy:max_dy + 1, -max_dx:max_dx + 1]
+        score = iou_map - 1e-6 * (np.abs(dxs) + np.abs(dys))
+        best_row, best_col = np.unravel_index(np.argmax(score), score.shape)
 
         return {
-            "iou": best_iou,
-            "baseline_offset": best_offset
+            "iou": float(iou_map[best_row, best_col]),
+            "baseline_offset": int(best_row - max_dy),
+            "x_offset": int(best_col - max_dx)
         }
 
-    def _calculate_iou(self, rendered: np.ndarray, target: np.ndarray) -> float:
-        """
-        计算两个二值图像的IoU (Intersection over Union)
+    def _placement_iou(
+        self,
+        text: str,
+        font_size: float,
+        x_offset: int,
+        baseline_offset: int,
+        target: PackedMask,
+        region_offset: Tuple[int, int],
+        origin: Tuple[int, int]
+    ) -> float:
+        """在给定字号和偏移处渲染文字，计算与目标的精确IoU"""
+        rendered = self._place_text(text, font_size, x_offset, baseline_offset, target.shape, region_offset, origin)
+        return target.iou(PackedMask.from_array(rendered))
 
-        Args:
-            rendered: 渲染的文字二值图
-            target: 目标文字二值图
+    def _place_text(
+        self,
+        text: str,
+        font_size: float,
+        x_offset: int,
+        baseline_offset: int,
+        shape: Tuple[int, int],
+        region_offset: Tuple[int, int],
+        origin: Tuple[int, int]
+    ) -> np.ndarray:
+        """在区域坐标系中按给定字号和偏移贴放文字掩码"""
+        font, font_key = self._load_font(font_size)
+        mask, mask_origin = self.mask_cache.get_mask(font, font_key, text)
+        return place_mask(
+            mask, mask_origin, shape,
+            origin[0] - region_offset[0] + x_offset,
+            origin[1] - region_offset[1] + baseline_offset
+        )
 
-        Returns:
-            float: IoU值 (0-1)
+    def _overlay_masks(self, region: Dict) -> List[Tuple[np.ndarray, int, int]]:
         """
-        # 确保尺寸一致
-        if rendered.shape != target.shape:
-            return 0.0
+        区域拟合文字的掩码及其在图片中的位置，与拟合阶段的贴放方式一致；
+        混排字号的区域按各片段自己的字号和偏移逐段给出，未拟合成功的区域返回空列表
 
-        # 计算交集和并集
-        intersection = np.logical_and(rendered > 127, target > 127).sum()
-        union = np.logical_or(rendered > 127, target > 127).sum()
-
-        if union == 0:
-            return 0.0
-
-        iou = intersection / union
-        return iou
+        Returns:
+            List[Tuple]: [(掩码, x, y), ...]
+        """
+        if not region.get('fitted_font_size'):
+            return []
+
+        pieces = [
+            (span['text'], span['font_size'], span['bbox'], span['x_offset'], span['baseline_offset'])
+            for span in region.get('fitted_spans') or []
+        ] or [(
+            region['text'], region['fitted_font_size'], region['bbox'],
+            region.get('fitted_x_offset') or 0, region.get('fitted_baseline') or 0
+        )]
+
+        masks = []
+        for text, font_size, bbox, x_offset, baseline_offset in pieces:
+            # 与拟合阶段共用掩码缓存
+            font, font_key = self._load_font(font_size)
+            mask, mask_origin = self.mask_cache.get_mask(font, font_key, text)
+            masks.append((
+                mask,
+                int(bbox['x']) + x_offset + mask_origin[0],
+                int(bbox['y']) + baseline_offset + mask_origin[1]
+            ))
+        return masks
 
     def render_overlay(
         self,
-        original_image_path: str,
+        original_image: Union[str, np.ndarray],
         text_regions: list,
         output_path: str
     ):
@@ -247,44 +693,55 @@ class FontFitter:
         在原图上渲染红色半透明的拟合文字
 
         Args:
-            original_image_path: 原始图片路径
+            original_image: 原始图片路径，或已解码的图片（BGR）
             text_regions: 包含拟合结果的文本区域列表
             output_path: 输出图片路径
         """
         # 加载原图
-        original = Image.open(original_image_path).convert('RGBA')
+        if isinstance(original_image, str):
+            original = Image.open(original_image).convert('RGBA')
+        else:
+            original = Image.fromarray(original_image[:, :, ::-1]).convert('RGBA')
 
         # 创建透明图层用于绘制
         overlay = Image.new('RGBA', original.size, (0, 0, 0, 0))
-        draw = ImageDraw.Draw(overlay)
 
         for region in text_regions:
-            if region.get('fitted_font_size'):
-                font_size = int(region['fitted_font_size'])
-                text = region['text']
-                bbox = region['bbox']
-                baseline_offset = region.get('fitted_baseline', 0)
-
-                # 加载字体
-                try:
-                    if self.font_path and self.font_path.endswith('.ttc'):
-                        font = ImageFont.truetype(self.font_path, font_size, index=0)
-                    elif self.font_path:
-                        font = ImageFont.truetype(self.font_path, font_size)
-                    else:
-                        font = ImageFont.load_default()
-                except:
-                    font = ImageFont.load_default()
-
-                # 渲染位置
-                x = int(bbox['x'])
-                y = int(bbox['y']) + baseline_offset
-
-                # 绘制半透明红色文字
-                draw.text((x, y), text, fill=self.render_color, font=font)
+            for mask, x, y in self._overlay_masks(region):
+                # 以掩码为透明度贴上半透明红色文字
+                color_layer = Image.new('RGBA', (mask.shape[1], mask.shape[0]), self.render_color)
+                overlay.paste(color_layer, (x, y), Image.fromarray(mask))
 
         # 合并图层
         result = Image.alpha_composite(original, overlay)
 
         # 转换为RGB保存
         result.convert('RGB').save(output_path, quality=95)
+
+    def overlay_paths(self, text_regions: list) -> List[str]:
+        """
+        拟合文字的轮廓，位置与 render_overlay 一致（供矢量图层使用）
+
+        Args:
+            text_regions: 包含拟合结果的文本区域列表
+
+        Returns:
+            List[str]: 每个区域一条 SVG path 数据（起点为图片坐标，按 evenodd 规则填充）
+        """
+        paths = []
+        for region in text_regions:
+            path = []
+            for mask, x, y in self._overlay_masks(region):
+                # 半透明叠加时掩码过半的像素才算笔画
+                contours, _ = cv2.findContours(
+                    (mask >= 128).astype(np.uint8), cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE
+                )
+                for contour in contours:
+                    # 半像素容差简化折线，用相对坐标缩短路径文本
+                    points = cv2.approxPolyDP(contour, 0.5, True).reshape(-1, 2).tolist()
+                    path.append(f"M{points[0][0] + x} {points[0][1] + y}l" + ' '.join(
+                        f"{bx - ax} {by - ay}" for (ax, ay), (bx, by) in zip(points, points[1:])
+                    ) + 'z')
+            if path:
+                paths.append(''.join(path))
+        return paths
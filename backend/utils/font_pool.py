@@ -0,0 +1,104 @@
+"""
+字体对象池
+每个 (字体, face, 字号, 超采样倍数) 在进程内只加载一次
+
+FreeType 的 hinting 会把字形高度对齐到整像素，直接按小数字号加载时 13.5 / 13.7 / 14 渲染结果完全一样；
+拟合用的字体按 N 倍字号加载，由掩码缓存渲染后再缩小 N 倍，小数字号才真正有区别
+"""
+from PIL import ImageFont
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+import threading
+
+
+class FontPool:
+    """进程级字体池（线程安全）"""
+
+    # 拟合渲染的超采样倍数：字号量化到 1/N 像素，相邻量化字号的掩码互不相同
+    SUPERSAMPLE = 4
+
+    def __init__(self, max_fonts: int = 512):
+        """
+        初始化字体池
+
+        Args:
+            max_fonts: 最多保留的字号实例数量，超出后淘汰最久未使用的
+        """
+        self.max_fonts = max_fonts
+        self._fonts: "OrderedDict[Tuple, object]" = OrderedDict()
+        self._broken_faces = set()  # 加载失败过的字体，直接走默认字体
+        self._lock = threading.Lock()
+        self.loads = 0
+
+    def get_font(self, font_path: Optional[str], font_size: float, index: int = 0, supersample: int = 1):
+        """
+        获取指定字号的字体
+
+        Args:
+            font_path: 字体文件路径，None 表示使用 Pillow 默认字体
+            font_size: 字号（像素），允许小数
+            index: TTC 字体的 face 索引
+            supersample: 超采样倍数，字体按 字号×倍数 加载（字体度量用 1，渲染掩码用 SUPERSAMPLE）
+
+        Returns:
+            Tuple: (字体对象, 字体标识 (路径, face索引, 量化后的字号, 超采样倍数))
+        """
+        size = self.quantize(font_size, supersample)
+        if font_path in self._broken_faces:
+            font_path = None
+        key = (font_path, index if font_path else 0, size, supersample)
+
+        with self._lock:
+            font = self._fonts.get(key)
+            if font is not None:
+                self._fonts.move_to_end(key)
+                return font, key
+
+        font, key = self._load(font_path, index, size, supersample)
+
+        with self._lock:
+            self._fonts[key] = font
+            self._fonts.move_to_end(key)
+            while len(self._fonts) > self.max_fonts:
+                self._fonts.popitem(last=False)
+            self.loads += 1
+
+        return font, key
+
+    @staticmethod
+    def quantize(font_size: float, supersample: int = 1) -> float:
+        """字号量化：超采样时取 1/N 像素的整数倍，否则保留 0.1px"""
+        if supersample > 1:
+            return round(float(font_size) * supersample) / supersample
+        return round(float(font_size), 1)
+
+    def _load(self, font_path: Optional[str], index: int, size: float, supersample: int):
+        """加载字体，Pillow>=10.1 直接支持小数字号"""
+        load_size = size * supersample
+        if font_path:
+            try:
+                if font_path.endswith('.ttc'):
+                    # TTC字体需要指定索引
+                    font = ImageFont.truetype(font_path, load_size, index=index)
+                else:
+                    font = ImageFont.truetype(font_path, load_size)
+                return font, (font_path, index, size, supersample)
+            except Exception as e:
+                print(f"字体加载失败，降级到默认字体: {font_path} ({e})", flush=True)
+                self._broken_faces.add(font_path)
+
+        # 降级到默认字体
+        return ImageFont.load_default(load_size), (None, 0, size, supersample)
+
+    def stats(self) -> Dict:
+        """返回字体池统计"""
+        with self._lock:
+            return {
+                "fonts": len(self._fonts),
+                "max_fonts": self.max_fonts,
+                "loads": self.loads
+            }
+
+
+# 进程级共享字体池：fit_font_size 与 render_overlay 共用
+font_pool = FontPool()
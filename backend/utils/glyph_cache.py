@@ -0,0 +1,143 @@
+"""
+文字掩码缓存
+同一字符串在同一字号下只光栅化一次，之后在任意位置直接贴放
+"""
+from PIL import Image, ImageDraw
+import numpy as np
+import cv2
+from collections import OrderedDict
+from typing import Dict, Hashable, Tuple
+import threading
+
+
+class GlyphMaskCache:
+    """渲染文字掩码的 LRU 缓存（线程安全）"""
+
+    def __init__(self, max_entries: int = 4096):
+        """
+        初始化掩码缓存
+
+        Args:
+            max_entries: 最多缓存的掩码数量，超出后淘汰最久未使用的条目
+        """
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Tuple[np.ndarray, Tuple[int, int]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_mask(self, font, font_key: Tuple, text: str) -> Tuple[np.ndarray, Tuple[int, int]]:
+        """
+        获取文字的紧凑掩码
+
+        Args:
+            font: 已加载的 PIL 字体对象
+            font_key: 字体标识 (字体路径, face索引, 字号, 超采样倍数)
+            text: 文字内容
+
+        Returns:
+            Tuple: (掩码 uint8 数组（只读）, 掩码左上角相对于绘制原点的偏移 (dx, dy))
+        """
+        key = (*font_key, text)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+
+        # 在锁外渲染，避免阻塞其他线程
+        entry = self._render(font, text, font_key[3])
+
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+        return entry
+
+    @staticmethod
+    def _render(font, text: str, supersample: int = 1) -> Tuple[np.ndarray, Tuple[int, int]]:
+        """
+        把文字渲染成刚好包住墨迹的掩码
+
+        超采样时字体是按 N 倍字号加载的：画布边界对齐到 N 的整数倍，渲染后按面积缩小 N 倍，
+        掩码和偏移都回到原字号的像素坐标。
+        """
+        n = supersample
+        left, top, right, bottom = font.getbbox(text)
+        left, top = (int(left) // n) * n, (int(top) // n) * n
+        width = max(n, -(-int(right - left) // n) * n)
+        height = max(n, -(-int(bottom - top) // n) * n)
+
+        canvas = Image.new('L', (width, height), 0)
+        ImageDraw.Draw(canvas).text((-left, -top), text, fill=255, font=font)
+
+        mask = np.array(canvas)
+        if n > 1:
+            mask = cv2.resize(mask, (width // n, height // n), interpolation=cv2.INTER_AREA)
+        mask.setflags(write=False)  # 缓存条目共享，禁止修改
+        return mask, (left // n, top // n)
+
+    def stats(self) -> Dict:
+        """返回缓存命中统计"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0
+            }
+
+    def clear(self):
+        """清空缓存和计数"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+def place_mask(
+    mask: np.ndarray,
+    mask_origin: Tuple[int, int],
+    canvas_shape: Tuple[int, int],
+    x: int,
+    y: int
+) -> np.ndarray:
+    """
+    把掩码贴放到空白画布上，效果等同于在 (x, y) 处调用 ImageDraw.text
+
+    Args:
+        mask: 文字掩码
+        mask_origin: 掩码相对于绘制原点的偏移
+        canvas_shape: 画布尺寸 (高, 宽)
+        x: 绘制原点x坐标
+        y: 绘制原点y坐标
+
+    Returns:
+        np.ndarray: 与画布同尺寸的 uint8 图像
+    """
+    canvas = np.zeros(canvas_shape, dtype=np.uint8)
+    canvas_h, canvas_w = canvas_shape
+    mask_h, mask_w = mask.shape
+
+    left = x + mask_origin[0]
+    top = y + mask_origin[1]
+
+    # 裁剪到画布范围内
+    x0, y0 = max(0, left), max(0, top)
+    x1, y1 = min(canvas_w, left + mask_w), min(canvas_h, top + mask_h)
+    if x0 >= x1 or y0 >= y1:
+        return canvas
+
+    canvas[y0:y1, x0:x1] = mask[y0 - top:y1 - top, x0 - left:x1 - left]
+    return canvas
+
+
+# 进程级共享缓存：fit_font_size 与 render_overlay 共用
+glyph_cache = GlyphMaskCache()
@@ -0,0 +1,207 @@
+"""
+基于连通域的字形高度估计
+不渲染任何候选字号，直接从二值图量出字形高度，按字体的字高比例换算字号；
+同一行中混排了不同字号（如大号价格 + 小号单位）时拆分成多个子片段
+"""
+import cv2
+import numpy as np
+from typing import Dict, List, Optional
+
+from .font_pool import FontPool, font_pool
+
+
+def _is_cjk(char: str) -> bool:
+    return '一' <= char <= '鿿' or '㐀' <= char <= '䶿'
+
+
+class GlyphHeightEstimator:
+    """字形高度估计器"""
+
+    REFERENCE_SIZE = 100  # 测量字高比例用的参考字号
+
+    # 各类字符用于测量字高的代表字形
+    SAMPLE_GLYPHS = {
+        "cjk": "国",
+        "cap": "H",
+        "digit": "8",
+        "x": "x"
+    }
+
+    def __init__(
+        self,
+        font_path: Optional[str] = None,
+        font_index: int = 0,
+        fonts: Optional[FontPool] = None,
+        min_area: int = 4,
+        split_ratio: float = 1.6,
+        band_ratio: float = 0.3
+    ):
+        """
+        Args:
+            font_path: 字体文件路径
+            font_index: TTC 字体的 face 索引
+            fonts: 字体池，默认使用进程级共享字体池
+            min_area: 面积小于该值的连通域视为噪点
+            split_ratio: 两组字形高度之比超过该值时视为不同字号
+                （需大于拉丁字母大写/小写的高度比，约1.4）
+            band_ratio: 以基线上方 字形高度中位数×该比例 处为界：底边高于该线（撇号、引号、上标）
+                或顶边低于该线（逗号、句点）的字形视为标点，不参与分组
+        """
+        self.font_path = font_path
+        self.font_index = font_index
+        self.fonts = fonts or font_pool
+        self.min_area = min_area
+        self.split_ratio = split_ratio
+        self.band_ratio = band_ratio
+        self._ratios: Optional[Dict[str, float]] = None
+
+    @property
+    def ratios(self) -> Dict[str, float]:
+        """配置字体的字高比例（字形墨迹高度 / 字号），首次使用时测量"""
+        if self._ratios is None:
+            font, _ = self.fonts.get_font(self.font_path, self.REFERENCE_SIZE, self.font_index)
+            ratios = {}
+            for name, glyph in self.SAMPLE_GLYPHS.items():
+                left, top, right, bottom = font.getbbox(glyph)
+                ratios[name] = (bottom - top) / self.REFERENCE_SIZE if bottom > top else 0.0
+            self._ratios = ratios
+        return self._ratios
+
+    def height_ratio(self, text: str) -> float:
+        """文字中最高一类字形的字高比例"""
+        ratios = self.ratios
+        candidates = []
+        for char in text:
+            if _is_cjk(char):
+                candidates.append(ratios['cjk'])
+            elif char.isdigit():
+                candidates.append(ratios['digit'])
+            elif char.isupper() or char in 'bdfhklt':
+                candidates.append(ratios['cap'])
+            elif char.isalpha():
+                candidates.append(ratios['x'])
+        candidates = [r for r in candidates if r > 0]
+        return max(candidates) if candidates else (ratios['cjk'] or 0.7)
+
+    def estimate(self, text_binary: np.ndarray, text: str) -> Dict:
+        """
+        估计文字区域中各组字形的字号
+
+        Args:
+            text_binary: 文字区域二值图（文字为255），应只包含这一行文字
+            text: OCR识别出的文字
+
+        Returns:
+            Dict: {
+                "mixed": 是否混排了不同字号,
+                "spans": [{"text", "bbox"(区域坐标), "glyph_height", "font_size"}, ...]  从左到右
+            }
+        """
+        glyphs = self._find_glyphs(text_binary)
+        if not glyphs:
+            return {"mixed": False, "spans": []}
+
+        runs = self._group_runs(glyphs)
+        span_texts = self._assign_text(runs, text)
+
+        spans = []
+        for run, span_text in zip(runs, span_texts):
+            x0 = min(g[0] for g in run)
+            y0 = min(g[1] for g in run)
+            x1 = max(g[0] + g[2] for g in run)
+            y1 = max(g[1] + g[3] for g in run)
+            glyph_height = float(np.percentile([g[3] for g in run], 90))
+            ratio = self.height_ratio(span_text if span_text else text)
+
+            spans.append({
+                "text": span_text,
+                "bbox": {"x": float(x0), "y": float(y0), "width": float(x1 - x0), "height": float(y1 - y0)},
+                "glyph_height": round(glyph_height, 1),
+                "font_size": round(glyph_height / ratio, 1) if ratio > 0 else None
+            })
+
+        return {"mixed": len(spans) > 1, "spans": spans}
+
+    def _find_glyphs(self, text_binary: np.ndarray) -> List[List[int]]:
+        """连通域分析，把水平方向重叠的连通域合并成字形框 [x, y, w, h]"""
+        count, _, stats, _ = cv2.connectedComponentsWithStats(
+            (text_binary > 127).astype(np.uint8), connectivity=8
+        )
+
+        boxes = [
+            [int(x), int(y), int(w), int(h)]
+            for x, y, w, h, area in stats[1:count]
+            if area >= self.min_area
+        ]
+        boxes.sort(key=lambda b: b[0])
+
+        # 一个汉字常由多个连通域组成，水平投影重叠的合并为一个字形
+        glyphs = []
+        for box in boxes:
+            if glyphs and box[0] < glyphs[-1][0] + glyphs[-1][2]:
+                last = glyphs[-1]
+                x0, y0 = min(last[0], box[0]), min(last[1], box[1])
+                x1 = max(last[0] + last[2], box[0] + box[2])
+                y1 = max(last[1] + last[3], box[1] + box[3])
+                glyphs[-1] = [x0, y0, x1 - x0, y1 - y0]
+            else:
+                glyphs.append(box)
+        return glyphs
+
+    def _group_runs(self, glyphs: List[List[int]]) -> List[List[List[int]]]:
+        """
+        按字形高度把字形分组，再切成从左到右的连续片段
+
+        扁平字形（"一"、"-"等）和标点（悬在x高度以上的"'"、引号、上标，贴在基线上的","、"."）
+        高度不可靠，不参与分组，跟随左侧片段。
+        高度可靠的字形即使只有一个也可以自成片段（大号价格后的"元"、"%"）。
+        """
+        heights = [g[3] for g in glyphs]
+        baseline = float(np.median([g[1] + g[3] for g in glyphs]))
+        band_line = baseline - self.band_ratio * float(np.median(heights))
+        reliable = [
+            g[3] >= 0.5 * g[2]
+            and g[1] + g[3] >= band_line and g[1] < band_line
+            for g in glyphs
+        ]
+        if not any(reliable):
+            return [glyphs]
+
+        # 一维聚类：高度排序后，相邻高度之比超过 split_ratio 处断开
+        heights = sorted(g[3] for g, ok in zip(glyphs, reliable) if ok)
+        thresholds = [
+            (heights[i] + heights[i + 1]) / 2
+            for i in range(len(heights) - 1)
+            if heights[i + 1] > heights[i] * self.split_ratio
+        ]
+
+        runs: List[List[List[int]]] = []
+        run_levels: List[Optional[int]] = []
+        for glyph, ok in zip(glyphs, reliable):
+            glyph_level = sum(glyph[3] > t for t in thresholds) if ok else None
+            if runs and (glyph_level is None or glyph_level == run_levels[-1]):
+                runs[-1].append(glyph)
+            elif runs and run_levels[-1] is None:
+                # 片段开头只有扁平字形时，沿用第一个可靠字形的分组
+                runs[-1].append(glyph)
+                run_levels[-1] = glyph_level
+            else:
+                runs.append([glyph])
+                run_levels.append(glyph_level)
+        return runs
+
+    @staticmethod
+    def _assign_text(runs: List[List[List[int]]], text: str) -> List[str]:
+        """字形数与字符数一致时，按顺序把字符分给各片段；否则无法对应"""
+        if len(runs) == 1:
+            return [text]
+
+        chars = [c for c in text if not c.isspace()]
+        if sum(len(run) for run in runs) != len(chars):
+            return [''] * len(runs)
+
+        texts, start = [], 0
+        for run in runs:
+            texts.append(''.join(chars[start:start + len(run)]))
+            start += len(run)
+        return texts
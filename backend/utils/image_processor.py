@@ -3,8 +3,9 @@ View 1: Image Normalization
 将任意尺寸的UI截图等比缩放到750px宽度
 """
 from PIL import Image
+import math
 import numpy as np
-from typing import Tuple
+from typing import Dict, Sequence, Tuple
 
 
 class ImageNormalizer:
@@ -12,6 +13,12 @@ class ImageNormalizer:
 
     TARGET_WIDTH = 750
 
+    # 1x 设计稿宽度（pt），金字塔各层的密度 = 宽度 / 该值
+    DENSITY_BASE_WIDTH = 375
+
+    # 预缩小（JPEG DCT缩小、整数倍 reduce）后至少保留目标尺寸的倍数，最后一步 LANCZOS 的输入不低于此
+    REDUCING_GAP = 2.0
+
     def __init__(self):
         self.scale_factor = 1.0
         self.original_size = (0, 0)
@@ -28,20 +35,47 @@ class ImageNormalizer:
         Returns:
             dict: 包含缩放因子和尺寸信息的字典
         """
-        # 打开图片
-        img = Image.open(image_path)
+        normalized, result = self.normalize_image(Image.open(image_path))
 
-        # 转换为RGB模式（移除透明通道）
-        if img.mode in ('RGBA', 'LA', 'P'):
-            # 创建白色背景
-            background = Image.new('RGB', img.size, (255, 255, 255))
-            if img.mode == 'P':
-                img = img.convert('RGBA')
-            background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
-            img = background
-        elif img.mode != 'RGB':
-            img = img.convert('RGB')
+        # 保存标准化后的图片
+        Image.fromarray(normalized[:, :, ::-1]).save(output_path, quality=95)
+        result["output_path"] = output_path
+
+        return result
+
+    def normalize_image(self, img: Image.Image) -> Tuple[np.ndarray, dict]:
+        """
+        在内存中将已打开的图片标准化到750px宽度
+
+        Args:
+            img: PIL 图片（任意模式，尚未 load 时 JPEG 才能按比例解码）
+
+        Returns:
+            Tuple[np.ndarray, dict]: (标准化后的图片（BGR），缩放因子和尺寸信息)
+        """
+        levels, result = self.normalize_pyramid(img, (self.TARGET_WIDTH,))
+        return levels[self.TARGET_WIDTH], result
 
+    def normalize_pyramid(self, img: Image.Image, widths: Sequence[int]) -> Tuple[Dict[int, np.ndarray], dict]:
+        """
+        一次解码、一条重采样链生成多个宽度的分辨率金字塔
+
+        TARGET_WIDTH 层（OCR和拟合使用的分析层）总是生成；其它层宽于原图时不做放大，
+        只在结果中记录缩放比例。从最宽的层开始，每一层由上一层缩小得到。
+
+        大图缩小时：JPEG 先用 draft() 在DCT域按 1/2、1/4、1/8 缩小解码，
+        再用 reduce 做整数倍预缩小，最后一步才用 LANCZOS；两步预缩小都保留目标尺寸 REDUCING_GAP 倍以上的
+        分辨率，结果与直接 LANCZOS 缩放几乎一致。
+
+        Args:
+            img: PIL 图片（任意模式，尚未 load 时 JPEG 才能按比例解码）
+            widths: 各层宽度（设计稿密度，如 375 / 750 / 1125）
+
+        Returns:
+            Tuple[Dict[int, np.ndarray], dict]: ({宽度: 该层图片（BGR）}, 缩放因子和尺寸信息，
+            levels 中记录每一层相对原图和分析层的缩放比例)
+        """
+        # 原始尺寸在 draft 之前记录，缩放因子始终相对于原图
         self.original_size = img.size
 
         # 计算缩放因子
@@ -52,14 +86,28 @@ class ImageNormalizer:
         new_height = int(original_height * self.scale_factor)
         self.normalized_size = (self.TARGET_WIDTH, new_height)
 
-        # 使用高质量的重采样算法
-        normalized_img = img.resize(
-            self.normalized_size,
-            Image.Resampling.LANCZOS
-        )
-
-        # 保存标准化后的图片
-        normalized_img.save(output_path, quality=95)
+        chain = sorted({w for w in widths if w <= original_width} | {self.TARGET_WIDTH}, reverse=True)
+        sizes = [(width, int(original_height * width / original_width)) for width in chain]
+
+        if sizes[0][0] < original_width and img.format == 'JPEG':
+            img.draft('RGB', (
+                math.ceil(sizes[0][0] * self.REDUCING_GAP),
+                math.ceil(sizes[0][1] * self.REDUCING_GAP)
+            ))
+
+        img = self.to_rgb(img)
+
+        levels = {}
+        for size in sizes:
+            # 使用高质量的重采样算法
+            downscale = size[0] < img.width
+            img = img.resize(
+                size,
+                Image.Resampling.LANCZOS,
+                reducing_gap=self.REDUCING_GAP if downscale else None
+            )
+            # RGB -> BGR，与 OpenCV 的约定一致
+            levels[size[0]] = np.ascontiguousarray(np.asarray(img)[:, :, ::-1])
 
         # 返回处理结果
         result = {
@@ -72,10 +120,34 @@ class ImageNormalizer:
                 "height": new_height
             },
             "scale_factor": self.scale_factor,
-            "output_path": output_path
+            "levels": [
+                {
+                    "width": width,
+                    "height": int(original_height * width / original_width),
+                    "density": width / self.DENSITY_BASE_WIDTH,
+                    "scale_factor": width / original_width,
+                    "relative_scale": width / self.TARGET_WIDTH,
+                    "generated": width in levels
+                }
+                for width in sorted(set(widths) | {self.TARGET_WIDTH})
+            ]
         }
 
-        return result
+        return levels, result
+
+    @staticmethod
+    def to_rgb(img: Image.Image) -> Image.Image:
+        """转换为RGB模式（透明通道铺白色背景）"""
+        if img.mode in ('RGBA', 'LA', 'P'):
+            # 创建白色背景
+            background = Image.new('RGB', img.size, (255, 255, 255))
+            if img.mode == 'P':
+                img = img.convert('RGBA')
+            background.paste(img, mask=img.split()[-1] if img.mode in ('RGBA', 'LA') else None)
+            return background
+        if img.mode != 'RGB':
+            return img.convert('RGB')
+        return img
 
     def get_normalized_coordinates(self, x: float, y: float) -> Tuple[float, float]:
         """
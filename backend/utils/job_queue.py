@@ -0,0 +1,139 @@
+"""
+后台任务队列
+上传后立即返回 task_id，处理流程在固定数量的后台线程中执行，不占用 WSGI 请求线程；
+客户端轮询任务状态（阶段、区域拟合进度），完成后再获取结果
+"""
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+import queue
+import threading
+import time
+import traceback
+
+
+# 任务函数：接收进度回调 (阶段, 已完成数, 总数)
+JobFunc = Callable[[Callable[[str, int, int], None]], None]
+
+
+class JobQueue:
+    """有界的后台任务队列（线程安全）"""
+
+    def __init__(self, workers: int = 2, max_pending: int = 16, max_history: int = 1000):
+        """
+        Args:
+            workers: 同时执行的任务数
+            max_pending: 最多排队等待的任务数，超过时拒绝提交
+            max_history: 内存中保留的已结束任务状态数（结果本身已写入磁盘）
+        """
+        if workers < 1:
+            raise ValueError(f"任务线程数必须大于0: {workers}")
+
+        self.workers = workers
+        self.max_pending = max_pending
+        self.max_history = max_history
+
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='job')
+        self._lock = threading.Lock()
+        self._jobs: "OrderedDict[str, Dict]" = OrderedDict()
+        self._active = 0  # 排队中 + 执行中
+
+        self.completed = 0
+        self.failed = 0
+
+    def submit(self, task_id: str, func: JobFunc) -> Dict:
+        """
+        提交任务
+
+        Returns:
+            Dict: 任务状态
+
+        Raises:
+            queue.Full: 排队任务已满
+        """
+        with self._lock:
+            if self._active >= self.workers + self.max_pending:
+                raise queue.Full(f"任务队列已满（{self.max_pending} 个排队中）")
+            self._active += 1
+            self._jobs[task_id] = {
+                "task_id": task_id,
+                "status": "queued",
+                "stage": None,
+                "progress": {"done": 0, "total": 0},
+                "error": None,
+                "submitted_at": time.time(),
+                "started_at": None,
+                "finished_at": None
+            }
+            self._trim()
+            status = dict(self._jobs[task_id])
+
+        self._executor.submit(self._run, task_id, func)
+        return status
+
+    def _run(self, task_id: str, func: JobFunc):
+        self._update(task_id, status="running", started_at=time.time())
+
+        def progress(stage: str, done: int = 0, total: int = 0):
+            # 不带计数的阶段（如 saving）保留上一次的进度，任务结束时仍能看到拟合的区域数
+            if total:
+                self._update(task_id, stage=stage, progress={"done": done, "total": total})
+            else:
+                self._update(task_id, stage=stage)
+
+        try:
+            func(progress)
+            self._update(task_id, status="done", stage="done", finished_at=time.time())
+            with self._lock:
+                self.completed += 1
+        except Exception as e:
+            print(f"[{task_id}] 后台任务失败: {type(e).__name__}: {e}", flush=True)
+            print(traceback.format_exc(), flush=True)
+            self._update(task_id, status="failed", error=str(e), finished_at=time.time())
+            with self._lock:
+                self.failed += 1
+        finally:
+            with self._lock:
+                self._active -= 1
+
+    def _update(self, task_id: str, **fields):
+        with self._lock:
+            job = self._jobs.get(task_id)
+            if job is not None:
+                job.update(fields)
+
+    def _trim(self):
+        """只保留最近的 max_history 个已结束任务（调用方持有锁）"""
+        finished = [tid for tid, job in self._jobs.items() if job['status'] in ('done', 'failed')]
+        for tid in finished[:max(0, len(finished) - self.max_history)]:
+            del self._jobs[tid]
+
+    def status(self, task_id: str) -> Optional[Dict]:
+        """任务状态（不在内存中时为 None）；排队中的任务带有 queue_position"""
+        with self._lock:
+            job = self._jobs.get(task_id)
+            if job is None:
+                return None
+            status = dict(job)
+            status['progress'] = dict(job['progress'])
+            if job['status'] == 'queued':
+                queued = [tid for tid, other in self._jobs.items() if other['status'] == 'queued']
+                status['queue_position'] = queued.index(task_id) + 1
+            return status
+
+    def stats(self) -> Dict:
+        """返回队列状态"""
+        with self._lock:
+            running = sum(1 for job in self._jobs.values() if job['status'] == 'running')
+            return {
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "running": running,
+                "queued": self._active - running,
+                "completed": self.completed,
+                "failed": self.failed
+            }
+
+    def shutdown(self, wait: bool = True):
+        """停止接收任务并等待执行中的任务结束"""
+        self._executor.shutdown(wait=wait)
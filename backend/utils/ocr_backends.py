@@ -0,0 +1,381 @@
+"""
+OCR 推理后端
+OCRDetector 只负责把识别结果解析成文本区域，具体推理交给可替换的后端：
+- paddle: PaddleOCR（默认，依赖 paddlepaddle）
+- onnx:   ONNX Runtime CPU 运行 PP-OCR 的检测/识别模型，不需要导入 paddle（实验性）
+- stub:   不加载任何模型的确定性后端，用于基准测试和调试
+
+后端的 predict 返回与 PaddleOCR 3.x 结果相同键名的字典：
+dt_polys（N个4x2多边形）、rec_texts、rec_scores，以及可选的 doc_preprocessor_res.output_img
+"""
+from typing import Dict, List, Optional, Tuple, Union
+import math
+import os
+import cv2
+import numpy as np
+
+
+def _load_image(image: Union[str, np.ndarray]) -> np.ndarray:
+    """路径或已解码图片统一为 BGR ndarray"""
+    if isinstance(image, str):
+        img = cv2.imread(image)
+        if img is None:
+            raise ValueError(f"无法读取图片: {image}")
+        return img
+    return image
+
+
+class OCRBackend:
+    """OCR 推理后端基类"""
+
+    name = ''
+
+    def __init__(self, params: Dict, cpu_threads: Optional[int] = None, **options):
+        """
+        Args:
+            params: OCRDetector.OCR_PARAMS（检测阈值、识别批大小等）
+            cpu_threads: 推理线程数，None 使用后端默认值
+            options: 后端特有的配置（如 ONNX 模型目录）
+        """
+        self.params = params
+        self.cpu_threads = cpu_threads
+
+    @classmethod
+    def result_params(cls, params: Dict, **options) -> Dict:
+        """决定识别结果的参数（含后端和模型版本），用于结果缓存的键；不加载模型"""
+        return {**params, "backend": cls.name}
+
+    def predict(self, image: Union[str, np.ndarray]) -> Optional[Dict]:
+        """识别一张图片，没有结果时返回 None"""
+        raise NotImplementedError
+
+    def predict_batch(self, images: List[Union[str, np.ndarray]]) -> List[Optional[Dict]]:
+        """识别多张图片，结果与输入一一对应；默认逐张识别，支持跨图合批的后端覆盖此方法"""
+        return [self.predict(image) for image in images]
+
+
+class PaddleBackend(OCRBackend):
+    """PaddleOCR 后端"""
+
+    name = 'paddle'
+
+    def __init__(self, params: Dict, cpu_threads: Optional[int] = None, **options):
+        super().__init__(params, cpu_threads)
+        from paddleocr import PaddleOCR
+
+        paddle_options = dict(params)
+        if cpu_threads:
+            paddle_options['cpu_threads'] = cpu_threads
+        self.ocr = PaddleOCR(**paddle_options)
+
+    @classmethod
+    def result_params(cls, params: Dict, **options) -> Dict:
+        import paddleocr
+        return {**params, "backend": cls.name, "model_version": getattr(paddleocr, '__version__', 'unknown')}
+
+    def predict(self, image: Union[str, np.ndarray]) -> Optional[Dict]:
+        result = self.ocr.ocr(image)
+        if not result or not result[0]:
+            return None
+        # PaddleX 3.x 的OCRResult对象，可按字典访问
+        return result[0]
+
+    def predict_batch(self, images: List[Union[str, np.ndarray]]) -> List[Optional[Dict]]:
+        # 整个列表交给 PaddleOCR 流水线，由它在内部按 rec_batch_num 组批
+        results = list(self.ocr.ocr(list(images)) or [])
+        results += [None] * (len(images) - len(results))
+        return [result if result else None for result in results]
+
+
+class OnnxBackend(OCRBackend):
+    """
+    ONNX Runtime CPU 后端：PP-OCR 检测（DB）+ 方向分类（可选）+ 识别（CTC）
+
+    模型目录需包含 det.onnx、rec.onnx、字符字典 dict.txt（每行一个字符），
+    可选 cls.onnx（文本行方向分类，开启 use_textline_orientation 时使用）。
+    可用 paddle2onnx 从 PP-OCR 推理模型导出。
+
+    实验性：预处理和后处理按 PP-OCR 默认参数实现，识别结果尚未与 PaddleBackend 逐项对齐；
+    设置 OCR_ONNX_MODEL_DIR 后 tests/test_ocr_backends.py 会用导出的模型做冒烟测试。
+    """
+
+    name = 'onnx'
+
+    MODEL_FILES = ('det.onnx', 'rec.onnx', 'cls.onnx', 'dict.txt')
+
+    # 检测输入：短边至少 64，长边不超过 4000，边长对齐到32（与 PP-OCRv5 默认设置一致）
+    DET_LIMIT_MIN_SIDE = 64
+    DET_MAX_SIDE = 4000
+    DET_MEAN = np.array([0.485, 0.456, 0.406], dtype=np.float32)
+    DET_STD = np.array([0.229, 0.224, 0.225], dtype=np.float32)
+    DET_UNCLIP_RATIO = 1.5
+    DET_MAX_CANDIDATES = 1000
+
+    REC_HEIGHT = 48
+    REC_MIN_WIDTH = 320
+    CLS_SHAPE = (48, 192)
+    CLS_THRESH = 0.9
+    CROSS_IMAGE_BATCH_SIZE = 64  # 多图合批时的分类/识别批大小
+
+    def __init__(self, params: Dict, cpu_threads: Optional[int] = None, model_dir: Optional[str] = None, **options):
+        super().__init__(params, cpu_threads)
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise ImportError("OCR_BACKEND=onnx 需要安装 onnxruntime: pip install onnxruntime") from e
+
+        if not model_dir or not os.path.isdir(model_dir):
+            raise ValueError(f"ONNX 模型目录不存在: {model_dir}")
+
+        session_options = ort.SessionOptions()
+        if cpu_threads:
+            session_options.intra_op_num_threads = cpu_threads
+            session_options.inter_op_num_threads = 1
+
+        def load(filename: str):
+            return ort.InferenceSession(
+                os.path.join(model_dir, filename), sess_options=session_options,
+                providers=['CPUExecutionProvider']
+            )
+
+        self.det = load('det.onnx')
+        self.rec = load('rec.onnx')
+        cls_path = os.path.join(model_dir, 'cls.onnx')
+        self.cls = load('cls.onnx') if params.get('use_textline_orientation') and os.path.exists(cls_path) else None
+
+        with open(os.path.join(model_dir, 'dict.txt'), 'r', encoding='utf-8') as f:
+            chars = [line.rstrip('\r\n') for line in f]
+        # 下标0为CTC空白符，字典末尾追加空格（与 PP-OCR 的 use_space_char 一致）
+        self.characters = ['blank'] + chars + [' ']
+
+        self.det_thresh = params.get('det_db_thresh', 0.3)
+        self.box_thresh = params.get('det_db_box_thresh', 0.6)
+        self.batch_size = params.get('rec_batch_num', 6)
+
+    @classmethod
+    def result_params(cls, params: Dict, model_dir: Optional[str] = None, **options) -> Dict:
+        # 模型版本：各模型文件的大小和修改时间
+        files = {}
+        for filename in cls.MODEL_FILES:
+            path = os.path.join(model_dir or '', filename)
+            if os.path.exists(path):
+                stat = os.stat(path)
+                files[filename] = f"{stat.st_size}:{int(stat.st_mtime)}"
+        return {**params, "backend": cls.name, "model_version": files}
+
+    def predict(self, image: Union[str, np.ndarray]) -> Optional[Dict]:
+        return self.predict_batch([image])[0]
+
+    def predict_batch(self, images: List[Union[str, np.ndarray]]) -> List[Optional[Dict]]:
+        """
+        逐张检测后，把所有图片的文本行汇总到一起做方向分类和识别：
+        行数越多，按宽高比排序后同一批的补零越少，批也越满
+        """
+        all_boxes: List[List[np.ndarray]] = []
+        crops: List[np.ndarray] = []
+        for image in images:
+            img = _load_image(image)
+            boxes = self._detect(img)
+            all_boxes.append(boxes)
+            crops.extend(self._crop(img, box) for box in boxes)
+
+        batch_size = self.batch_size if len(images) == 1 else max(self.batch_size, self.CROSS_IMAGE_BATCH_SIZE)
+        if crops and self.cls is not None:
+            crops = self._classify(crops, batch_size)
+        texts, scores = self._recognize(crops, batch_size) if crops else ([], [])
+
+        # 按各图的行数切回每张图
+        results: List[Optional[Dict]] = []
+        start = 0
+        for boxes in all_boxes:
+            end = start + len(boxes)
+            results.append(
+                {"dt_polys": boxes, "rec_texts": texts[start:end], "rec_scores": scores[start:end]}
+                if boxes else None
+            )
+            start = end
+        return results
+
+    # ============ 检测 ============
+
+    def _detect(self, img: np.ndarray) -> List[np.ndarray]:
+        """DB 检测，返回原图坐标系下的四边形（左上、右上、右下、左下），按阅读顺序排列"""
+        height, width = img.shape[:2]
+        ratio = max(1.0, self.DET_LIMIT_MIN_SIDE / min(height, width))
+        if max(height, width) * ratio > self.DET_MAX_SIDE:
+            ratio = self.DET_MAX_SIDE / max(height, width)
+        resized_h = max(32, int(round(height * ratio / 32)) * 32)
+        resized_w = max(32, int(round(width * ratio / 32)) * 32)
+
+        resized = cv2.resize(img, (resized_w, resized_h)).astype(np.float32) / 255.0
+        blob = ((resized - self.DET_MEAN) / self.DET_STD).transpose(2, 0, 1)[np.newaxis]
+        prob = self.det.run(None, {self.det.get_inputs()[0].name: blob})[0][0, 0]
+
+        bitmap = (prob > self.det_thresh).astype(np.uint8)
+        contours, _ = cv2.findContours(bitmap, cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE)
+
+        scale = np.array([width / resized_w, height / resized_h], dtype=np.float32)
+        boxes = []
+        for contour in contours[:self.DET_MAX_CANDIDATES]:
+            rect = cv2.minAreaRect(contour)
+            if min(rect[1]) < 3:
+                continue
+            if self._box_score(prob, cv2.boxPoints(rect)) < self.box_thresh:
+                continue
+
+            rect = self._unclip(rect)
+            if min(rect[1]) < 5:
+                continue
+
+            box = self._order_points(cv2.boxPoints(rect)) * scale
+            box[:, 0] = np.clip(box[:, 0], 0, width)
+            box[:, 1] = np.clip(box[:, 1], 0, height)
+            boxes.append(box)
+
+        # 从上到下、同一行从左到右
+        boxes.sort(key=lambda b: (round(b[0, 1] / 10), b[0, 0]))
+        return boxes
+
+    @staticmethod
+    def _box_score(prob: np.ndarray, box: np.ndarray) -> float:
+        """框内平均概率"""
+        h, w = prob.shape
+        x_min = int(np.clip(np.floor(box[:, 0].min()), 0, w - 1))
+        x_max = int(np.clip(np.ceil(box[:, 0].max()), 0, w - 1))
+        y_min = int(np.clip(np.floor(box[:, 1].min()), 0, h - 1))
+        y_max = int(np.clip(np.ceil(box[:, 1].max()), 0, h - 1))
+
+        mask = np.zeros((y_max - y_min + 1, x_max - x_min + 1), dtype=np.uint8)
+        cv2.fillPoly(mask, [(box - [x_min, y_min]).astype(np.int32)], 1)
+        return float(cv2.mean(prob[y_min:y_max + 1, x_min:x_max + 1], mask)[0])
+
+    def _unclip(self, rect: Tuple) -> Tuple:
+        """
+        按 DB 的方式把收缩的文字核外扩：距离 = 面积 * ratio / 周长
+        对矩形做圆角外扩后再取最小外接矩形，等价于四边各外扩该距离
+        """
+        center, (w, h), angle = rect
+        distance = w * h * self.DET_UNCLIP_RATIO / (2 * (w + h))
+        return center, (w + 2 * distance, h + 2 * distance), angle
+
+    @staticmethod
+    def _order_points(points: np.ndarray) -> np.ndarray:
+        """四个顶点排成 左上、右上、右下、左下"""
+        points = points[np.argsort(points[:, 0])]
+        left = points[:2][np.argsort(points[:2, 1])]
+        right = points[2:][np.argsort(points[2:, 1])]
+        return np.array([left[0], right[0], right[1], left[1]], dtype=np.float32)
+
+    # ============ 方向分类与识别 ============
+
+    @staticmethod
+    def _crop(img: np.ndarray, box: np.ndarray) -> np.ndarray:
+        """透视变换裁出文本行，竖排的行旋转为横排"""
+        crop_w = int(max(np.linalg.norm(box[0] - box[1]), np.linalg.norm(box[2] - box[3])))
+        crop_h = int(max(np.linalg.norm(box[0] - box[3]), np.linalg.norm(box[1] - box[2])))
+        crop_w, crop_h = max(crop_w, 1), max(crop_h, 1)
+        target = np.array([[0, 0], [crop_w, 0], [crop_w, crop_h], [0, crop_h]], dtype=np.float32)
+        matrix = cv2.getPerspectiveTransform(box.astype(np.float32), target)
+        crop = cv2.warpPerspective(img, matrix, (crop_w, crop_h), borderMode=cv2.BORDER_REPLICATE, flags=cv2.INTER_CUBIC)
+        if crop_h / crop_w >= 1.5:
+            crop = np.rot90(crop)
+        return crop
+
+    @staticmethod
+    def _normalize_line(crop: np.ndarray, height: int, width: int, max_width: int) -> np.ndarray:
+        """缩放到固定高度，归一化到 [-1, 1]，右侧补零到 max_width"""
+        resized = cv2.resize(crop, (width, height)).astype(np.float32) / 255.0
+        blob = np.zeros((3, height, max_width), dtype=np.float32)
+        blob[:, :, :width] = ((resized - 0.5) / 0.5).transpose(2, 0, 1)
+        return blob
+
+    def _classify(self, crops: List[np.ndarray], batch_size: int) -> List[np.ndarray]:
+        """文本行方向分类，判为180度的行旋转回来"""
+        cls_h, cls_w = self.CLS_SHAPE
+        result = list(crops)
+        for start in range(0, len(crops), batch_size):
+            batch = crops[start:start + batch_size]
+            blobs = np.stack([
+                self._normalize_line(c, cls_h, min(cls_w, int(math.ceil(cls_h * c.shape[1] / c.shape[0]))), cls_w)
+                for c in batch
+            ])
+            probs = self.cls.run(None, {self.cls.get_inputs()[0].name: blobs})[0]
+            for offset, prob in enumerate(probs):
+                if int(np.argmax(prob)) == 1 and prob[1] > self.CLS_THRESH:
+                    result[start + offset] = cv2.rotate(batch[offset], cv2.ROTATE_180)
+        return result
+
+    def _recognize(self, crops: List[np.ndarray], batch_size: int) -> Tuple[List[str], List[float]]:
+        """CTC 识别；按宽高比排序后分批，同一批补齐到该批最大宽度"""
+        texts: List[str] = [''] * len(crops)
+        scores: List[float] = [0.0] * len(crops)
+        ratios = [c.shape[1] / max(1, c.shape[0]) for c in crops]
+        order = np.argsort(ratios)
+
+        for start in range(0, len(crops), batch_size):
+            indices = order[start:start + batch_size]
+            max_ratio = max(self.REC_MIN_WIDTH / self.REC_HEIGHT, max(ratios[i] for i in indices))
+            max_width = int(math.ceil(self.REC_HEIGHT * max_ratio))
+            blobs = np.stack([
+                self._normalize_line(
+                    crops[i], self.REC_HEIGHT,
+                    min(max_width, max(1, int(math.ceil(self.REC_HEIGHT * ratios[i])))), max_width
+                )
+                for i in indices
+            ])
+            preds = self.rec.run(None, {self.rec.get_inputs()[0].name: blobs})[0]
+            for i, pred in zip(indices, preds):
+                texts[i], scores[i] = self._ctc_decode(pred)
+        return texts, scores
+
+    def _ctc_decode(self, pred: np.ndarray) -> Tuple[str, float]:
+        """贪心解码：取每步最大概率，去重并去掉空白符"""
+        indices = pred.argmax(axis=1)
+        probs = pred.max(axis=1)
+        keep = indices != 0
+        keep[1:] &= indices[1:] != indices[:-1]
+        chars = [self.characters[i] for i in indices[keep] if i < len(self.characters)]
+        return ''.join(chars), float(probs[keep].mean()) if keep.any() else 0.0
+
+
+class StubBackend(OCRBackend):
+    """
+    确定性桩后端：不加载模型，用形态学找出文字行的外框，文字填充为与框宽高比相当数量的"国"。
+    同一张图每次输出完全相同，适合测量拟合、渲染等后续环节的耗时
+    """
+
+    name = 'stub'
+
+    def predict(self, image: Union[str, np.ndarray]) -> Optional[Dict]:
+        img = _load_image(image)
+        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+        binary = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY_INV, 11, 2)
+        # 横向膨胀把同一行的字连起来
+        lines = cv2.dilate(binary, cv2.getStructuringElement(cv2.MORPH_RECT, (15, 3)))
+        count, _, stats, _ = cv2.connectedComponentsWithStats(lines, connectivity=8)
+
+        boxes, texts, scores = [], [], []
+        for x, y, w, h, _ in sorted(stats[1:count].tolist(), key=lambda s: (s[1], s[0])):
+            if h < 8 or w < 10 or h > img.shape[0] // 2:
+                continue
+            boxes.append(np.array([[x, y], [x + w, y], [x + w, y + h], [x, y + h]], dtype=np.float32))
+            texts.append('国' * max(1, round(w / h)))
+            scores.append(0.99)
+
+        if not boxes:
+            return None
+        return {"dt_polys": boxes, "rec_texts": texts, "rec_scores": scores}
+
+
+OCR_BACKENDS = {
+    PaddleBackend.name: PaddleBackend,
+    OnnxBackend.name: OnnxBackend,
+    StubBackend.name: StubBackend
+}
+
+
+def get_backend_class(name: str) -> type:
+    """按名称取后端类"""
+    if name not in OCR_BACKENDS:
+        raise ValueError(f"不支持的OCR后端: {name}（可选: {', '.join(OCR_BACKENDS)}）")
+    return OCR_BACKENDS[name]
@@ -0,0 +1,142 @@
+"""
+OCR结果持久化缓存
+按 标准化后的像素 + OCR参数 的哈希存取识别结果，同一张截图重复上传时跳过 PaddleOCR；
+预处理图片一并保存，保证后续拟合使用的工作图与首次识别时一致
+"""
+from typing import Dict, Optional
+import hashlib
+import json
+import numpy as np
+import os
+import threading
+import cv2
+
+from .ocr_detector import OCRResult
+
+
+class OCRCache:
+    """目录下的平面文件缓存：{key}.json 保存文本区域，{key}.png 保存预处理图片（无损）"""
+
+    def __init__(self, cache_dir: str, params: Dict, max_bytes: int = 512 * 1024 * 1024):
+        """
+        Args:
+            cache_dir: 缓存目录
+            params: 影响识别结果的参数（阈值、语言、模型版本、分块设置等），参与缓存键计算
+            max_bytes: 缓存总大小上限，超出后按最近访问时间淘汰
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._params_digest = hashlib.sha256(
+            json.dumps(params, sort_keys=True, default=str).encode('utf-8')
+        ).hexdigest()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def key(self, image: np.ndarray) -> str:
+        """缓存键：像素内容（含尺寸）+ 参数摘要"""
+        digest = hashlib.sha256()
+        digest.update(self._params_digest.encode('ascii'))
+        digest.update(f"{image.shape}|{image.dtype}".encode('ascii'))
+        digest.update(np.ascontiguousarray(image).data)
+        return digest.hexdigest()
+
+    def _paths(self, key: str):
+        base = os.path.join(self.cache_dir, key)
+        return base + '.json', base + '.png'
+
+    def get(self, key: str) -> Optional[OCRResult]:
+        """读取缓存，未命中或文件损坏时返回 None"""
+        json_path, img_path = self._paths(key)
+        try:
+            with open(json_path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+
+            preprocessed_img = None
+            if entry.get('has_preprocessed'):
+                bgr = cv2.imread(img_path)
+                if bgr is None:
+                    raise FileNotFoundError(img_path)
+                # OCRResult 中的预处理图片约定为RGB
+                preprocessed_img = cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB)
+
+            # 更新访问时间，用于淘汰
+            os.utime(json_path)
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return OCRResult(
+            regions=entry['regions'],
+            preprocessed_img=preprocessed_img,
+            tiles=entry.get('tiles', 1)
+        )
+
+    def put(self, key: str, result: OCRResult):
+        """写入缓存（先写临时文件再原子替换，并发写同一键也不会读到半个文件）"""
+        json_path, img_path = self._paths(key)
+        suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            if result.preprocessed_img is not None:
+                tmp_img = img_path + suffix + '.png'
+                cv2.imwrite(tmp_img, cv2.cvtColor(result.preprocessed_img, cv2.COLOR_RGB2BGR))
+                os.replace(tmp_img, img_path)
+
+            tmp_json = json_path + suffix
+            with open(tmp_json, 'w', encoding='utf-8') as f:
+                json.dump({
+                    "regions": result.regions,
+                    "has_preprocessed": result.preprocessed_img is not None,
+                    "tiles": result.tiles
+                }, f, ensure_ascii=False)
+            os.replace(tmp_json, json_path)
+        except OSError as e:
+            print(f"写入OCR缓存失败: {e}", flush=True)
+            return
+
+        self._evict()
+
+    def _evict(self):
+        """总大小超过上限时，按最近访问时间从旧到新删除条目"""
+        with self._lock:
+            entries = {}
+            total = 0
+            for name in os.listdir(self.cache_dir):
+                key, ext = os.path.splitext(name)
+                if ext not in ('.json', '.png'):
+                    continue
+                try:
+                    stat = os.stat(os.path.join(self.cache_dir, name))
+                except OSError:
+                    continue
+                size, atime = entries.get(key, (0, 0.0))
+                # 以 json 的修改时间作为条目的访问时间（命中时会 touch）
+                entries[key] = (size + stat.st_size, stat.st_mtime if ext == '.json' else atime)
+                total += stat.st_size
+
+            if total <= self.max_bytes:
+                return
+
+            for key, (size, _) in sorted(entries.items(), key=lambda item: item[1][1]):
+                for path in self._paths(key):
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+                total -= size
+                if total <= self.max_bytes:
+                    break
+
+    def stats(self) -> Dict:
+        """返回命中统计"""
+        with self._lock:
+            return {
+                "cache_dir": self.cache_dir,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses
+            }
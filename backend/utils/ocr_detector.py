@@ -1,175 +1,229 @@
 """
 View 2: Intelligent OCR
-使用 PaddleOCR 识别界面中所有文本内容及其位置
+识别界面中所有文本内容及其位置（推理后端见 ocr_backends，默认 PaddleOCR）
 """
-from paddleocr import PaddleOCR
 import numpy as np
-from typing import List, Dict
+from typing import List, Dict, Optional, Union
 import cv2
+import time
+
+from .ocr_backends import get_backend_class
+from .text_regions import TextRegions
+
+
+class OCRResult:
+    """一次OCR识别的输出（每次请求独立，不挂在检测器实例上）"""
+
+    __slots__ = ('lines', '_regions', 'preprocessed_img', 'queue_wait', 'inference_time', 'tiles')
+
+    def __init__(
+        self,
+        regions: Optional[List[Dict]] = None,
+        lines: Optional[TextRegions] = None,
+        preprocessed_img: Optional[np.ndarray] = None,
+        queue_wait: float = 0.0,
+        inference_time: float = 0.0,
+        tiles: int = 1
+    ):
+        """
+        Args:
+            regions: 区域字典列表（已经是字典形式的结果，如缓存中读出的）
+            lines: 紧凑表示的区域（OCR解析的直接产物），首次访问 regions 时才转换为字典
+            preprocessed_img: OCR实际使用的图片（RGB），无文档预处理时为None
+            queue_wait: 等待空闲检测器的时间（秒）
+            inference_time: OCR 推理及解析时间（秒）
+            tiles: 分块识别的条带数
+        """
+        self._regions = regions
+        self.lines = lines if lines is not None or regions is not None else TextRegions.empty()
+        self.preprocessed_img = preprocessed_img
+        self.queue_wait = queue_wait
+        self.inference_time = inference_time
+        self.tiles = tiles
+
+    @property
+    def regions(self) -> List[Dict]:
+        """区域字典列表（与接口返回的 JSON 结构一致），只转换一次"""
+        if self._regions is None:
+            self._regions = self.lines.to_dicts()
+        return self._regions
+
+    @property
+    def preprocessed_bgr(self) -> Optional[np.ndarray]:
+        """预处理图片转为BGR（OpenCV约定）"""
+        if self.preprocessed_img is None:
+            return None
+        return cv2.cvtColor(self.preprocessed_img, cv2.COLOR_RGB2BGR)
 
 
 class OCRDetector:
     """OCR 文字识别器"""
 
-    def __init__(self):
+    # 识别参数，使用更严格的检测参数
+    OCR_PARAMS = {
+        "use_textline_orientation": True,
+        "lang": 'ch',
+        "det_db_thresh": 0.5,           # 提高文本检测阈值（默认0.3）
+        "det_db_box_thresh": 0.6,       # 提高边框置信度阈值（默认0.5）
+        "rec_batch_num": 6              # 减少批处理大小提高精度
+    }
+
+    def __init__(self, cpu_threads: Optional[int] = None, backend: str = 'paddle', **backend_options):
         """
-        初始化 PaddleOCR，使用更严格的检测参数
+        初始化OCR后端
+
+        Args:
+            cpu_threads: 推理使用的CPU线程数，None 使用后端默认值
+            backend: 推理后端名称（paddle / onnx / stub）
+            backend_options: 后端特有的配置（如 onnx 的 model_dir）
         """
-        self.ocr = PaddleOCR(
-            use_textline_orientation=True,
-            lang='ch',
-            det_db_thresh=0.5,          # 提高文本检测阈值（默认0.3）
-            det_db_box_thresh=0.6,      # 提高边框置信度阈值（默认0.5）
-            rec_batch_num=6             # 减少批处理大小提高精度
-        )
+        self.backend = get_backend_class(backend)(dict(self.OCR_PARAMS), cpu_threads, **backend_options)
+        self.preprocessed_img = None
+
+    @classmethod
+    def result_params(cls, backend: str = 'paddle', **backend_options) -> Dict:
+        """决定识别结果的参数（含后端和模型版本），用于结果缓存的键"""
+        return get_backend_class(backend).result_params(dict(cls.OCR_PARAMS), **backend_options)
 
-    def detect_texts(self, image_path: str) -> List[Dict]:
+    def detect(self, image: Union[str, np.ndarray]) -> OCRResult:
         """
-        检测图片中的所有文本
+        检测图片中的所有文本，结果（含预处理图片）通过返回值带出，不修改实例状态
+
+        同一个检测器不能被多个线程同时调用，并发请求请使用 OCRWorkerPool。
 
         Args:
-            image_path: 图片路径
+            image: 图片路径，或已解码的图片（BGR）
 
         Returns:
-            List[Dict]: 文本检测结果列表
+            OCRResult: 文本区域和预处理图片
         """
-        # 执行OCR
-        result = self.ocr.ocr(image_path)
+        start = time.perf_counter()
+
+        # 执行OCR（后端返回与 PaddleX 3.x OCRResult 相同键名的结果）
+        ocr_result = self.backend.predict(image)
+
+        result = self._to_result(ocr_result)
+        result.inference_time = time.perf_counter() - start
+        return result
 
-        if not result or not result[0]:
+    def detect_batch(self, images: List[Union[str, np.ndarray]]) -> List[OCRResult]:
+        """
+        批量检测多张图片：所有图片的文本行汇总后分批识别（后端支持时），结果再拆回每张图
+
+        Args:
+            images: 图片路径或已解码图片（BGR）的列表
+
+        Returns:
+            List[OCRResult]: 与 images 一一对应；inference_time 为整批耗时按图片数平均
+        """
+        if not images:
             return []
 
-        # 处理PaddleX 3.x 的OCRResult对象
-        ocr_result = result[0]
+        start = time.perf_counter()
+        results = [self._to_result(r) for r in self.backend.predict_batch(images)]
+        elapsed = (time.perf_counter() - start) / len(images)
+        for result in results:
+            result.inference_time = elapsed
+        return results
 
-        # 保存预处理后的图片（OCR实际使用的图片）
+    def detect_texts_batch(self, images: List[Union[str, np.ndarray]]) -> List[List[Dict]]:
+        """
+        批量检测多张图片中的文本（适合大批量巡检，吞吐优先于单张延迟）
+
+        Args:
+            images: 图片路径或已解码图片（BGR）的列表
+
+        Returns:
+            List[List[Dict]]: 每张图片的文本检测结果列表
+        """
+        return [result.regions for result in self.detect_batch(images)]
+
+    def _to_result(self, ocr_result) -> OCRResult:
+        """后端输出转为 OCRResult"""
+        if not ocr_result:
+            return OCRResult()
+
+        # 预处理后的图片（OCR实际使用的图片）
+        preprocessed_img = None
         if hasattr(ocr_result, 'keys') and 'doc_preprocessor_res' in ocr_result.keys():
             doc_res = ocr_result['doc_preprocessor_res']
             if hasattr(doc_res, 'keys') and 'output_img' in doc_res.keys():
-                self.preprocessed_img = doc_res['output_img']  # 保存预处理后的图片
-            else:
-                self.preprocessed_img = None
-        else:
-            self.preprocessed_img = None
-
-        # 解析OCR结果
-        text_regions = []
-
-        # 方法1：作为字典访问
-        if hasattr(ocr_result, 'keys'):
-            keys = list(ocr_result.keys())
-
-            # 根据发现的keys来解析数据
-            # 直接指定PaddleX 3.x的标准键名
-            boxes_key = 'dt_polys' if 'dt_polys' in keys else ('rec_polys' if 'rec_polys' in keys else None)
-            texts_key = 'rec_texts' if 'rec_texts' in keys else None
-            scores_key = 'rec_scores' if 'rec_scores' in keys else None
-
-            if boxes_key and texts_key:
-                boxes_data = ocr_result[boxes_key]
-                texts_data = ocr_result[texts_key]
-                scores_data = ocr_result[scores_key] if scores_key else [1.0] * len(texts_data)
-
-                for idx in range(len(texts_data)):
-                    text = texts_data[idx]
-                    box = boxes_data[idx]
-                    confidence = scores_data[idx] if idx < len(scores_data) else 1.0
-
-                    # 计算边界框
-                    try:
-                        if isinstance(box, (list, tuple)) and len(box) > 0:
-                            # box可能是[[x1,y1],[x2,y2],[x3,y3],[x4,y4]]格式
-                            x_coords = [point[0] if isinstance(point, (list, tuple)) else point for point in box]
-                            y_coords = [point[1] if isinstance(point, (list, tuple)) else point for point in box]
-                        elif hasattr(box, 'shape'):  # numpy array
-                            # box是numpy数组，shape可能是(4,2)
-                            x_coords = box[:, 0].tolist()
-                            y_coords = box[:, 1].tolist()
-                        else:
-                            print(f"跳过文本{idx}: 未知的box格式 {type(box)}", flush=True)
-                            continue
-
-                        x = min(x_coords)
-                        y = min(y_coords)
-                        width = max(x_coords) - x
-                        height = max(y_coords) - y
-
-                        # ========== 过滤无效检测 ==========
-                        # 1. 过滤置信度过低的结果
-                        if confidence < 0.5:
-                            continue
-
-                        # 2. 过滤尺寸过小的文本框（可能是误识别）
-                        if width < 10 or height < 8:
-                            continue
-
-                        # 3. 过滤无意义的文本
-                        if not text or len(text.strip()) == 0:
-                            continue
-
-                        # 4. 过滤单个符号（可能是误识别的图案）
-                        if len(text.strip()) == 1 and text in '□○△▽◇◆■●▲▼◎':
-                            continue
-
-                        # 计算中心点
-                        center_x = x + width / 2
-                        center_y = y + height / 2
-
-                        # 转换box为标准格式
-                        if hasattr(box, 'tolist'):
-                            polygon = [[float(p[0]), float(p[1])] for p in box.tolist()]
-                        else:
-                            polygon = [[float(p[0]), float(p[1])] if isinstance(p, (list, tuple)) else [float(p), float(p)] for p in box]
-
-                        text_region = {
-                            "id": f"text_{idx}",
-                            "text": text,
-                            "confidence": float(confidence),
-                            "bbox": {
-                                "x": float(x),
-                                "y": float(y),
-                                "width": float(width),
-                                "height": float(height)
-                            },
-                            "center": {
-                                "x": float(center_x),
-                                "y": float(center_y)
-                            },
-                            "polygon": polygon,
-                            "fitted_font_size": None,
-                            "fitted_baseline": None,
-                            "fit_quality": None
-                        }
-
-                        text_regions.append(text_region)
-                    except Exception as e:
-                        print(f"解析文本{idx}时出错: {e}", flush=True)
-                        continue
-
-                print(f"成功解析{len(text_regions)}个文本区域（原始识别{len(texts_data)}个）", flush=True)
-
-        return text_regions
-
-    def visualize_detection(self, image_path: str, text_regions: List[Dict], output_path: str):
+                preprocessed_img = doc_res['output_img']
+
+        return OCRResult(
+            lines=self._parse_regions(ocr_result),
+            preprocessed_img=preprocessed_img
+        )
+
+    def detect_texts(self, image: Union[str, np.ndarray]) -> List[Dict]:
+        """
+        检测图片中的所有文本（单线程调用的兼容接口，预处理图片保存在 self.preprocessed_img）
+
+        Args:
+            image: 图片路径，或已解码的图片（BGR）
+
+        Returns:
+            List[Dict]: 文本检测结果列表
+        """
+        ocr_result = self.detect(image)
+        self.preprocessed_img = ocr_result.preprocessed_img
+        return ocr_result.regions
+
+    def _parse_regions(self, ocr_result) -> TextRegions:
+        """解析OCR结果：坐标、置信度整列转为数组，过滤条件以掩码一次完成"""
+        if not hasattr(ocr_result, 'keys'):
+            return TextRegions.empty()
+
+        keys = list(ocr_result.keys())
+
+        # 直接指定PaddleX 3.x的标准键名
+        boxes_key = 'dt_polys' if 'dt_polys' in keys else ('rec_polys' if 'rec_polys' in keys else None)
+        texts_key = 'rec_texts' if 'rec_texts' in keys else None
+        scores_key = 'rec_scores' if 'rec_scores' in keys else None
+        if not boxes_key or not texts_key:
+            return TextRegions.empty()
+
+        texts_data = ocr_result[texts_key]
+        lines = TextRegions.from_ocr(
+            ocr_result[boxes_key],
+            texts_data,
+            ocr_result[scores_key] if scores_key else None
+        )
+        print(f"成功解析{len(lines)}个文本区域（原始识别{len(texts_data)}个）", flush=True)
+        return lines
+
+    def visualize_detection(self, image: Union[str, np.ndarray], text_regions: List[Dict], output_path: str):
         """
         可视化OCR检测结果
 
         Args:
-            image_path: 原始图片路径（如果有preprocessed_img则不使用）
+            image: 原始图片路径或已解码的图片（BGR）（如果有 detect_texts 保存的preprocessed_img则不使用）
             text_regions: 文本区域列表
             output_path: 输出图片路径
         """
         # 优先使用预处理后的图片（OCR实际处理的图片）
-        if hasattr(self, 'preprocessed_img') and self.preprocessed_img is not None:
+        if self.preprocessed_img is not None:
             img = self.preprocessed_img.copy()
             # preprocessed_img是RGB格式，需要转换为BGR供cv2使用
             if len(img.shape) == 3 and img.shape[2] == 3:
                 img = cv2.cvtColor(img, cv2.COLOR_RGB2BGR)
             print(f"使用预处理后的图片进行可视化，尺寸: {img.shape}")
         else:
-            img = cv2.imread(image_path)
+            img = cv2.imread(image) if isinstance(image, str) else image.copy()
             print(f"使用原始图片进行可视化，尺寸: {img.shape}")
 
+        self.draw_detection(img, text_regions, output_path)
+
+    @staticmethod
+    def draw_detection(img: np.ndarray, text_regions: List[Dict], output_path: str):
+        """
+        在图片上绘制检测框和文字并保存（会修改传入的图片）
+
+        Args:
+            img: OCR实际处理的图片（BGR）
+            text_regions: 文本区域列表
+            output_path: 输出图片路径
+        """
         for region in text_regions:
             # 绘制边界框
             box = region['polygon']
@@ -0,0 +1,144 @@
+"""
+OCR 检测器工作池
+预加载多个 OCRDetector，每个检测器同一时间只服务一个请求；
+请求按到达顺序排队等待空闲检测器，排队时间与推理时间分开统计
+"""
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Union
+import numpy as np
+import os
+import queue
+import threading
+import time
+
+from .ocr_detector import OCRDetector, OCRResult
+
+
+class OCRWorkerPool:
+    """OCR 检测器池（线程安全）"""
+
+    def __init__(
+        self,
+        size: int = 1,
+        cpu_threads: Optional[int] = None,
+        detector_factory: Optional[Callable[..., OCRDetector]] = None
+    ):
+        """
+        Args:
+            size: 检测器数量（每个都持有一份模型，内存占用按数量线性增加）
+            cpu_threads: 每个检测器的推理线程数，默认把CPU核心数平均分给各检测器
+            detector_factory: 创建检测器的函数，接收 cpu_threads 参数（默认 OCRDetector，使用 PaddleOCR 后端）
+        """
+        if size < 1:
+            raise ValueError(f"OCR工作池大小必须大于0: {size}")
+
+        self.size = size
+        self.cpu_threads = cpu_threads or max(1, (os.cpu_count() or 1) // size)
+        self.detector_factory = detector_factory or OCRDetector
+
+        # queue.Queue 的等待者按先来先服务被唤醒，保证排队公平
+        self._idle: "queue.Queue[OCRDetector]" = queue.Queue()
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._started = False
+
+        self.waiting = 0
+        self.requests = 0
+        self.total_queue_wait = 0.0
+        self.total_inference_time = 0.0
+
+    def start(self):
+        """加载全部检测器（可在服务启动时调用，首个请求不再承担模型加载时间）"""
+        with self._start_lock:
+            if self._started:
+                return
+            for index in range(self.size):
+                print(f"正在初始化 OCR 检测器 {index + 1}/{self.size}"
+                      f"（{self.cpu_threads} 线程）...", flush=True)
+                self._idle.put(self.detector_factory(cpu_threads=self.cpu_threads))
+            self._started = True
+            print("OCR 检测器初始化完成", flush=True)
+
+    @contextmanager
+    def acquire(self, timeout: Optional[float] = None):
+        """
+        独占一个空闲检测器
+
+        Yields:
+            Tuple[OCRDetector, float]: (检测器, 排队等待时间秒)
+
+        Raises:
+            TimeoutError: 超时仍无空闲检测器
+        """
+        self.start()
+
+        with self._stats_lock:
+            self.waiting += 1
+        start = time.perf_counter()
+        try:
+            detector = self._idle.get(timeout=timeout)
+        except queue.Empty:
+            raise TimeoutError(f"等待OCR检测器超时（{timeout}秒）")
+        finally:
+            with self._stats_lock:
+                self.waiting -= 1
+        queue_wait = time.perf_counter() - start
+
+        try:
+            yield detector, queue_wait
+        finally:
+            self._idle.put(detector)
+
+    def detect(self, image: Union[str, np.ndarray], timeout: Optional[float] = None) -> OCRResult:
+        """
+        在空闲检测器上识别一张图片
+
+        Args:
+            image: 图片路径，或已解码的图片（BGR）
+            timeout: 最长排队时间（秒），None 表示一直等待
+
+        Returns:
+            OCRResult: 识别结果，queue_wait / inference_time 分别为排队和推理耗时
+        """
+        with self.acquire(timeout) as (detector, queue_wait):
+            result = detector.detect(image)
+
+        result.queue_wait = queue_wait
+        with self._stats_lock:
+            self.requests += 1
+            self.total_queue_wait += queue_wait
+            self.total_inference_time += result.inference_time
+        return result
+
+    def detect_batch(self, images: List[Union[str, np.ndarray]], timeout: Optional[float] = None) -> List[OCRResult]:
+        """
+        在一个空闲检测器上批量识别多张图片（文本行跨图合批识别）
+
+        Returns:
+            List[OCRResult]: 与 images 一一对应
+        """
+        with self.acquire(timeout) as (detector, queue_wait):
+            results = detector.detect_batch(images)
+
+        with self._stats_lock:
+            self.requests += len(results)
+            self.total_queue_wait += queue_wait * len(results)
+            for result in results:
+                result.queue_wait = queue_wait
+                self.total_inference_time += result.inference_time
+        return results
+
+    def stats(self) -> Dict:
+        """返回工作池状态和平均耗时"""
+        with self._stats_lock:
+            requests = self.requests
+            return {
+                "size": self.size,
+                "cpu_threads": self.cpu_threads,
+                "started": self._started,
+                "idle": self._idle.qsize(),
+                "waiting": self.waiting,
+                "requests": requests,
+                "avg_queue_wait": round(self.total_queue_wait / requests, 4) if requests else 0.0,
+                "avg_inference_time": round(self.total_inference_time / requests, 4) if requests else 0.0
+            }
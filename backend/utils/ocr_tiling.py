@@ -0,0 +1,212 @@
+"""
+长图分块OCR
+超长截图（750px宽、上万像素高）整张送入 PaddleOCR 会占用大量内存，
+检测模型还会把长边缩小到上限以内，导致小字丢失。
+这里把图片切成互相重叠的水平条带分别识别，再把坐标映射回整页并合并重叠区的重复框
+"""
+from concurrent.futures import ThreadPoolExecutor
+from difflib import SequenceMatcher
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+from .ocr_detector import OCRResult
+from .text_regions import TextRegions
+
+
+def split_bands(height: int, tile_height: int, overlap: int) -> List[Tuple[int, int]]:
+    """
+    把 [0, height) 切成互相重叠的条带
+
+    Returns:
+        List[Tuple[int, int]]: [(y_start, y_end), ...]，相邻条带重叠 overlap 像素
+    """
+    if tile_height <= 0 or height <= tile_height:
+        return [(0, height)]
+
+    step = tile_height - overlap
+    bands = []
+    y = 0
+    while True:
+        y_end = min(y + tile_height, height)
+        bands.append((y, y_end))
+        if y_end >= height:
+            return bands
+        y += step
+
+
+def _bbox_iou(a: np.ndarray, b: np.ndarray) -> Tuple[float, float]:
+    """两个 (x, y, w, h) 框的 (IoU, 交集占较小框的比例)"""
+    x0 = max(a[0], b[0])
+    y0 = max(a[1], b[1])
+    x1 = min(a[0] + a[2], b[0] + b[2])
+    y1 = min(a[1] + a[3], b[1] + b[3])
+    if x1 <= x0 or y1 <= y0:
+        return 0.0, 0.0
+
+    intersection = (x1 - x0) * (y1 - y0)
+    area_a = a[2] * a[3]
+    area_b = b[2] * b[3]
+    union = area_a + area_b - intersection
+    smaller = min(area_a, area_b)
+    return (intersection / union if union > 0 else 0.0), (intersection / smaller if smaller > 0 else 0.0)
+
+
+def _text_similarity(a: str, b: str) -> float:
+    """文字相似度：一方包含另一方（被条带边缘截断的行）视为相同"""
+    a, b = a.strip(), b.strip()
+    if not a or not b:
+        return 0.0
+    if a in b or b in a:
+        return 1.0
+    return SequenceMatcher(None, a, b).ratio()
+
+
+def shift_region(region: Dict, dy: int) -> Dict:
+    """把条带坐标系下的区域平移到整页坐标系（混排字号的各片段框也是整页坐标，一起平移）"""
+    region['bbox']['y'] += dy
+    region['center']['y'] += dy
+    region['polygon'] = [[x, y + dy] for x, y in region['polygon']]
+    for span in region.get('fitted_spans') or []:
+        span['bbox']['y'] += dy
+    return region
+
+
+class TiledOCR:
+    """分块OCR：对外接口与 OCRDetector.detect 相同"""
+
+    def __init__(
+        self,
+        engine,
+        tile_height: int = 2400,
+        overlap: int = 160,
+        parallelism: int = 1,
+        edge_margin: int = 2,
+        iou_threshold: float = 0.5,
+        text_threshold: float = 0.6
+    ):
+        """
+        Args:
+            engine: 提供 detect(image) -> OCRResult 的对象（OCRDetector 或 OCRWorkerPool）
+            tile_height: 条带高度（像素），<=0 表示不分块；单次OCR的内存占用由它决定
+            overlap: 相邻条带的重叠高度，应大于页面中最高的一行文字
+            parallelism: 同时识别的条带数（engine 为 OCRWorkerPool 时可设为池大小）
+            edge_margin: 框距离条带内部切口小于该值时视为被截断，交给相邻条带
+            iou_threshold: 重叠区两个框的 IoU（或交集占小框比例）超过该值才可能是同一行
+            text_threshold: 同一行的文字相似度下限
+        """
+        if tile_height > 0 and overlap >= tile_height:
+            raise ValueError(f"条带重叠高度 {overlap} 必须小于条带高度 {tile_height}")
+
+        self.engine = engine
+        self.tile_height = tile_height
+        self.overlap = overlap
+        self.parallelism = max(1, parallelism)
+        self.edge_margin = edge_margin
+        self.iou_threshold = iou_threshold
+        self.text_threshold = text_threshold
+
+    def detect(self, image: np.ndarray) -> OCRResult:
+        """
+        识别整页，图片不超过一个条带时直接整张识别
+
+        Args:
+            image: 已解码的图片（BGR）
+
+        Returns:
+            OCRResult: 整页坐标系下的文本区域；queue_wait / inference_time 为各条带之和
+        """
+        height = image.shape[0]
+        bands = split_bands(height, self.tile_height, self.overlap)
+        if len(bands) == 1:
+            return self.engine.detect(image)
+
+        print(f"长图分块OCR: 高度 {height}px，切成 {len(bands)} 个条带", flush=True)
+
+        def run(band: Tuple[int, int]) -> OCRResult:
+            # 行切片是连续内存的视图，不复制整页
+            return self.engine.detect(image[band[0]:band[1]])
+
+        if self.parallelism > 1:
+            with ThreadPoolExecutor(max_workers=min(self.parallelism, len(bands))) as executor:
+                band_results = list(executor.map(run, bands))
+        else:
+            band_results = [run(band) for band in bands]
+
+        # 各条带去掉被切断的行，平移到整页坐标后整列拼接
+        parts = []
+        for (y_start, y_end), band_result in zip(bands, band_results):
+            lines = band_result.lines if band_result.lines is not None \
+                else TextRegions.from_dicts(band_result.regions)
+            parts.append(lines.select(~self._truncated(lines.boxes, y_start, y_end, height)).shifted(y_start))
+
+        lines = TextRegions.concat(parts).sorted_by_position()
+        lines = lines.select(self._merge_duplicates(lines)).renumbered()
+
+        return OCRResult(
+            lines=lines,
+            preprocessed_img=self._stitch_preprocessed(image, bands, band_results),
+            queue_wait=sum(r.queue_wait for r in band_results),
+            inference_time=sum(r.inference_time for r in band_results),
+            tiles=len(bands)
+        )
+
+    def _truncated(self, boxes: np.ndarray, y_start: int, y_end: int, height: int) -> np.ndarray:
+        """框碰到条带内部切口（不是整页上下边缘）时，说明这一行被切断了；返回布尔掩码"""
+        top = boxes[:, 1]
+        bottom = top + boxes[:, 3]
+        cut_top = (top <= self.edge_margin) if y_start > 0 else np.zeros(len(boxes), dtype=bool)
+        cut_bottom = (bottom >= (y_end - y_start) - self.edge_margin) if y_end < height \
+            else np.zeros(len(boxes), dtype=bool)
+        return cut_top | cut_bottom
+
+    def _merge_duplicates(self, lines: TextRegions) -> List[int]:
+        """
+        合并重叠区中同一行文字的重复框，保留文字更完整、置信度更高的
+
+        Args:
+            lines: 已按 (y, x) 排序的区域
+
+        Returns:
+            List[int]: 保留的下标
+        """
+        boxes, texts, scores = lines.boxes, lines.texts, lines.scores
+        kept: List[int] = []
+        for i in range(len(lines)):
+            duplicate = None
+            for slot in range(len(kept) - 1, -1, -1):
+                j = kept[slot]
+                # 按 y 排序；同一行的重复框顶边相差不超过一行高，更靠上的不必再比
+                if boxes[i, 1] - boxes[j, 1] > max(boxes[i, 3], boxes[j, 3]):
+                    break
+                iou, containment = _bbox_iou(boxes[i], boxes[j])
+                if max(iou, containment) >= self.iou_threshold and \
+                        _text_similarity(texts[i], texts[j]) >= self.text_threshold:
+                    duplicate = slot
+                    break
+
+            if duplicate is None:
+                kept.append(i)
+            elif (len(texts[i]), scores[i]) > (len(texts[kept[duplicate]]), scores[kept[duplicate]]):
+                kept[duplicate] = i
+        return sorted(kept)
+
+    @staticmethod
+    def _stitch_preprocessed(
+        image: np.ndarray,
+        bands: List[Tuple[int, int]],
+        band_results: List[OCRResult]
+    ) -> Optional[np.ndarray]:
+        """
+        拼接各条带的预处理图片；只要有条带的预处理改变了尺寸（如旋转、矫正），
+        坐标就无法对齐，返回 None 让后续流程使用标准化图片
+        """
+        if all(r.preprocessed_img is None for r in band_results):
+            return None
+
+        stitched = np.empty(image.shape, dtype=image.dtype)
+        for (y_start, y_end), band_result in zip(bands, band_results):
+            band_img = band_result.preprocessed_img
+            if band_img is None or band_img.shape != (y_end - y_start,) + image.shape[1:]:
+                return None
+            stitched[y_start:y_end] = band_img
+        return stitched
@@ -0,0 +1,262 @@
+"""
+并行字号拟合
+把同一页的文本区域分发到多个 CPU 核心上拟合，结果按区域顺序返回
+"""
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+import multiprocessing
+import numpy as np
+from typing import Callable, Dict, List, Optional, Tuple
+import os
+import threading
+
+from .bitmask import PackedMask
+from .font_fitter import FontFitter
+
+
+# ============ 工作进程侧 ============
+# 每个工作进程持有自己的 FontFitter（以及进程内的字体池、掩码缓存）
+_worker_fitter: Optional[FontFitter] = None
+
+
+def _init_worker(font_path: Optional[str], search_strategy):
+    """工作进程初始化：只创建一次拟合器"""
+    global _worker_fitter
+    _worker_fitter = FontFitter(font_path=font_path, search_strategy=search_strategy)
+
+
+def _fit_chunk_shared(shm_name: str, bits_shape, page_shape, page_count: int, tasks: List, params: Dict) -> Tuple:
+    """
+    在工作进程中拟合一批区域
+
+    整页二值图以位压缩形式放在共享内存里，这里只映射不复制，
+    各区域拟合时只解压自己需要的行。
+
+    Returns:
+        Tuple: (各区域结果, 工作进程pid, 该进程的缓存统计)
+    """
+    shm = shared_memory.SharedMemory(name=shm_name)
+    bits = np.ndarray(bits_shape, dtype=np.uint8, buffer=shm.buf)
+    try:
+        page_binary = PackedMask(bits, page_shape, count=page_count)
+        results = _fit_chunk(_worker_fitter, page_binary, tasks, params)
+        return results, os.getpid(), _worker_fitter.get_cache_stats()
+    finally:
+        # 释放对共享内存的所有引用后才能关闭
+        page_binary = None
+        del bits
+        shm.close()
+
+
+def _fit_chunk(fitter: FontFitter, page_binary: np.ndarray, tasks: List, params: Dict) -> List:
+    """拟合一批区域，单个区域失败不影响其他区域"""
+    results = []
+    for index, region in tasks:
+        try:
+            result = fitter.fit_region(page_binary, region['text'], region['bbox'], **params)
+        except Exception as e:
+            result = fitter.failed_result(region, e)
+        results.append((index, result))
+    return results
+
+
+# ============ 主进程侧 ============
+
+def _sum_stats(stats_list: List[Dict]) -> Dict:
+    """逐项累加各工作进程的统计（嵌套字典递归累加），命中率按累加后的计数重算"""
+    total: Dict = {}
+    for stats in stats_list:
+        for key, value in stats.items():
+            if isinstance(value, dict):
+                total[key] = _sum_stats([total.get(key, {}), value])
+            elif isinstance(value, (int, float)) and key != 'hit_rate':
+                total[key] = total.get(key, 0) + value
+    if 'hits' in total and 'misses' in total:
+        lookups = total['hits'] + total['misses']
+        if any('hit_rate' in stats for stats in stats_list):
+            total['hit_rate'] = round(total['hits'] / lookups, 4) if lookups else 0.0
+    return total
+
+
+class ParallelFitEngine:
+    """并行拟合引擎"""
+
+    BACKENDS = ('process', 'thread')
+
+    def __init__(
+        self,
+        fitter: Optional[FontFitter] = None,
+        workers: Optional[int] = None,
+        backend: str = 'process',
+        min_parallel_regions: int = 4
+    ):
+        """
+        初始化并行拟合引擎
+
+        Args:
+            fitter: 主进程使用的拟合器（串行路径和线程后端直接使用它）
+            workers: 工作者数量，默认等于CPU核心数；<=1 时退化为串行
+            backend: 'process' 进程池 + 共享内存；'thread' 线程池（依赖 OpenCV/NumPy 释放GIL）
+            min_parallel_regions: 区域数少于该值时直接串行，避免调度开销
+        """
+        if backend not in self.BACKENDS:
+            raise ValueError(f"不支持的并行后端: {backend}")
+
+        self.fitter = fitter or FontFitter()
+        self.workers = workers if workers is not None else (os.cpu_count() or 1)
+        self.backend = backend
+        self.min_parallel_regions = min_parallel_regions
+        self._executor = None
+        self._lock = threading.Lock()
+        self._worker_stats: Dict[int, Dict] = {}  # 工作进程pid -> 最近一次上报的缓存统计
+
+    def fit_regions(
+        self,
+        image_array: np.ndarray,
+        regions: List[Dict],
+        min_size: int = 8,
+        max_size: int = 120,
+        tolerance: float = 0.5,
+        mode: str = 'accurate',
+        progress: Optional[Callable[[int, int], None]] = None
+    ) -> List[Dict]:
+        """
+        并行拟合所有区域，参数与返回值同 FontFitter.fit_regions
+
+        失败的区域 font_size 为 None 并带有 error 字段，结果顺序与 regions 一致。
+        progress 在每批区域完成时调用（已完成区域数, 区域总数）。
+        """
+        if mode == 'fast' or self.workers <= 1 or len(regions) < self.min_parallel_regions:
+            return self.fitter.fit_regions(image_array, regions, min_size, max_size, tolerance, mode, progress)
+
+        params = {"min_size": min_size, "max_size": max_size, "tolerance": tolerance, "mode": mode}
+        page_binary = self.fitter.binarize(image_array)
+        chunks = self._split(regions)
+
+        if self.backend == 'thread':
+            futures = {
+                self._get_executor().submit(_fit_chunk, self.fitter, page_binary, chunk, params): len(chunk)
+                for chunk in chunks
+            }
+            return self._collect(futures, regions, progress)
+
+        # 进程后端：整页二值图位压缩后写入共享内存一次（体积为原来的1/8），各进程直接映射
+        packed = PackedMask.from_array(page_binary)
+        try:
+            shm = shared_memory.SharedMemory(create=True, size=max(1, packed.nbytes))
+        except OSError as e:
+            # 部分无服务器环境没有 /dev/shm，退化为串行
+            print(f"共享内存不可用，改为串行拟合: {e}", flush=True)
+            return self.fitter.fit_regions(image_array, regions, min_size, max_size, tolerance, mode, progress)
+
+        try:
+            shared = np.ndarray(packed.bits.shape, dtype=np.uint8, buffer=shm.buf)
+            shared[:] = packed.bits
+            del shared
+
+            futures = {
+                self._get_executor().submit(
+                    _fit_chunk_shared, shm.name, packed.bits.shape, packed.shape, packed.count, chunk, params
+                ): len(chunk)
+                for chunk in chunks
+            }
+            return self._collect(futures, regions, progress)
+        finally:
+            shm.close()
+            shm.unlink()
+
+    def _split(self, regions: List[Dict]) -> List[List]:
+        """把区域切成若干批；批数多于工作者数，便于负载均衡"""
+        tasks = [(index, {"text": r['text'], "bbox": r['bbox']}) for index, r in enumerate(regions)]
+        chunk_count = min(len(tasks), self.workers * 4)
+        return [tasks[i::chunk_count] for i in range(chunk_count)]
+
+    def _collect(
+        self,
+        futures: Dict[Future, int],
+        regions: List[Dict],
+        progress: Optional[Callable[[int, int], None]] = None
+    ) -> List[Dict]:
+        """按完成先后收集各批结果（futures: 批次 -> 区域数），按区域顺序排列"""
+        results: List[Optional[Dict]] = [None] * len(regions)
+        completed = 0
+        for future in as_completed(futures):
+            try:
+                chunk_results = future.result()
+                if self.backend == 'process':
+                    chunk_results, pid, stats = chunk_results
+                    with self._lock:
+                        self._worker_stats[pid] = stats
+                for index, result in chunk_results:
+                    results[index] = result
+            except BrokenProcessPool as e:
+                # 工作进程意外退出：重建进程池，本批区域按失败处理
+                self._reset_executor()
+                print(f"并行拟合进程异常退出: {e}", flush=True)
+            except Exception as e:
+                print(f"并行拟合批次失败: {e}", flush=True)
+            completed += futures[future]
+            if progress is not None:
+                progress(completed, len(regions))
+
+        return [
+            result if result is not None else self.fitter.failed_result(region, RuntimeError("拟合任务未完成"))
+            for region, result in zip(regions, results)
+        ]
+
+    def get_cache_stats(self) -> Dict:
+        """
+        实际执行拟合的一方的缓存统计
+
+        线程后端（以及串行路径）直接使用主进程的拟合器；进程后端汇总各工作进程最近一次上报的统计，
+        主进程自己的统计（只有少量区域时走串行路径）单独放在 parent 中。
+        """
+        parent = self.fitter.get_cache_stats()
+        if self.backend != 'process' or self.workers <= 1:
+            return {**parent, "scope": "parent"}
+
+        with self._lock:
+            worker_stats = list(self._worker_stats.values())
+        return {
+            **_sum_stats(worker_stats),
+            "scope": "workers",
+            "workers_reporting": len(worker_stats),
+            "parent": parent
+        }
+
+    def _get_executor(self):
+        """
+        懒加载并复用工作池（进程内的缓存跨请求保留）
+
+        工作池可能在请求线程或后台任务线程中首次创建，此时其他线程可能正持有锁；
+        fork 出的子进程会继承这些锁的状态而死锁，因此进程池用 forkserver（不支持时用 spawn）启动，
+        工作进程由 _init_worker 重新创建拟合器，不依赖从父进程继承的状态。
+        """
+        with self._lock:
+            if self._executor is None:
+                if self.backend == 'thread':
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers)
+                else:
+                    methods = multiprocessing.get_all_start_methods()
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn'),
+                        initializer=_init_worker,
+                        initargs=(self.fitter.font_path, self.fitter.search_strategy)
+                    )
+            return self._executor
+
+    def _reset_executor(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+                self._worker_stats.clear()
+
+    def shutdown(self):
+        """关闭工作池"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
@@ -0,0 +1,68 @@
+"""
+处理流程上下文
+一次请求中各个视图之间传递的数据：同一份解码后的图片、缩放因子和文本区域，
+只有需要输出的产物才写入磁盘
+"""
+from dataclasses import dataclass, field
+import numpy as np
+from typing import Callable, Dict, List, Optional
+import cv2
+import os
+
+
+@dataclass
+class PipelineContext:
+    """一次处理任务的上下文"""
+
+    task_id: str
+    output_dir: str
+    timestamp: str = ''
+    fit_mode: str = 'accurate'
+    save_intermediates: bool = False  # 是否额外保存原图、预处理图等中间产物（调试用）
+
+    # View 1: 标准化后的图片（BGR）及缩放信息
+    normalized: Optional[np.ndarray] = None
+    scale_factor: float = 1.0
+    normalization: Dict = field(default_factory=dict)
+    # 分辨率金字塔各层（宽度 -> BGR 图片，包含标准化图所在的分析层），只保存在内存中
+    levels: Dict[int, np.ndarray] = field(default_factory=dict)
+
+    # View 2: OCR实际使用的图片（BGR，可能经过文档预处理）及识别出的文本区域
+    working: Optional[np.ndarray] = None
+    regions: List[Dict] = field(default_factory=list)
+
+    # 条带级复用：[{"index", "y", "height", "cached", "key"}, ...]，未启用时为空
+    bands: List[Dict] = field(default_factory=list)
+
+    # 增量分析的差异信息（对比的任务、变化行段、新增/修改/删除统计），普通任务为空
+    diff: Dict = field(default_factory=dict)
+
+    # 各阶段耗时（秒）
+    timings: Dict[str, float] = field(default_factory=dict)
+
+    # 已写入磁盘的产物：名称 -> 路径
+    artifacts: Dict[str, str] = field(default_factory=dict)
+
+    # 进度回调 (阶段, 已完成数, 总数)：后台任务用来更新任务状态，同步请求为 None
+    progress: Optional[Callable[[str, int, int], None]] = None
+
+    def report(self, stage: str, done: int = 0, total: int = 0):
+        """上报当前阶段和进度"""
+        if self.progress is not None:
+            self.progress(stage, done, total)
+
+    def artifact_path(self, name: str, ext: str = 'jpg') -> str:
+        """产物的输出路径：{output_dir}/{task_id}_{name}.{ext}"""
+        return os.path.join(self.output_dir, f"{self.task_id}_{name}.{ext}")
+
+    def save_image(self, name: str, image: np.ndarray, quality: int = 95) -> str:
+        """把BGR图片写为产物并记录路径"""
+        path = self.artifact_path(name)
+        cv2.imwrite(path, image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        self.artifacts[name] = path
+        return path
+
+    @property
+    def working_image(self) -> np.ndarray:
+        """后续视图使用的图片：有预处理图时用预处理图，否则用标准化图"""
+        return self.working if self.working is not None else self.normalized
@@ -0,0 +1,194 @@
+"""
+截图改版的增量分析
+新截图与上一次任务的标准化图片对齐后逐像素比较，只有变化的行段重新识别和拟合，
+其余文本区域直接沿用上一次的结果，并标出新增、删除和修改的文字
+"""
+from typing import Dict, List, Optional, Tuple
+import copy
+import cv2
+import numpy as np
+
+from .band_cache import quiet_rows
+from .ocr_tiling import shift_region
+
+
+def _bbox_iou(a: Dict, b: Dict) -> float:
+    x0 = max(a['x'], b['x'])
+    y0 = max(a['y'], b['y'])
+    x1 = min(a['x'] + a['width'], b['x'] + b['width'])
+    y1 = min(a['y'] + a['height'], b['y'] + b['height'])
+    if x1 <= x0 or y1 <= y0:
+        return 0.0
+    intersection = (x1 - x0) * (y1 - y0)
+    union = a['width'] * a['height'] + b['width'] * b['height'] - intersection
+    return intersection / union if union > 0 else 0.0
+
+
+class RevisionDiff:
+    """新旧两版截图的对齐与差异分析"""
+
+    CHANGE_KEYS = ('change', 'previous_id', 'previous_text', 'previous_font_size', 'from_band_cache')
+
+    def __init__(
+        self,
+        max_shift: int = 400,
+        pixel_threshold: int = 32,
+        min_changed_pixels: int = 3,
+        padding: int = 16,
+        match_iou: float = 0.5,
+        size_tolerance: float = 0.5
+    ):
+        """
+        Args:
+            max_shift: 对齐时搜索的最大垂直位移（像素）
+            pixel_threshold: 像素差（各通道最大值）超过该值才算变化，需高于 JPEG 压缩噪声
+            min_changed_pixels: 一行中变化像素少于该值时忽略
+            padding: 变化行段向上下扩展的像素数，给OCR留出上下文
+            match_iou: 新旧区域 IoU 超过该值视为同一位置的文字
+            size_tolerance: 新旧拟合字号相差超过该值（像素）视为修改
+        """
+        self.max_shift = max_shift
+        self.pixel_threshold = pixel_threshold
+        self.min_changed_pixels = min_changed_pixels
+        self.padding = padding
+        self.match_iou = match_iou
+        self.size_tolerance = size_tolerance
+
+    def align(self, previous: np.ndarray, current: np.ndarray) -> int:
+        """
+        估计整页的垂直位移 dy：新图第 y 行对应旧图第 y - dy 行
+
+        比较两图的行均值曲线，在 ±max_shift 内取平均差最小的位移（要求重叠不少于一半）。
+        """
+        prev_profile = cv2.cvtColor(previous, cv2.COLOR_BGR2GRAY).mean(axis=1)
+        curr_profile = cv2.cvtColor(current, cv2.COLOR_BGR2GRAY).mean(axis=1)
+        min_overlap = min(len(prev_profile), len(curr_profile)) // 2
+
+        best_shift, best_cost = 0, None
+        for dy in range(-self.max_shift, self.max_shift + 1):
+            start = max(0, dy)
+            end = min(len(curr_profile), len(prev_profile) + dy)
+            if end - start < max(1, min_overlap):
+                continue
+            cost = float(np.abs(curr_profile[start:end] - prev_profile[start - dy:end - dy]).mean())
+            # 代价相同时取位移绝对值更小的
+            if best_cost is None or cost < best_cost - 1e-6 or (abs(cost - best_cost) <= 1e-6 and abs(dy) < abs(best_shift)):
+                best_shift, best_cost = dy, cost
+        return best_shift
+
+    def changed_spans(self, previous: np.ndarray, current: np.ndarray, dy: int) -> List[Tuple[int, int]]:
+        """
+        新图中发生变化的行段 [(y_start, y_end), ...]
+
+        没有对应旧图内容的行（位移露出的部分）全部视为变化；
+        行段扩展到上下最近的纯色行，避免把一行文字切开。
+        """
+        height, width = current.shape[:2]
+        changed_rows = np.ones(height, dtype=bool)
+
+        start = max(0, dy)
+        end = min(height, previous.shape[0] + dy)
+        if end > start and previous.shape[1] == width:
+            diff = cv2.absdiff(current[start:end], previous[start - dy:end - dy]).max(axis=2)
+            mask = (diff > self.pixel_threshold).astype(np.uint8)
+            # 开运算去掉孤立的压缩噪点
+            mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, np.ones((2, 2), np.uint8))
+            changed_rows[start:end] = mask.sum(axis=1) >= self.min_changed_pixels
+
+        quiet = quiet_rows(current)
+        spans: List[Tuple[int, int]] = []
+        rows = np.flatnonzero(changed_rows)
+        for y in rows:
+            if spans and y <= spans[-1][1] + self.padding:
+                spans[-1] = (spans[-1][0], int(y) + 1)
+            else:
+                spans.append((int(y), int(y) + 1))
+
+        expanded = []
+        for y_start, y_end in spans:
+            y_start = max(0, y_start - self.padding)
+            y_end = min(height, y_end + self.padding)
+            while y_start > 0 and not quiet[y_start]:
+                y_start -= 1
+            while y_end < height and not quiet[y_end - 1]:
+                y_end += 1
+            if expanded and y_start <= expanded[-1][1]:
+                expanded[-1] = (expanded[-1][0], max(expanded[-1][1], y_end))
+            else:
+                expanded.append((y_start, y_end))
+        return expanded
+
+    @staticmethod
+    def _in_spans(region: Dict, spans: List[Tuple[int, int]]) -> bool:
+        top = region['bbox']['y']
+        bottom = top + region['bbox']['height']
+        return any(top < y_end and bottom > y_start for y_start, y_end in spans)
+
+    def carry_over(
+        self,
+        previous_regions: List[Dict],
+        dy: int,
+        spans: List[Tuple[int, int]],
+        height: int
+    ) -> Tuple[List[Dict], List[Dict]]:
+        """
+        把旧区域平移到新图坐标系，分成 (沿用的区域, 落在变化行段中需要重新判断的旧区域)
+        平移后移出画面的旧区域归为后者
+        """
+        carried, stale = [], []
+        for region in previous_regions:
+            moved = shift_region(copy.deepcopy(region), dy)
+            # 上一次如果也是增量分析，清掉它的变化标记
+            for key in self.CHANGE_KEYS:
+                moved.pop(key, None)
+            moved['previous_id'] = region['id']
+            top = moved['bbox']['y']
+            if top < 0 or top + moved['bbox']['height'] > height or self._in_spans(moved, spans):
+                stale.append(moved)
+            else:
+                moved['change'] = 'carried'
+                carried.append(moved)
+        return carried, stale
+
+    def classify(self, stale: List[Dict], detected: List[Dict]) -> List[Dict]:
+        """
+        新识别区域与同位置旧区域配对，给新区域打上 change 标记：
+        added（无对应旧区域）/ changed（文字或字号不同）/ unchanged
+
+        Returns:
+            List[Dict]: 没有配对的旧区域（已删除的文字）
+        """
+        unmatched = list(stale)
+        for region in detected:
+            match = self._best_match(region, unmatched)
+            if match is None:
+                region['change'] = 'added'
+                continue
+
+            unmatched.remove(match)
+            region['previous_id'] = match['previous_id']
+            if region['text'] != match['text']:
+                region['change'] = 'changed'
+                region['previous_text'] = match['text']
+            elif not self._same_size(region.get('fitted_font_size'), match.get('fitted_font_size')):
+                region['change'] = 'changed'
+                region['previous_font_size'] = match.get('fitted_font_size')
+            else:
+                region['change'] = 'unchanged'
+
+        for region in unmatched:
+            region['change'] = 'removed'
+        return unmatched
+
+    def _best_match(self, region: Dict, candidates: List[Dict]) -> Optional[Dict]:
+        best, best_iou = None, self.match_iou
+        for candidate in candidates:
+            iou = _bbox_iou(region['bbox'], candidate['bbox'])
+            if iou >= best_iou:
+                best, best_iou = candidate, iou
+        return best
+
+    def _same_size(self, a: Optional[float], b: Optional[float]) -> bool:
+        if a is None or b is None:
+            return a is None and b is None
+        return abs(a - b) <= self.size_tolerance
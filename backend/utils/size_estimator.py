@@ -0,0 +1,60 @@
+"""
+基于字体度量的字号估计
+文字的墨迹宽高与字号成正比，用OCR边界框直接反推字号
+"""
+from typing import Dict, Optional
+
+from .font_pool import FontPool, font_pool
+
+
+class MetricSizeEstimator:
+    """字号估计器 - 不渲染候选字号，只做一次度量"""
+
+    REFERENCE_SIZE = 100  # 度量用的参考字号
+
+    def __init__(self, font_path: Optional[str] = None, font_index: int = 0, fonts: Optional[FontPool] = None):
+        """
+        Args:
+            font_path: 字体文件路径
+            font_index: TTC 字体的 face 索引
+            fonts: 字体池，默认使用进程级共享字体池
+        """
+        self.font_path = font_path
+        self.font_index = font_index
+        self.fonts = fonts or font_pool
+
+    def estimate(self, text: str, bbox: Dict) -> Dict:
+        """
+        根据OCR边界框估计字号
+
+        在参考字号下测量文字的墨迹宽高（getbbox，墨迹为空时退回 getlength），
+        按比例解出与边界框宽、高分别匹配的字号。OCR检测框只会比墨迹更大，
+        所以取两者中较小的一个作为预测值。
+
+        Args:
+            text: 文字内容
+            bbox: OCR边界框 {"x", "y", "width", "height"}
+
+        Returns:
+            Dict: {"font_size", "by_width", "by_height"}，无法估计时 font_size 为 None
+        """
+        text = (text or '').strip()
+        if not text:
+            return {"font_size": None, "by_width": None, "by_height": None}
+
+        font, _ = self.fonts.get_font(self.font_path, self.REFERENCE_SIZE, self.font_index)
+        left, top, right, bottom = font.getbbox(text)
+        ink_width = (right - left) or font.getlength(text)
+        ink_height = bottom - top
+
+        by_width = bbox['width'] * self.REFERENCE_SIZE / ink_width if ink_width > 0 else None
+        by_height = bbox['height'] * self.REFERENCE_SIZE / ink_height if ink_height > 0 else None
+
+        candidates = [size for size in (by_width, by_height) if size]
+        font_size = min(candidates) if candidates else None
+
+        return {
+            "font_size": round(font_size, 1) if font_size else None,
+            "by_width": round(by_width, 1) if by_width else None,
+            "by_height": round(by_height, 1) if by_height else None
+        }
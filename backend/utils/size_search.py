@@ -0,0 +1,256 @@
+"""
+字号搜索策略
+在 IoU-字号 曲线上寻找最优字号，可插拔替换
+"""
+import numpy as np
+from typing import Callable, Dict, Optional
+
+
+class _SearchState:
+    """记录一次搜索中的全部评估，同一字号只评估一次"""
+
+    def __init__(self, evaluate: Callable[[float], Dict], quantize: Optional[Callable[[float], float]] = None):
+        """
+        Args:
+            evaluate: 评估函数
+            quantize: 字号量化函数，量化后相同的字号只评估一次（应与实际渲染的字号步长一致）；
+                默认保留 0.1px
+        """
+        self._evaluate = evaluate
+        self._quantize = quantize or (lambda font_size: round(float(font_size), 1))
+        self._results: Dict[float, Dict] = {}
+        self.best_size: Optional[float] = None
+        self.best: Dict = {"iou": 0.0, "baseline_offset": 0, "x_offset": 0}
+
+    @property
+    def evaluations(self) -> int:
+        return len(self._results)
+
+    def iou(self, font_size: float) -> float:
+        """评估字号并返回IoU（带记忆）"""
+        size = self._quantize(font_size)
+        result = self._results.get(size)
+        if result is None:
+            result = self._evaluate(size)
+            self._results[size] = result
+            if result['iou'] > self.best['iou']:
+                self.best = result
+                self.best_size = size
+        return result['iou']
+
+    def to_result(self, strategy: str) -> Dict:
+        return {
+            "font_size": self.best_size,
+            "iou": self.best['iou'],
+            "baseline_offset": self.best['baseline_offset'],
+            "x_offset": self.best['x_offset'],
+            "evaluations": self.evaluations,
+            "search_strategy": strategy
+        }
+
+
+class SizeSearchStrategy:
+    """字号搜索策略基类"""
+
+    name = 'base'
+
+    def search(
+        self,
+        evaluate: Callable[[float], Dict],
+        min_size: float,
+        max_size: float,
+        tolerance: float = 0.5,
+        quantize: Optional[Callable[[float], float]] = None
+    ) -> Dict:
+        """
+        搜索最佳字号
+
+        Args:
+            evaluate: 评估函数，输入字号，返回 {"iou", "baseline_offset", "x_offset"}
+            min_size: 最小字号（像素）
+            max_size: 最大字号（像素）
+            tolerance: 收敛容差（像素）
+            quantize: 字号量化函数（如 FontPool.quantize），量化后相同的字号只评估一次
+
+        Returns:
+            Dict: {"font_size", "iou", "baseline_offset", "x_offset", "evaluations", "search_strategy"}
+        """
+        raise NotImplementedError
+
+
+class GridSearch(SizeSearchStrategy):
+    """原有的两阶段网格搜索：步长4px粗搜 + 最佳值±4px内步长0.5px精搜"""
+
+    name = 'grid'
+
+    def __init__(self, coarse_step: float = 4, fine_radius: float = 4):
+        self.coarse_step = coarse_step
+        self.fine_radius = fine_radius
+
+    def search(self, evaluate, min_size, max_size, tolerance=0.5, quantize=None) -> Dict:
+        state = _SearchState(evaluate, quantize)
+
+        # 先粗略搜索
+        for font_size in np.arange(min_size, max_size, self.coarse_step):
+            state.iou(font_size)
+
+        # 精细搜索（步长取收敛容差）
+        if state.best_size:
+            fine_min = max(min_size, state.best_size - self.fine_radius)
+            fine_max = min(max_size, state.best_size + self.fine_radius)
+            for font_size in np.arange(fine_min, fine_max, tolerance):
+                state.iou(font_size)
+
+        return state.to_result(self.name)
+
+
+class GoldenSectionSearch(SizeSearchStrategy):
+    """
+    黄金分割搜索
+
+    1. 按固定比例的几何间隔采样，定位峰值所在区间
+    2. 采样序列不是单峰、且最高点不明显高于其他局部峰时，退回步长4px的粗搜来确定区间
+    3. 在区间内做黄金分割，直到区间宽度小于收敛容差
+    4. 收敛后在最优字号 ±polish_radius 内按收敛容差步长复查一遍（小字号的IoU曲线有锯齿，黄金分割可能停在次高点）
+    5. IoU达到阈值，或区间内两个探测点的IoU都与最优IoU相差不到 plateau_eps（平台期）时提前结束
+
+    区间每轮都会按 0.618 收窄，最优IoU几轮没有提升只说明还在逼近峰值，不能当作平台期；
+    只有区间内的探测点都已和最优值一样好时，继续收窄才不会再有提升。
+    """
+
+    name = 'golden'
+
+    INV_PHI = (np.sqrt(5) - 1) / 2  # 0.618...
+
+    def __init__(
+        self,
+        coarse_ratio: float = 1.25,
+        bracket_step: float = 4,
+        target_iou: float = 0.95,
+        polish_radius: float = 1.0,
+        plateau_eps: float = 0.002,
+        noise_eps: float = 0.01,
+        dominance: float = 0.6
+    ):
+        """
+        Args:
+            coarse_ratio: 初始几何采样的相邻字号比例（IoU峰宽约为字号的±15%，再稀会跨过峰值）
+            bracket_step: 非单峰时粗搜的步长（像素）
+            target_iou: IoU达到该值即停止搜索
+            polish_radius: 收敛后复查的半径（像素）
+            plateau_eps: 两个探测点的IoU与最优IoU相差都小于该值时视为平台期
+            noise_eps: 判断单峰时容忍的IoU波动
+            dominance: 其他局部峰的IoU都低于最高点的该比例时，远处的波动不影响峰值区间
+        """
+        self.coarse_ratio = coarse_ratio
+        self.bracket_step = bracket_step
+        self.target_iou = target_iou
+        self.polish_radius = polish_radius
+        self.plateau_eps = plateau_eps
+        self.noise_eps = noise_eps
+        self.dominance = dominance
+
+    def search(self, evaluate, min_size, max_size, tolerance=0.5, quantize=None) -> Dict:
+        state = _SearchState(evaluate, quantize)
+
+        lower, upper = self._bracket(state, min_size, max_size)
+        if state.best['iou'] < self.target_iou:
+            self._golden(state, lower, upper, tolerance)
+        if state.best_size and state.best['iou'] < self.target_iou:
+            self._polish(state, min_size, max_size, tolerance)
+
+        return state.to_result(self.name)
+
+    def _bracket(self, state: _SearchState, min_size: float, max_size: float):
+        """确定包含峰值的字号区间"""
+        points = int(np.ceil(np.log(max_size / min_size) / np.log(self.coarse_ratio))) + 1
+        sizes = np.geomspace(min_size, max_size, max(3, points))
+        ious = []
+        for size in sizes:
+            ious.append(state.iou(size))
+            if ious[-1] >= self.target_iou:
+                return min_size, max_size
+
+        if not self._is_unimodal(ious):
+            # 曲线不是单峰：按固定步长粗搜
+            sizes = np.arange(min_size, max_size + self.bracket_step, self.bracket_step)
+            sizes = np.clip(sizes, min_size, max_size)
+            ious = []
+            for size in sizes:
+                ious.append(state.iou(size))
+                if ious[-1] >= self.target_iou:
+                    return min_size, max_size
+
+        peak = int(np.argmax(ious))
+        lower = sizes[max(0, peak - 1)]
+        upper = sizes[min(len(sizes) - 1, peak + 1)]
+        return float(lower), float(upper)
+
+    def _is_unimodal(self, ious) -> bool:
+        """采样序列先升后降（允许少量波动），或最高点明显高于其他局部峰"""
+        peak = int(np.argmax(ious))
+        rising = all(ious[i + 1] >= ious[i] - self.noise_eps for i in range(peak))
+        falling = all(ious[i + 1] <= ious[i] + self.noise_eps for i in range(peak, len(ious) - 1))
+        if rising and falling:
+            return True
+
+        # 远离峰值处IoU很低，渲染锯齿造成的小起伏不代表另有一个峰
+        padded = [-1.0] + list(ious) + [-1.0]
+        others = [
+            padded[i] for i in range(1, len(padded) - 1)
+            if i - 1 != peak and padded[i] >= padded[i - 1] and padded[i] >= padded[i + 1]
+        ]
+        return all(iou < self.dominance * ious[peak] for iou in others)
+
+    def _golden(self, state: _SearchState, lower: float, upper: float, tolerance: float):
+        """黄金分割搜索，区间宽度小于 tolerance 时收敛"""
+        c = upper - self.INV_PHI * (upper - lower)
+        d = lower + self.INV_PHI * (upper - lower)
+
+        while upper - lower > tolerance:
+            iou_c, iou_d = state.iou(c), state.iou(d)
+
+            # 提前终止：两个探测点都已与最优值持平，区间内是平台
+            if state.best['iou'] - min(iou_c, iou_d) < self.plateau_eps:
+                break
+
+            if iou_c >= iou_d:
+                upper, d = d, c
+                c = upper - self.INV_PHI * (upper - lower)
+            else:
+                lower, c = c, d
+                d = lower + self.INV_PHI * (upper - lower)
+
+            # 提前终止：达到目标IoU
+            if state.best['iou'] >= self.target_iou:
+                break
+
+    def _polish(self, state: _SearchState, min_size: float, max_size: float, tolerance: float):
+        """在最优字号附近按收敛容差步长复查（对齐到容差的整数倍，与网格搜索的采样点一致）"""
+        center = round(state.best_size / tolerance) * tolerance
+        for offset in np.arange(-self.polish_radius, self.polish_radius + tolerance / 2, tolerance):
+            size = center + offset
+            if min_size <= size <= max_size:
+                state.iou(size)
+
+
+SEARCH_STRATEGIES = {
+    GridSearch.name: GridSearch,
+    GoldenSectionSearch.name: GoldenSectionSearch
+}
+
+
+def get_search_strategy(strategy=None) -> SizeSearchStrategy:
+    """
+    根据名称获取搜索策略实例
+
+    Args:
+        strategy: 策略名称（'golden' / 'grid'）、策略实例，或None（默认黄金分割）
+    """
+    if strategy is None:
+        return GoldenSectionSearch()
+    if isinstance(strategy, SizeSearchStrategy):
+        return strategy
+    if strategy not in SEARCH_STRATEGIES:
+        raise ValueError(f"未知的字号搜索策略: {strategy}")
+    return SEARCH_STRATEGIES[strategy]()
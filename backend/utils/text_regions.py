@@ -0,0 +1,197 @@
+"""
+文本区域的紧凑表示
+OCR输出按列存放在 NumPy 数组中（struct-of-arrays），解析、过滤、平移、拼接都是整列运算；
+只在流程需要逐个区域处理时才转换为原有的区域字典（JSON结构）
+"""
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+
+
+# 单独出现时视为误识别图案的符号
+NOISE_SYMBOLS = ('□', '○', '△', '▽', '◇', '◆', '■', '●', '▲', '▼', '◎')
+
+
+class TextRegions:
+    """一组文本区域：texts / scores / boxes(N,4: x,y,w,h) / polygons / ids 按下标对应"""
+
+    __slots__ = ('texts', 'scores', 'boxes', 'polygons', 'ids')
+
+    def __init__(
+        self,
+        texts: np.ndarray,
+        scores: np.ndarray,
+        boxes: np.ndarray,
+        polygons,
+        ids: np.ndarray
+    ):
+        """
+        Args:
+            texts: 文字（object 数组）
+            scores: 置信度（float64）
+            boxes: 外接矩形 (N, 4)，列为 x, y, width, height（float64）
+            polygons: 多边形；点数一致时为 (N, K, 2) 数组，否则为 (K, 2) 数组的列表
+            ids: 区域编号（int64），转换为字典时生成 "text_{id}"
+        """
+        self.texts = texts
+        self.scores = scores
+        self.boxes = boxes
+        self.polygons = polygons
+        self.ids = ids
+
+    @classmethod
+    def empty(cls) -> 'TextRegions':
+        return cls(
+            np.empty(0, dtype=object), np.empty(0), np.empty((0, 4)),
+            np.empty((0, 4, 2)), np.empty(0, dtype=np.int64)
+        )
+
+    @classmethod
+    def from_ocr(
+        cls,
+        polys: Sequence,
+        texts: Sequence[str],
+        scores: Optional[Sequence[float]] = None,
+        min_confidence: float = 0.5,
+        min_width: float = 10,
+        min_height: float = 8
+    ) -> 'TextRegions':
+        """
+        由 OCR 输出（dt_polys / rec_texts / rec_scores）构建，一次性计算外接矩形并按掩码过滤
+
+        过滤规则：置信度过低、框过小、空文字、单独的图案符号
+        """
+        count = len(texts)
+        if count == 0:
+            return cls.empty()
+
+        texts_arr = np.empty(count, dtype=object)
+        texts_arr[:] = [text if text is not None else '' for text in texts]
+        scores_arr = np.ones(count)
+        if scores is not None:
+            n = min(count, len(scores))
+            scores_arr[:n] = np.asarray(scores[:n], dtype=np.float64)
+
+        # 点数一致时整体转为 (N, K, 2) 数组，否则逐个转换
+        try:
+            polygons = np.asarray(polys[:count], dtype=np.float64)
+            if polygons.ndim != 3 or polygons.shape[2] != 2:
+                raise ValueError
+            mins = polygons.min(axis=1)
+            maxs = polygons.max(axis=1)
+        except (ValueError, TypeError):
+            polygons = [np.asarray(p, dtype=np.float64).reshape(-1, 2) for p in polys[:count]]
+            mins = np.array([p.min(axis=0) for p in polygons])
+            maxs = np.array([p.max(axis=0) for p in polygons])
+
+        sizes = maxs - mins
+        stripped = np.char.strip(texts_arr.astype(str))
+        keep = (
+            (scores_arr >= min_confidence)
+            & (sizes[:, 0] >= min_width)
+            & (sizes[:, 1] >= min_height)
+            & (np.char.str_len(stripped) > 0)
+            & ~np.isin(texts_arr.astype(str), NOISE_SYMBOLS)
+        )
+
+        indices = np.flatnonzero(keep)
+        boxes = np.column_stack([mins, sizes])[indices]
+        return cls(
+            texts_arr[indices],
+            scores_arr[indices],
+            boxes,
+            polygons[indices] if isinstance(polygons, np.ndarray) else [polygons[i] for i in indices],
+            indices.astype(np.int64)
+        )
+
+    @classmethod
+    def from_dicts(cls, regions: List[Dict]) -> 'TextRegions':
+        """由区域字典列表构建（编号取 "text_{n}" 中的数字，无法解析时按顺序编号）"""
+        if not regions:
+            return cls.empty()
+
+        texts = np.empty(len(regions), dtype=object)
+        texts[:] = [r['text'] for r in regions]
+        ids = []
+        for index, region in enumerate(regions):
+            suffix = str(region.get('id', '')).rsplit('_', 1)[-1]
+            ids.append(int(suffix) if suffix.isdigit() else index)
+        polygons = [np.asarray(r['polygon'], dtype=np.float64).reshape(-1, 2) for r in regions]
+        if len({p.shape for p in polygons}) == 1:
+            polygons = np.stack(polygons)
+        return cls(
+            texts,
+            np.array([r['confidence'] for r in regions], dtype=np.float64),
+            np.array([[r['bbox']['x'], r['bbox']['y'], r['bbox']['width'], r['bbox']['height']] for r in regions],
+                     dtype=np.float64),
+            polygons,
+            np.array(ids, dtype=np.int64)
+        )
+
+    @classmethod
+    def concat(cls, parts: List['TextRegions']) -> 'TextRegions':
+        """拼接多组区域（编号保持不变）"""
+        parts = [part for part in parts if len(part)]
+        if not parts:
+            return cls.empty()
+        if all(isinstance(p.polygons, np.ndarray) for p in parts) and \
+                len({p.polygons.shape[1:] for p in parts}) == 1:
+            polygons = np.concatenate([p.polygons for p in parts])
+        else:
+            polygons = [poly for p in parts for poly in p.polygons]
+        return cls(
+            np.concatenate([p.texts for p in parts]),
+            np.concatenate([p.scores for p in parts]),
+            np.concatenate([p.boxes for p in parts]),
+            polygons,
+            np.concatenate([p.ids for p in parts])
+        )
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def select(self, indices) -> 'TextRegions':
+        """按下标数组或布尔掩码取子集"""
+        indices = np.flatnonzero(indices) if np.asarray(indices).dtype == bool else np.asarray(indices, dtype=np.int64)
+        polygons = self.polygons[indices] if isinstance(self.polygons, np.ndarray) \
+            else [self.polygons[i] for i in indices]
+        return TextRegions(self.texts[indices], self.scores[indices], self.boxes[indices], polygons, self.ids[indices])
+
+    def shifted(self, dy: float) -> 'TextRegions':
+        """垂直平移（条带坐标 -> 整页坐标）"""
+        boxes = self.boxes.copy()
+        boxes[:, 1] += dy
+        offset = np.array([0.0, dy])
+        polygons = self.polygons + offset if isinstance(self.polygons, np.ndarray) \
+            else [p + offset for p in self.polygons]
+        return TextRegions(self.texts, self.scores, boxes, polygons, self.ids)
+
+    def renumbered(self) -> 'TextRegions':
+        """按当前顺序重新编号为 0..N-1"""
+        return TextRegions(self.texts, self.scores, self.boxes, self.polygons, np.arange(len(self), dtype=np.int64))
+
+    def sorted_by_position(self) -> 'TextRegions':
+        """按 (y, x) 排序"""
+        return self.select(np.lexsort((self.boxes[:, 0], self.boxes[:, 1])))
+
+    def to_dicts(self) -> List[Dict]:
+        """转换为原有的区域字典列表（JSON结构）"""
+        boxes = self.boxes.tolist()
+        scores = self.scores.tolist()
+        ids = self.ids.tolist()
+        polygons = self.polygons.tolist() if isinstance(self.polygons, np.ndarray) \
+            else [p.tolist() for p in self.polygons]
+
+        regions = []
+        for idx, text, confidence, (x, y, width, height), polygon in zip(ids, self.texts, scores, boxes, polygons):
+            regions.append({
+                "id": f"text_{idx}",
+                "text": text,
+                "confidence": confidence,
+                "bbox": {"x": x, "y": y, "width": width, "height": height},
+                "center": {"x": x + width / 2, "y": y + height / 2},
+                "polygon": polygon,
+                "fitted_font_size": None,
+                "fitted_baseline": None,
+                "fit_quality": None
+            })
+        return regions
@@ -0,0 +1,127 @@
+"""
+矢量标注图层
+把OCR检测框、拟合文字轮廓、字号标签输出为 SVG，由前端叠加在标准化图片上显示，
+不再为每个视图重新编码整张截图；栅格渲染（FontFitter.render_overlay / ResultAnnotator）保留用于导出
+"""
+from typing import Dict, List, Optional, Tuple
+from xml.sax.saxutils import escape
+
+from .annotator import ResultAnnotator
+from .font_fitter import FontFitter
+
+
+def _hex(bgr: Tuple[int, int, int]) -> str:
+    """OpenCV 的 BGR 颜色 -> SVG 颜色"""
+    return '#{:02x}{:02x}{:02x}'.format(bgr[2], bgr[1], bgr[0])
+
+
+class VectorLayerRenderer:
+    """生成与栅格视图对应的 SVG 图层（坐标为 OCR 处理图片的像素坐标）"""
+
+    VIEWS = ('ocr_detection', 'overlay', 'annotated')
+
+    # 与 cv2.FONT_HERSHEY_SIMPLEX 缩放 0.5 大致等高的字号
+    LABEL_FONT = "font-family=\"Helvetica, Arial, sans-serif\" font-size=\"13\""
+
+    def __init__(self, font_fitter: FontFitter, annotator: Optional[ResultAnnotator] = None):
+        """
+        Args:
+            font_fitter: 提供拟合文字轮廓（与覆盖层共用字体和掩码缓存）
+            annotator: 提供字号标签的布局和颜色
+        """
+        self.font_fitter = font_fitter
+        self.annotator = annotator or ResultAnnotator()
+
+    def render(self, view: str, text_regions: List[Dict], size: Tuple[int, int]) -> str:
+        """
+        生成一个视图的 SVG
+
+        Args:
+            view: ocr_detection / overlay / annotated
+            text_regions: 文本区域列表（overlay / annotated 只绘制已拟合的区域）
+            size: 底图尺寸 (宽, 高)
+
+        Returns:
+            str: SVG 文本
+        """
+        if view == 'ocr_detection':
+            elements = self._ocr_detection(text_regions)
+        elif view == 'overlay':
+            elements = self._overlay(text_regions)
+        elif view == 'annotated':
+            elements = self._annotated(text_regions)
+        else:
+            raise ValueError(f"未知的可视化产物: {view}")
+
+        width, height = size
+        return (
+            f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {width} {height}" '
+            f'width="{width}" height="{height}">'
+            + ''.join(elements)
+            + '</svg>'
+        )
+
+    def save(self, view: str, text_regions: List[Dict], size: Tuple[int, int], output_path: str):
+        """生成 SVG 并写入文件"""
+        with open(output_path, 'w', encoding='utf-8') as f:
+            f.write(self.render(view, text_regions, size))
+
+    @staticmethod
+    def _points(polygon) -> str:
+        return ' '.join(f"{int(x)},{int(y)}" for x, y in polygon)
+
+    def _ocr_detection(self, text_regions: List[Dict]) -> List[str]:
+        """检测框和识别文字（对应 OCRDetector.draw_detection）"""
+        elements = ['<g fill="none" stroke="#00ff00" stroke-width="2">']
+        elements.extend(
+            f'<polygon points="{self._points(region["polygon"])}"/>' for region in text_regions
+        )
+        elements.append(f'</g><g fill="#00ff00" {self.LABEL_FONT}>')
+        for region in text_regions:
+            x, y = int(region['bbox']['x']), int(region['bbox']['y'])
+            elements.append(f'<text x="{x}" y="{y - 10}">{escape(region["text"][:10])}</text>')
+        elements.append('</g>')
+        return elements
+
+    def _overlay(self, text_regions: List[Dict]) -> List[str]:
+        """拟合文字的半透明轮廓（对应 FontFitter.render_overlay）"""
+        r, g, b, a = self.font_fitter.render_color
+        color = f"#{r:02x}{g:02x}{b:02x}"
+        # 轮廓点在像素中心：平移半个像素，再描1像素宽的边补齐到像素边缘（单像素宽的笔画也靠描边显示）；
+        # 透明度加在整组上，填充和描边重叠处不会叠加变深
+        elements = [
+            f'<g fill="{color}" stroke="{color}" stroke-width="1" stroke-linejoin="round" fill-rule="evenodd" '
+            f'opacity="{a / 255:.3f}" transform="translate(0.5 0.5)">'
+        ]
+        elements.extend(f'<path d="{path}"/>' for path in self.font_fitter.overlay_paths(text_regions))
+        elements.append('</g>')
+        return elements
+
+    def _annotated(self, text_regions: List[Dict]) -> List[str]:
+        """字号标签、指示线和文字框（对应 ResultAnnotator.annotate_image）"""
+        color = _hex(self.annotator.annotation_color)
+        items = self.annotator.layout_labels(text_regions)
+
+        elements = ['<g fill="none" stroke="#00ff00" stroke-width="1">']
+        for item in items:
+            bbox = item['region']['bbox']
+            elements.append(
+                f'<rect x="{int(bbox["x"])}" y="{int(bbox["y"])}" '
+                f'width="{int(bbox["width"])}" height="{int(bbox["height"])}"/>'
+            )
+        elements.append(f'</g><g fill="{_hex(self.annotator.annotation_bg_color)}" fill-opacity="0.7">')
+        for item in items:
+            x1, y1, x2, y2 = item['rect']
+            elements.append(
+                f'<rect x="{x1}" y="{min(y1, y2)}" width="{x2 - x1 + 1}" height="{abs(y2 - y1) + 1}"/>'
+            )
+        elements.append(f'</g><g stroke="{color}" stroke-width="1">')
+        for item in items:
+            (x1, y1), (x2, y2) = item['line']
+            elements.append(f'<line x1="{x1}" y1="{y1}" x2="{x2}" y2="{y2}"/>')
+        elements.append(f'</g><g fill="{color}" {self.LABEL_FONT}>')
+        for item in items:
+            x, y = item['origin']
+            elements.append(f'<text x="{x}" y="{y}">{escape(item["label"])}</text>')
+        elements.append('</g>')
+        return elements
@@ -1,6 +1,8 @@
 #!/usr/bin/env python3
 """
 调试脚本 - 直接测试后端处理流程
+
+用法: python3 debug_backend.py [图片路径]
 """
 import sys
 import os
@@ -80,5 +82,38 @@ except Exception as e:
 
 print()
 print("=" * 60)
+print()
+
+# 如果提供了图片路径，测试完整的识别 + 批量拟合流程
+if len(sys.argv) > 1:
+    image_path = sys.argv[1]
+    print(f"🔤 步骤4：测试字号拟合: {image_path}")
+    print()
+
+    try:
+        import cv2
+        detector = OCRDetector()
+        text_regions = detector.detect_texts(image_path)
+        print(f"  ✅ 识别到 {len(text_regions)} 个文本区域")
+
+        # 整张图只解码一次，交给批量拟合
+        image = cv2.imread(image_path)
+        fitter = FontFitter()
+        fit_results = fitter.fit_regions(image, text_regions, min_size=8, max_size=100)
+
+        for region, fit_result in zip(text_regions, fit_results):
+            if fit_result.get('error'):
+                print(f"  ❌ {region['text'][:20]}: {fit_result['error']}")
+            else:
+                print(f"  ✅ {region['text'][:20]}: {fit_result['font_size']}px (质量: {fit_result['fit_quality']})")
+    except Exception as e:
+        print(f"  ❌ 字号拟合失败:")
+        print(f"     {type(e).__name__}: {e}")
+        import traceback
+        traceback.print_exc()
+
+    print()
+    print("=" * 60)
+
 print("✨ 调试完成！")
 print()
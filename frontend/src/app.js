@@ -40,6 +40,12 @@ class PixelPerfectApp {
         this.ocrImage = document.getElementById('ocrImage');
         this.overlayImage = document.getElementById('overlayImage');
         this.annotatedImage = document.getElementById('annotatedImage');
+        this.ocrLayer = document.getElementById('ocrLayer');
+        this.overlayLayer = document.getElementById('overlayLayer');
+        this.annotatedLayer = document.getElementById('annotatedLayer');
+        this.ocrExport = document.getElementById('ocrExport');
+        this.overlayExport = document.getElementById('overlayExport');
+        this.annotatedExport = document.getElementById('annotatedExport');
         this.fontSizeList = document.getElementById('fontSizeList');
     }
 
@@ -183,9 +189,9 @@ class PixelPerfectApp {
 
         // 加载图片
         this.normalizedImage.src = `${API_BASE_URL}${result.images.normalized}`;
-        this.ocrImage.src = `${API_BASE_URL}${result.images.ocr_detection}`;
-        this.overlayImage.src = `${API_BASE_URL}${result.images.overlay}`;
-        this.annotatedImage.src = `${API_BASE_URL}${result.images.annotated}`;
+        this.displayView(result, 'ocr_detection', this.ocrImage, this.ocrLayer, this.ocrExport);
+        this.displayView(result, 'overlay', this.overlayImage, this.overlayLayer, this.overlayExport);
+        this.displayView(result, 'annotated', this.annotatedImage, this.annotatedLayer, this.annotatedExport);
 
         // 显示字号列表
         this.displayFontSizeList(result.report);
@@ -197,6 +203,27 @@ class PixelPerfectApp {
         this.resultsSection.scrollIntoView({ behavior: 'smooth' });
     }
 
+    displayView(result, name, image, layer, exportLink) {
+        const raster = `${API_BASE_URL}${result.images[name]}`;
+        // 栅格图只在导出时生成
+        exportLink.href = raster;
+
+        if (result.vectors && result.vectors[name]) {
+            // 矢量图层叠加在底图上，加载失败时退回栅格图
+            image.src = `${API_BASE_URL}${result.images.base || result.images.normalized}`;
+            layer.style.display = '';
+            layer.onerror = () => {
+                layer.style.display = 'none';
+                image.src = raster;
+            };
+            layer.src = `${API_BASE_URL}${result.vectors[name]}`;
+        } else {
+            layer.style.display = 'none';
+            layer.removeAttribute('src');
+            image.src = raster;
+        }
+    }
+
     displayStats(report) {
         const stats = [
             {